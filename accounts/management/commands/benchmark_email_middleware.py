@@ -0,0 +1,113 @@
+# accounts/management/commands/benchmark_email_middleware.py
+# Per-request overhead of EmailVerificationMiddleware, against the previous
+# implementation (kept below for comparison):
+#   python manage.py benchmark_email_middleware --iterations 20000
+import time
+
+from django.contrib import messages
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from accounts.middleware import EmailVerificationMiddleware
+from accounts.models import User
+
+
+class LegacyEmailVerificationMiddleware:
+    """The middleware as it was before exemptions were precompiled."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.exempt_urls = [
+            reverse('accounts:login'),
+            reverse('accounts:logout'),
+            reverse('accounts:register_customer'),
+            reverse('accounts:register_artist'),
+            reverse('accounts:resend_verification'),
+            '/admin/',
+        ]
+
+    def __call__(self, request):
+        if request.user.is_authenticated and not request.user.email_verified:
+            path = request.path
+            is_exempt = any(path.startswith(url) for url in self.exempt_urls)
+            if 'verify' in path:
+                is_exempt = True
+            if not is_exempt:
+                if not request.session.get('email_verification_reminder_shown', False):
+                    messages.warning(
+                        request,
+                        'Please verify your email address to access all features. '
+                        '<a href="{}">Resend verification email</a>'.format(
+                            reverse('accounts:resend_verification')
+                        )
+                    )
+                    request.session['email_verification_reminder_shown'] = True
+        return self.get_response(request)
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark EmailVerificationMiddleware against its previous implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000)
+
+    def scenarios(self, verified, unverified):
+        return [
+            ('static file, verified user', '/static/css/site.css', verified),
+            ('page, verified user', '/gallery/', verified),
+            ('page, unverified user', '/gallery/', unverified),
+            ('page, anonymous', '/gallery/', None),
+        ]
+
+    def make_request(self, path, user):
+        request = RequestFactory().get(path)
+        request.session = SessionBase()
+        if user is not None:
+            request.session[SESSION_KEY] = str(user.pk)
+        request._messages = CookieStorage(request)
+        return request
+
+    def measure(self, middleware, request, user, iterations):
+        lookups = 0
+
+        def load_user():
+            # What AuthenticationMiddleware's lazy request.user does on first access
+            nonlocal lookups
+            lookups += 1
+            return User.objects.get(pk=user.pk)
+
+        seconds = 0.0
+        for _ in range(iterations):
+            if user is not None:
+                request.user = SimpleLazyObject(load_user)
+            else:
+                request.user = AnonymousUser()
+            start = time.perf_counter()
+            middleware(request)
+            seconds += time.perf_counter() - start
+        return seconds / iterations * 1e6, lookups
+
+    def handle(self, *args, **options):
+        verified = User.objects.filter(is_active=True, email_verified=True).first()
+        unverified = User.objects.filter(is_active=True, email_verified=False).first()
+        if verified is None or unverified is None:
+            raise CommandError("Needs a verified and an unverified user; run seed_data first.")
+        iterations = options['iterations']
+
+        implementations = [
+            ('before', LegacyEmailVerificationMiddleware(lambda request: None)),
+            ('after', EmailVerificationMiddleware(lambda request: None)),
+        ]
+        self.stdout.write(f"{'scenario':<30} {'version':<7} {'us/request':>10} {'user lookups':>13}")
+        for label, path, user in self.scenarios(verified, unverified):
+            for version, middleware in implementations:
+                # A fresh session per run; the steady state after the first request is what's timed.
+                request = self.make_request(path, user)
+                microseconds, lookups = self.measure(middleware, request, user, iterations)
+                self.stdout.write(f"{label:<30} {version:<7} {microseconds:>10.2f} {lookups:>13}")
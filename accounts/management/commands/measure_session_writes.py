@@ -0,0 +1,77 @@
+# accounts/management/commands/measure_session_writes.py
+# Count database writes per request for a typical anonymous and logged-in
+# browsing journey, with the old session settings and the current ones:
+#   python manage.py measure_session_writes --pages 20
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import User
+from artworks.models import Artwork
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class WriteCounter:
+    def __init__(self):
+        self.writes = 0
+        self.session_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITE_PREFIXES):
+            self.writes += 1
+            if 'django_session' in sql:
+                self.session_writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Measure database (and session table) writes per request under different session settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=10, help='Page views per journey')
+
+    def configurations(self):
+        rolling = 'accounts.middleware.RollingSessionMiddleware'
+        before = {
+            'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+            'SESSION_SAVE_EVERY_REQUEST': True,
+            'MIDDLEWARE': [name for name in settings.MIDDLEWARE if name != rolling],
+        }
+        configurations = [('before (save every request)', before), ('current settings', {})]
+        if settings.SESSION_ENGINE != 'accounts.sessions':
+            configurations.append(('current + cache sessions', {'SESSION_ENGINE': 'accounts.sessions'}))
+        return configurations
+
+    def journey(self, client, paths, pages):
+        counter = WriteCounter()
+        with connection.execute_wrapper(counter):
+            for i in range(pages):
+                client.get(paths[i % len(paths)])
+        return counter
+
+    def handle(self, *args, **options):
+        artwork = Artwork.objects.filter(status='active', is_available=True, stock_quantity__gt=0).first()
+        customer = User.objects.filter(user_type='customer', is_active=True).first()
+        if artwork is None or customer is None:
+            raise CommandError("Needs an available artwork and a customer; run seed_data first.")
+        paths = ['/', '/gallery/', f'/artwork/{artwork.pk}/', '/cart/']
+        pages = options['pages']
+
+        self.stdout.write(f"{'configuration':<30} {'visitor':<10} {'writes/req':>10} {'session/req':>11}")
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        for label, overrides in self.configurations():
+            with override_settings(ALLOWED_HOSTS=hosts, **overrides), transaction.atomic():
+                anonymous = Client()
+                # An anonymous visitor only gets a session once they have a cart.
+                anonymous.post(f'/cart/add/{artwork.pk}/', {'quantity': 1})
+                member = Client()
+                member.force_login(customer)
+                for visitor, client in (('anonymous', anonymous), ('customer', member)):
+                    counter = self.journey(client, paths, pages)
+                    self.stdout.write(
+                        f"{label:<30} {visitor:<10} {counter.writes / pages:>10.2f} {counter.session_writes / pages:>11.2f}"
+                    )
+                transaction.set_rollback(True)
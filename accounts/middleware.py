@@ -1,15 +1,29 @@
 # accounts/middleware.py
+import re
+import time
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth import SESSION_KEY
 from django.urls import reverse
-from django.shortcuts import redirect
 
 class EmailVerificationMiddleware:
     """
     Middleware to check if user's email is verified.
     Shows reminder messages for unverified users.
+
+    Exempt paths (auth pages, admin, static/media files and anything with
+    "verify" in it) are matched with one precompiled regex before the user
+    is looked at, so they never cost the auth user query. Once a user is
+    seen verified, or has had their reminder, the session remembers it and
+    later requests skip the lookup too. A user whose address becomes
+    unverified mid-session gets the reminder after their next login.
     """
-    
+
+    REMINDER_SHOWN_KEY = 'email_verification_reminder_shown'
+    VERIFIED_KEY = '_email_verified_user'
+
     def __init__(self, get_response):
         self.get_response = get_response
         
@@ -21,38 +35,87 @@ class EmailVerificationMiddleware:
             reverse('accounts:register_artist'),
             reverse('accounts:resend_verification'),
             '/admin/',
+            settings.STATIC_URL,
+            settings.MEDIA_URL,
         ]
+        prefixes = '|'.join(re.escape(url) for url in self.exempt_urls if url)
+        # Also exempt verification URLs
+        self.exempt = re.compile(rf'^(?:{prefixes})|verify')
+        self.message = (
+            'Please verify your email address to access all features. '
+            '<a href="{}">Resend verification email</a>'.format(reverse('accounts:resend_verification'))
+        )
     
     def __call__(self, request):
-        # Check if user is authenticated and email is not verified
-        if request.user.is_authenticated and not request.user.email_verified:
-            
-            # Check if current path is exempt
-            path = request.path
-            is_exempt = any(path.startswith(url) for url in self.exempt_urls)
-            
-            # Also exempt verification URLs
-            if 'verify' in path:
-                is_exempt = True
-            
-            if not is_exempt:
-                # Show reminder message once per session
-                if not request.session.get('email_verification_reminder_shown', False):
-                    messages.warning(
-                        request,
-                        'Please verify your email address to access all features. '
-                        '<a href="{}">Resend verification email</a>'.format(
-                            reverse('accounts:resend_verification')
-                        )
-                    )
-                    request.session['email_verification_reminder_shown'] = True
-        
-        response = self.get_response(request)
-        return response
+        if not self.exempt.search(request.path):
+            self.check(request)
+        return self.get_response(request)
+
+    def check(self, request):
+        session = request.session
+        user_id = session.get(SESSION_KEY)
+        # Anonymous, already reminded this session, or known to be verified
+        if user_id is None or session.get(self.REMINDER_SHOWN_KEY) or session.get(self.VERIFIED_KEY) == user_id:
+            return
+        user = request.user
+        if not user.is_authenticated:  # stale session, e.g. the password changed
+            return
+        if user.email_verified:
+            session[self.VERIFIED_KEY] = user_id
+        else:
+            # Show reminder message once per session
+            messages.warning(request, self.message)
+            session[self.REMINDER_SHOWN_KEY] = True
 
 
 # To activate this middleware, add to settings.py:
 # MIDDLEWARE = [
 #     # ... other middleware
 #     'accounts.middleware.EmailVerificationMiddleware',
-# ]
\ No newline at end of file
+# ]
+
+class RollingSessionMiddleware:
+    """
+    Extend the session's expiry at most once per SESSION_REFRESH_INTERVAL.
+
+    Replaces SESSION_SAVE_EVERY_REQUEST, which rewrote the session on every
+    page view. Saving the session is what pushes its expiry (and the cookie's
+    max-age) forward, so an active visitor keeps their session while the
+    store is written once an hour instead of once a request. Requests
+    without a session cookie are left alone so no session is started.
+    Goes after SessionMiddleware.
+    """
+
+    REFRESHED_KEY = '_session_refreshed_at'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 3600)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.refresh(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # Reading the session may load it from the database.
+        await sync_to_async(self.refresh)(request)
+        return response
+
+    def refresh(self, request):
+        session = getattr(request, 'session', None)
+        if session is None or settings.SESSION_COOKIE_NAME not in request.COOKIES or session.modified:
+            return
+        refreshed = session.get(self.REFRESHED_KEY)
+        now = int(time.time())
+        # session_key is None when the cookie named a session that no longer exists.
+        if session.session_key and (refreshed is None or now - refreshed >= self.interval):
+            session[self.REFRESHED_KEY] = now
@@ -0,0 +1,72 @@
+# accounts/sessions.py
+"""
+Session engine that keeps anonymous sessions in the cache and logged-in
+sessions in the database.
+
+Most sessions belong to anonymous visitors (a cart, a message, a CSRF
+rotation) and do not need to survive a cache flush badly enough to justify
+a row write; losing one costs the visitor their anonymous cart at worst.
+Logged-in sessions stay in ``django_session`` so a cache restart does not
+sign everyone out. Logging in cycles the session key, which moves the
+session from the cache to the database; logging out flushes it.
+
+Only use it with a cache shared by all workers (``REDIS_URL``); with the
+per-process locmem cache anonymous sessions would not survive a request
+landing on another worker.
+
+    SESSION_ENGINE = 'accounts.sessions'
+"""
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+KEY_PREFIX = 'accounts.sessions.'
+
+
+class SessionStore(DBStore):
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self._cache_key(self._get_or_create_session_key())
+
+    def _cache_key(self, session_key):
+        return KEY_PREFIX + session_key
+
+    def load(self):
+        if self.session_key is not None:
+            data = self._cache.get(self._cache_key(self.session_key))
+            if data is not None:
+                return data
+        return super().load()
+
+    def exists(self, session_key):
+        return self._cache.has_key(self._cache_key(session_key)) or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if SESSION_KEY in data:
+            # Logging in cycles the key into the cache first; the row doesn't exist yet.
+            must_create = must_create or self._cache.has_key(self.cache_key)
+            super().save(must_create=must_create)
+            self._cache.delete(self.cache_key)
+            return
+        if must_create:
+            if super().exists(self.session_key) or not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self._cache_key(session_key))
+        super().delete(session_key)
@@ -6,7 +6,6 @@ from django.contrib import messages
 from django.views.generic import DetailView, UpdateView
 from django.urls import reverse_lazy, reverse
 from django.db import transaction
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
@@ -14,6 +13,7 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.views import View
 from django.http import HttpResponse
 from orders.models import Order 
+from emails.mailqueue import enqueue
 from django.db.models import Sum, Q, F, DecimalField, ExpressionWrapper
 
 from .forms import (
@@ -44,14 +44,13 @@ def send_verification_email(request, user):
         'verification_link': verification_link,
     })
     
-    # Send email
-    send_mail(
+    # Queue the email; send_queued_email delivers it outside the request
+    enqueue(
         subject,
         message,
-        'noreply@jerseyartwork.je',
         [user.email],
-        html_message=message,
-        fail_silently=False,
+        from_email='noreply@jerseyartwork.je',
+        html_body=message,
     )
 
 
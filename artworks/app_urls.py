@@ -1,6 +1,6 @@
 from django.urls import path
-from django.views.generic import TemplateView
 from . import views
+from .conditional import StaticPageView
 
 app_name = "artworks"
 
@@ -12,10 +12,10 @@ urlpatterns = [
     path("my-artworks/", views.my_artworks, name="my_artworks"),
     
     # Additional pages
-    path("about/", views.about, name="about"),
+    path("about/", StaticPageView.as_view(template_name="artworks/about.html"), name="about"),
     path("contact/", views.contact, name="contact"),
     path("artists/", views.artists_list, name="artists"),
-    path("privacy/", TemplateView.as_view(template_name="artworks/privacy.html"), name="privacy"),
-    path("terms/", TemplateView.as_view(template_name="artworks/terms.html"), name="terms"),
-    path("refund-policy/", TemplateView.as_view(template_name="artworks/refund.html"), name="refund_policy"),
+    path("privacy/", StaticPageView.as_view(template_name="artworks/privacy.html"), name="privacy"),
+    path("terms/", StaticPageView.as_view(template_name="artworks/terms.html"), name="terms"),
+    path("refund-policy/", StaticPageView.as_view(template_name="artworks/refund.html"), name="refund_policy"),
 ]
\ No newline at end of file
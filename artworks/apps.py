@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ArtworksConfig(AppConfig):
+    name = 'artworks'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,8 +1,37 @@
 """
 ASGI config for Jersey Artwork project.
+
+Serve with an ASGI server, e.g. ``uvicorn artworks.asgi:application``.
+The home, gallery, artwork detail, cart summary and SumUp checkout views
+are async; the checkout waits on the PSP without holding a thread.
+
+Persistent connections are turned off for every database here
+(``CONN_MAX_AGE=0``, with a warning if ``DB_CONN_MAX_AGE`` explicitly asked
+for more): Django runs each ASGI request in its own thread-sensitive
+context, so a kept connection is never reused and they pile up until
+PostgreSQL refuses more. Set ``DB_POOL_MAX_SIZE`` (Django 5.1+) to share a
+pool between requests instead.
 """
+import logging
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'artworks.settings')
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (settings are configured by get_asgi_application)
+
+# Before the first query: connections read their settings dict when they open.
+for alias, database in settings.DATABASES.items():
+    if not database.get('CONN_MAX_AGE'):
+        continue
+    if 'DB_CONN_MAX_AGE' in os.environ:
+        logging.getLogger(__name__).warning(
+            "CONN_MAX_AGE=%s for %r ignored under ASGI; each request would keep a connection of its own",
+            database['CONN_MAX_AGE'], alias,
+        )
+    database['CONN_MAX_AGE'] = 0
+
+if settings.TEMPLATE_PREWARM:
+    from artworks.templating import prewarm  # noqa: E402
+    prewarm()
@@ -0,0 +1,47 @@
+# artworks/backends/postgresql/base.py
+"""
+Django's PostgreSQL backend, reporting connection use to /metrics/
+(see ``artworks.metrics.ConnectionStats``). Everything else - persistent
+connections, health checks and, on Django 5.1+, psycopg's pool - is the
+stock backend's.
+"""
+import time
+
+from django.db.backends.postgresql import base
+
+from artworks.metrics import connection_stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checked_out = False
+
+    def get_new_connection(self, conn_params):
+        # With a pool configured this is a checkout from the pool, not a new connection.
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        connection_stats.record_open(time.perf_counter() - started)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            connection_stats.record_close()
+        return super()._close()
+
+    def _cursor(self, name=None):
+        if self.checked_out:
+            return super()._cursor(name)
+        # The first cursor of a request pays for any health check, reconnect or pool wait.
+        started = time.perf_counter()
+        cursor = super()._cursor(name)
+        self.checked_out = True
+        connection_stats.record_checkout(time.perf_counter() - started)
+        return cursor
+
+    def close_if_unusable_or_obsolete(self):
+        # Called at the start and end of every request.
+        super().close_if_unusable_or_obsolete()
+        if self.checked_out:
+            self.checked_out = False
+            connection_stats.record_release()
@@ -0,0 +1,270 @@
+# artworks/benchmarking.py
+"""
+Repeatable benchmarks for the storefront hot paths.
+
+Each scenario is one request made through Django's test client against the
+configured database, so the numbers include URL routing, middleware, ORM
+and template rendering but not the network or the WSGI server. Point it at
+a seeded dataset (``manage.py seed_data``); on an empty database the pages
+have nothing to render.
+
+Every request runs inside a transaction that is rolled back, so scenarios
+that write (adding to the cart) measure the same work on every iteration
+and leave the data as it was. Latency is timed with the query log off;
+query counts come from one separate captured pass. A scenario that doesn't
+answer 2xx or 3xx (say a 500 from a template error) is reported as failed,
+untimed: the cost of Django's error page is no baseline.
+"""
+import datetime
+import math
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts.models import User
+from artworks.models import Artwork, Category
+from cart.models import Cart, CartItem
+from orders.models import Order, OrderItem
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = 'get'
+    data: dict = field(default_factory=dict)
+    # None for an anonymous visitor, otherwise a key of Subjects.users
+    user: str = None
+
+
+@dataclass
+class Subjects:
+    """The rows the scenarios request; chosen to be among the busiest in the dataset."""
+    users: dict
+    artwork_id: int
+    addable_id: int
+    category_slug: str
+    artist_id: int
+
+    def describe(self):
+        return {
+            'users': {role: user.username for role, user in self.users.items()},
+            'artwork_id': self.artwork_id,
+            'addable_id': self.addable_id,
+            'category_slug': self.category_slug,
+            'artist_id': self.artist_id,
+        }
+
+
+def pick_subjects():
+    listed = Artwork.objects.filter(status='active', is_available=True)
+    customer_id = (
+        Cart.objects.filter(is_active=True, user__isnull=False, items__isnull=False)
+        .values('user_id')
+        .annotate(orders=Count('user__orders', filter=~Q(user__orders__status='pending'), distinct=True))
+        .order_by('-orders')
+        .values_list('user_id', flat=True)
+        .first()
+    )
+    artist_id = (
+        OrderItem.objects.filter(order__is_paid=True)
+        .values('artwork__artist_id')
+        .annotate(sold=Count('id'))
+        .order_by('-sold')
+        .values_list('artwork__artist_id', flat=True)
+        .first()
+    )
+    if customer_id is None or artist_id is None:
+        raise ValueError(
+            "No customer with an active cart or artist with paid orders; seed the database first "
+            "(manage.py seed_data)."
+        )
+    artwork_id = listed.order_by('-views').values_list('pk', flat=True).first()
+    in_cart = CartItem.objects.filter(cart__user_id=customer_id, cart__is_active=True).values('artwork_id')
+    addable_id = listed.filter(stock_quantity__gt=0).exclude(pk__in=in_cart).values_list('pk', flat=True).first()
+    category_slug = (
+        Category.objects.annotate(listed=Count('artworks', filter=Q(artworks__status='active', artworks__is_available=True)))
+        .order_by('-listed')
+        .values_list('slug', flat=True)
+        .first()
+    )
+    return Subjects(
+        users={
+            'customer': User.objects.get(pk=customer_id),
+            'artist': User.objects.get(pk=artist_id),
+        },
+        artwork_id=artwork_id,
+        addable_id=addable_id or artwork_id,
+        category_slug=category_slug or '',
+        artist_id=artist_id,
+    )
+
+
+def scenarios(subjects):
+    return [
+        Scenario('home', '/'),
+        Scenario('gallery', '/gallery/'),
+        Scenario('gallery price low', '/gallery/?sort=price_low'),
+        Scenario('gallery price high', '/gallery/?sort=price_high'),
+        Scenario('gallery category', f'/gallery/?category={subjects.category_slug}'),
+        Scenario('gallery artist', f'/gallery/?artist={subjects.artist_id}'),
+        Scenario('artwork detail', f'/artwork/{subjects.artwork_id}/'),
+        Scenario('cart', '/cart/', user='customer'),
+        Scenario('add to cart', f'/cart/add/{subjects.addable_id}/', method='post', data={'quantity': 1}, user='customer'),
+        Scenario('checkout', '/payments/checkout/', user='customer'),
+        Scenario('customer orders', '/orders/my-orders/', user='customer'),
+        Scenario('artist dashboard', '/orders/artist/dashboard/', user='artist'),
+        Scenario('artist statistics', '/orders/artist/statistics/?period=30', user='artist'),
+        Scenario('artist sales report', '/orders/artist/sales-report/', user='artist'),
+    ]
+
+
+def percentile(ordered, p):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Benchmark:
+    def __init__(self, iterations=30, warmup=3, only=None, stdout=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.only = only
+        self.stdout = stdout
+        self.clients = {}
+
+    def client_for(self, role, subjects):
+        if role not in self.clients:
+            # A broken page is reported as a failed scenario rather than ending the run.
+            client = Client(raise_request_exception=False)
+            if role is not None:
+                client.force_login(subjects.users[role])
+            self.clients[role] = client
+        return self.clients[role]
+
+    def request(self, scenario, client):
+        with transaction.atomic():
+            response = getattr(client, scenario.method)(scenario.path, scenario.data)
+            size = _body_size(response)
+            transaction.set_rollback(True)
+        return response, size
+
+    def measure(self, scenario, client):
+        for _ in range(self.warmup):
+            self.request(scenario, client)
+
+        with CaptureQueriesContext(connection) as queries:
+            response, size = self.request(scenario, client)
+        query_count = len(queries)
+        if not 200 <= response.status_code < 400:
+            return {
+                'path': scenario.path,
+                'method': scenario.method.upper(),
+                'user': scenario.user,
+                'status': response.status_code,
+                'failed': True,
+            }
+
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            self.request(scenario, client)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return {
+            'path': scenario.path,
+            'method': scenario.method.upper(),
+            'user': scenario.user,
+            'status': response.status_code,
+            'bytes': size,
+            'queries': query_count,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p90_ms': round(percentile(timings, 90), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'max_ms': round(timings[-1], 3),
+        }
+
+    def run(self):
+        subjects = pick_subjects()
+        results = {}
+        failed = {}
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for scenario in scenarios(subjects):
+                if self.only and not any(term in scenario.name for term in self.only):
+                    continue
+                result = self.measure(scenario, self.client_for(scenario.user, subjects))
+                (failed if result.get('failed') else results)[scenario.name] = result
+                if self.stdout:
+                    self.stdout.write(format_row(scenario.name, result))
+        return {
+            'meta': {
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'debug': settings.DEBUG,
+                'dataset': {
+                    'artworks': Artwork.objects.count(),
+                    'orders': Order.objects.count(),
+                    'users': User.objects.count(),
+                },
+                'subjects': subjects.describe(),
+            },
+            'results': results,
+            'failed': failed,
+        }
+
+
+def format_row(name, result):
+    if result.get('failed'):
+        return f"{name:<22} {result['status']:>3} FAILED {result['method']} {result['path']}"
+    return (
+        f"{name:<22} {result['status']:>3} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} "
+        f"{result['p99_ms']:>9.2f} {result['queries']:>7} {result['bytes']:>10}"
+    )
+
+
+HEADER = f"{'scenario':<22} {'st':>3} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'queries':>7} {'bytes':>10}"
+
+
+def compare(current, baseline, threshold=0.2, min_delta_ms=1.0):
+    """
+    Regressions of ``current`` against ``baseline`` as (scenario, message) pairs.
+
+    Latency regresses when a percentile grows by more than ``threshold``
+    (a fraction) and by at least ``min_delta_ms``, so sub-millisecond noise
+    on fast pages is not flagged. Query counts are deterministic for a given
+    dataset, so any increase is a regression; response size uses the ratio.
+    """
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p90_ms'):
+            delta = now[metric] - before[metric]
+            if delta >= min_delta_ms and now[metric] > before[metric] * (1 + threshold):
+                regressions.append((name, f"{metric} {before[metric]:.2f} -> {now[metric]:.2f}"))
+        if now['queries'] > before['queries']:
+            regressions.append((name, f"queries {before['queries']} -> {now['queries']}"))
+        if now['bytes'] > before['bytes'] * (1 + threshold):
+            regressions.append((name, f"bytes {before['bytes']} -> {now['bytes']}"))
+        if now['status'] != before['status']:
+            regressions.append((name, f"status {before['status']} -> {now['status']}"))
+    return regressions
@@ -0,0 +1,95 @@
+# artworks/caching.py
+"""
+Per-object cache version counters. Cache keys for anything derived from an
+artwork include its version, so bumping the counter invalidates every such
+entry at once without having to know the keys. Counters start at the
+current time in nanoseconds rather than at 1, so one evicted from the cache
+starts again ahead of every key built on it, instead of matching the keys
+of entries cached before its last bumps.
+
+The catalogue as a whole (every listed artwork, category and artist) has a
+version too, which pages listing many artworks build their validators on.
+
+``catalogue_changed`` is the one call for code that changes what the
+storefront shows: it bumps both kinds of version and drops the cached
+pages (``artworks.pagecache``) of the artworks and of the listings.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .pagecache import invalidate_pages
+
+VERSION_TIMEOUT = None  # counters never expire on their own
+CATALOGUE_VERSION_KEY = 'v:catalogue'
+
+
+def _version_key(kind, pk):
+    return f"v:{kind}:{pk}"
+
+
+def get_version(kind, pk):
+    return cache.get_or_set(_version_key(kind, pk), time.time_ns, timeout=VERSION_TIMEOUT)
+
+
+def get_versions(kind, pks):
+    """{pk: version} in one cache round trip, starting counters that don't exist yet."""
+    keys = {_version_key(kind, pk): pk for pk in pks}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        start = time.time_ns()
+        for key in missing:
+            # add, so a worker starting the same counter concurrently wins or loses as a whole
+            cache.add(key, start, timeout=VERSION_TIMEOUT)
+        found.update(cache.get_many(missing))
+    # Under a dummy cache nothing sticks, and nothing built on the version is kept either.
+    return {pk: found.get(key) or time.time_ns() for key, pk in keys.items()}
+
+
+def bump_versions(kind, pks):
+    for pk in pks:
+        key = _version_key(kind, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not cached yet (or evicted): start again ahead of any key built on it.
+            cache.add(key, time.time_ns(), timeout=VERSION_TIMEOUT)
+
+
+def catalogue_version():
+    """
+    When the catalogue last changed, as a UNIX timestamp. A time rather than
+    a counter so that a version lost from the cache starts again ahead of
+    every ETag built on the old one, and doubles as Last-Modified.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, time.time(), timeout=VERSION_TIMEOUT)
+        # Another process may have added its own first; under a dummy cache nothing sticks.
+        version = cache.get(CATALOGUE_VERSION_KEY) or time.time()
+    return version
+
+
+def bump_catalogue():
+    cache.set(CATALOGUE_VERSION_KEY, time.time(), timeout=VERSION_TIMEOUT)
+
+
+def catalogue_changed(artwork_pks=()):
+    """Invalidate everything derived from these artworks, and from the catalogue as a whole."""
+    artwork_pks = list(artwork_pks)
+    bump_versions('artwork', artwork_pks)
+    bump_catalogue()
+    invalidate_pages(['catalogue', *(f"artwork:{pk}" for pk in artwork_pks)])
+
+
+def fragment_key(name, pk, updated_at, version):
+    stamp = int(updated_at.timestamp() * 1000000) if updated_at else 0
+    return f"fragment:{name}:{pk}:{stamp}:{version}"
+
+
+def fragment_timeout():
+    # Versions make entries stale immediately; the timeout only bounds how long
+    # a fragment survives a template change that no save accompanied.
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
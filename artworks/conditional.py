@@ -0,0 +1,148 @@
+# artworks/conditional.py
+"""
+Conditional GET for catalogue pages, and static pages served from memory.
+
+``conditional_page(state)`` gives a view an ETag and Last-Modified built
+from ``state(request, *args, **kwargs)``, which returns the values the page
+is derived from and when they last changed (or None to leave the request
+alone, e.g. for a missing artwork so the view can 404)::
+
+    @conditional_page(artwork_state)
+    async def artwork_detail(request, pk): ...
+
+A browser or CDN revalidating with If-None-Match / If-Modified-Since then
+gets a 304 without the view running. Validators also cover the project's
+templates (``template_fingerprint``) so a deploy invalidates them, and the
+CSRF cookie, since forms on the page carry a token derived from it.
+
+Only visitors without a session get validators: for anyone else the page
+header shows their account, cart or messages, which no catalogue version
+covers, so they always get a fresh page. Nobody gets them unless
+``CONDITIONAL_PAGES`` is set (the default with a shared cache): the
+catalogue versions live in the cache, and a per-process one would keep
+answering 304 in every worker but the one that saw the change.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.generic import TemplateView
+
+from .caching import catalogue_version, get_version
+from .models import Artwork
+from .templating import template_fingerprint
+
+MESSAGES_COOKIE_NAME = 'messages'
+
+
+def shared_page(request):
+    """Whether this visitor sees the same page as every other visitor without a session."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and MESSAGES_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def validators(request, parts, changed):
+    """(ETag, Last-Modified timestamp) of a page derived from ``parts`` and last changed at ``changed``."""
+    digest, templates_changed = template_fingerprint()
+    key = '|'.join(str(part) for part in [*parts, digest, request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')])
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest()), int(max(changed, templates_changed))
+
+
+def stamp(response, etag, last_modified):
+    if response.status_code not in (200, 304):
+        return response
+    if not response.has_header('ETag'):
+        response['ETag'] = etag
+    if not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified)
+    # Stored by browsers and shared caches, but checked with us before each use.
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def conditional_page(state):
+    def page_validators(request, args, kwargs):
+        if not settings.CONDITIONAL_PAGES or not shared_page(request):
+            return None
+        found = state(request, *args, **kwargs)
+        return validators(request, *found) if found is not None else None
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def ainner(request, *args, **kwargs):
+                found = await sync_to_async(page_validators)(request, args, kwargs)
+                if found is None:
+                    return await view(request, *args, **kwargs)
+                response = get_conditional_response(request, *found)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return stamp(response, *found)
+            return ainner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            found = page_validators(request, args, kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            response = get_conditional_response(request, *found)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return stamp(response, *found)
+        return inner
+    return decorator
+
+
+def catalogue_state(request, *args, **kwargs):
+    """Validators for listing pages: the catalogue version and the query string."""
+    version = catalogue_version()
+    return [request.path, request.GET.urlencode(), version], version
+
+
+def artwork_state(request, pk):
+    """Validators for an artwork's page: its updated_at and fragment version."""
+    updated_at = Artwork.objects.filter(pk=pk, status='active').values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    # The catalogue version moves whenever this artwork's version does, so
+    # Last-Modified follows changes to its images, category and artist too.
+    return [pk, updated_at.timestamp(), get_version('artwork', pk)], max(updated_at.timestamp(), catalogue_version())
+
+
+class StaticPageView(TemplateView):
+    """
+    A page with no data of its own (about, the legal pages). Visitors without
+    a session get a copy rendered once per process and kept in memory, with
+    cache headers that let browsers and CDNs keep it for
+    ``STATIC_PAGE_MAX_AGE``; anyone else gets an ordinary render.
+    """
+
+    _rendered = {}  # {(template name, template digest): (content, content type, ETag)}
+
+    def get(self, request, *args, **kwargs):
+        if not shared_page(request):
+            return super().get(request, *args, **kwargs)
+        digest, changed = template_fingerprint()
+        key = (self.template_name, digest)
+        if key not in self._rendered:
+            page = super().get(request, *args, **kwargs).render()
+            etag = quote_etag(hashlib.sha1(page.content).hexdigest())
+            self._rendered[key] = (page.content, page['Content-Type'], etag)
+        content, content_type, etag = self._rendered[key]
+        last_modified = int(changed)
+        response = get_conditional_response(request, etag, last_modified)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=settings.STATIC_PAGE_MAX_AGE)
+        patch_vary_headers(response, ['Cookie'])
+        return response
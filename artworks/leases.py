@@ -0,0 +1,101 @@
+# artworks/leases.py
+"""
+Batch workers over a table leased with ``SELECT ... FOR UPDATE SKIP LOCKED``.
+
+The billing runner, the order outbox, the mail queue and campaign sending
+all work the same way: claim a batch of due rows by stamping
+``claimed_until``/``claimed_by`` on them, so other workers skip them until
+the lease runs out, process it, then write the results back only to rows
+this worker still holds. ``LeaseWorker`` is that loop; a subclass sets
+``model`` and ``order_by`` and supplies ``pending()`` and ``run_once()``.
+"""
+import datetime
+import os
+import socket
+import time
+from dataclasses import dataclass, fields
+
+from django.db import transaction
+from django.utils import timezone
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class LeaseSummary:
+    """Counts for a run; subclasses add fields, which ``add()`` sums (or extends, for lists)."""
+    claimed: int = 0
+
+    def add(self, other):
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, list):
+                value.extend(getattr(other, f.name))
+            else:
+                setattr(self, f.name, value + getattr(other, f.name))
+
+
+class LeaseWorker:
+    model = None
+    order_by = ("pk",)
+    summary_class = LeaseSummary
+
+    def __init__(self, batch_size, lease_seconds, worker_id=None):
+        self.batch_size = batch_size
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.worker_id = worker_id or default_worker_id()
+
+    def pending(self, now):
+        """Rows that are due and not leased (or whose lease has run out)."""
+        raise NotImplementedError
+
+    def claim(self):
+        """Lease up to ``batch_size`` pending rows to this worker; returns their pks."""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                self.pending(now)
+                .select_for_update(skip_locked=True)
+                .order_by(*self.order_by)
+                .values_list("pk", flat=True)[:self.batch_size]
+            )
+            if ids:
+                self.lease_rows(self.model.objects.filter(pk__in=ids), now)
+        return ids
+
+    def lease_rows(self, rows, now):
+        rows.update(claimed_until=now + self.lease, claimed_by=self.worker_id)
+
+    def held(self):
+        """Rows this worker still holds; results must only be written through this."""
+        return self.model.objects.filter(claimed_by=self.worker_id)
+
+    def run_once(self):
+        """Claim and process one batch; returns a summary."""
+        raise NotImplementedError
+
+    def stopping(self):
+        """Checked before each batch; True ends the run early."""
+        return False
+
+    def report(self, summary, seconds):
+        pass
+
+    def run(self, max_batches=None, max_seconds=None):
+        summary = self.summary_class()
+        started = time.monotonic()
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                break
+            if self.stopping():
+                break
+            batch = self.run_once()
+            batches += 1
+            summary.add(batch)
+            if batch.claimed < self.batch_size:
+                break
+        self.report(summary, time.monotonic() - started)
+        return summary
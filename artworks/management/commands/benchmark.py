@@ -0,0 +1,80 @@
+# artworks/management/commands/benchmark.py
+# Measure the storefront hot paths and compare against a stored run, e.g.
+#   python manage.py seed_data --scale medium
+#   python manage.py benchmark --output bench/baseline.json
+#   ... change something ...
+#   python manage.py benchmark --baseline bench/baseline.json --threshold 0.2
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from artworks.benchmarking import HEADER, Benchmark, compare
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, query count and response size of the storefront hot paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario first')
+        parser.add_argument('--only', action='append', help='Run scenarios whose name contains this (repeatable)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Flag a latency or size increase beyond this fraction of the baseline (default 0.2)'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=1.0,
+            help='Ignore latency increases smaller than this many milliseconds'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        self.stdout.write(HEADER)
+        benchmark = Benchmark(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            only=options['only'],
+            stdout=self.stdout,
+        )
+        try:
+            results = benchmark.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if results['failed']:
+            # Left out of the results (and so of any baseline written above).
+            raise CommandError(
+                f"{len(results['failed'])} scenario(s) failed: "
+                + ', '.join(f"{name} ({result['status']})" for name, result in results['failed'].items())
+            )
+        if baseline is None:
+            return
+        if baseline['meta'].get('dataset') != results['meta']['dataset']:
+            self.stderr.write(self.style.WARNING(
+                f"Baseline dataset {baseline['meta'].get('dataset')} differs from {results['meta']['dataset']}; "
+                "query counts and sizes may not be comparable"
+            ))
+        regressions = compare(results, baseline, options['threshold'], options['min_delta_ms'])
+        for name, message in regressions:
+            self.stdout.write(self.style.ERROR(f"REGRESSION {name}: {message}"))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,88 @@
+# artworks/management/commands/benchmark_connections.py
+# What connecting to the database on every request costs the gallery, against
+# keeping the connection between requests:
+#   python manage.py benchmark_connections --iterations 200
+# Run it against the real database server; the saving is mostly network and
+# authentication round trips, which a local socket understates.
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from artworks.benchmarking import percentile
+
+MODES = [
+    ('per request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent', {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent + health checks', {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': True}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare gallery latency with a new database connection per request and with kept connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--path', default=None, help='Page to request (default: the gallery)')
+
+    def handle(self, *args, **options):
+        path = options['path'] or reverse('artworks:gallery')
+        pooled = 'pool' in connection.settings_dict.get('OPTIONS', {})
+        modes = [('pool (as configured)', {})] if pooled else MODES
+
+        connects = []
+        get_new_connection = connection.get_new_connection
+
+        def timed_connect(conn_params):
+            started = time.perf_counter()
+            try:
+                return get_new_connection(conn_params)
+            finally:
+                connects.append(time.perf_counter() - started)
+
+        original = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        connection.get_new_connection = timed_connect
+        client = Client(raise_request_exception=False)
+        self.stdout.write(f"GET {path} on {connection.vendor}, {options['iterations']} requests per mode\n")
+        self.stdout.write(
+            f"{'mode':<28} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'connects':>9} {'connect ms/req':>15}"
+        )
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts):
+                self.measure(client, path, modes, connects, options)
+        finally:
+            del connection.get_new_connection
+            connection.settings_dict.update(original)
+            connection.close()
+
+    def request(self, client, path):
+        # The test client leaves connections alone between requests; a real
+        # handler runs this on request_started and request_finished.
+        close_old_connections()
+        client.get(path)
+        close_old_connections()
+
+    def measure(self, client, path, modes, connects, options):
+        for label, overrides in modes:
+            connection.settings_dict.update(overrides)
+            connection.close()
+            for _ in range(options['warmup']):
+                self.request(client, path)
+            connects.clear()
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                self.request(client, path)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{label:<28} {sum(timings) / len(timings):>8.2f} {percentile(timings, 50):>8.2f} "
+                f"{percentile(timings, 95):>8.2f} {len(connects):>9} "
+                f"{sum(connects) * 1000 / len(timings):>15.3f}"
+            )
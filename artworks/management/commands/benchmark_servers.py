@@ -0,0 +1,203 @@
+# artworks/management/commands/benchmark_servers.py
+# How much concurrent traffic one server process handles under ASGI (uvicorn,
+# async views) against WSGI with a fixed pool of request threads, which is
+# what a gunicorn gthread worker does:
+#   python manage.py benchmark_servers --concurrency 1 10 50 --seconds 10
+#   python manage.py benchmark_servers --checkout --psp-latency-ms 300
+# --checkout requests /payments/process/sumup/ with live checkouts against a
+# local fake SumUp that takes --psp-latency-ms to answer: the case where WSGI
+# threads sit idle waiting on the PSP. Both servers use the configured
+# database; run it against the real one. Every request opens its own
+# connection, as wsgiref can't keep one alive, so neither server gains from
+# keep-alive.
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from importlib import import_module
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from artworks.benchmarking import percentile
+from orders.models import Order
+from payments.fakepsp import FakePSPConfig, FakePSPServer
+from payments.models import SumUpCheckout
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref's server with a fixed pool of request threads; requests beyond it wait in line."""
+
+    request_queue_size = 1024
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'Compare requests per second and latency under ASGI (uvicorn) and a thread-pool WSGI server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help='Page to request (default: the gallery)')
+        parser.add_argument('--checkout', action='store_true', help='Request the SumUp checkout view against a fake PSP')
+        parser.add_argument('--psp-latency-ms', type=float, default=200.0)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100])
+        parser.add_argument('--seconds', type=float, default=5.0, help='Load duration per concurrency level')
+        parser.add_argument('--threads', type=int, default=10, help='Request threads of the WSGI server')
+        parser.add_argument('--servers', nargs='+', choices=['asgi', 'wsgi'], default=['asgi', 'wsgi'])
+        parser.add_argument('--serve-wsgi', type=int, default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve_wsgi']:
+            return self.serve_wsgi(options['serve_wsgi'], options['threads'])
+
+        env = dict(os.environ)
+        cookies = {}
+        psp = order = session = None
+        if options['checkout']:
+            psp = FakePSPServer(config=FakePSPConfig(latency_ms=options['psp_latency_ms'])).start()
+            env.update(SUMUP_BASE_URL=psp.url, SUMUP_LIVE_CHECKOUTS='true')
+            order, session = self.checkout_fixture()
+            cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            path = reverse('payments:process_sumup')
+        else:
+            path = options['path'] or reverse('artworks:gallery')
+
+        self.stdout.write(f"GET {path}, {options['seconds']:g}s per level, one server process each")
+        self.stdout.write(f"{'server':<18} {'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        try:
+            for server in options['servers']:
+                port = free_port()
+                process = subprocess.Popen(self.command(server, port, options['threads']), cwd=settings.BASE_DIR, env=env)
+                label = 'asgi (uvicorn)' if server == 'asgi' else f"wsgi ({options['threads']} threads)"
+                try:
+                    url = f"http://127.0.0.1:{port}{path}"
+                    self.wait_until_up(url, process)
+                    for concurrency in options['concurrency']:
+                        timings, errors, elapsed = asyncio.run(self.load(url, concurrency, options['seconds'], cookies))
+                        timings.sort()
+                        self.stdout.write(
+                            f"{label:<18} {concurrency:>11} {len(timings) / elapsed:>8.1f} "
+                            f"{percentile(timings, 50) if timings else 0:>8.1f} "
+                            f"{percentile(timings, 95) if timings else 0:>8.1f} {errors:>7}"
+                        )
+                finally:
+                    process.terminate()
+                    process.wait(10)
+        finally:
+            if order is not None:
+                SumUpCheckout.objects.filter(order=order).delete()
+                order.delete()
+                session.delete()
+            if psp is not None:
+                psp.stop()
+
+    def command(self, server, port, threads):
+        if server == 'asgi':
+            return [
+                sys.executable, '-m', 'uvicorn', 'artworks.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--no-access-log', '--log-level', 'warning',
+            ]
+        return [
+            sys.executable, '-m', 'django', 'benchmark_servers', '--skip-checks',
+            '--serve-wsgi', str(port), '--threads', str(threads),
+        ]
+
+    def serve_wsgi(self, port, threads):
+        from artworks.wsgi import application
+
+        server = PooledWSGIServer(('127.0.0.1', port), threads)
+        server.set_app(application)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def checkout_fixture(self):
+        """A pending order and a session pointing at it, as the checkout form leaves them."""
+        order = Order.objects.create(
+            email='benchmark@example.com',
+            phone='01534000000',
+            delivery_first_name='Benchmark',
+            delivery_last_name='Visitor',
+            delivery_address_line_1='1 Benchmark Street',
+            delivery_parish='st_helier',
+            delivery_postcode='JE2 3AA',
+            subtotal=Decimal('95.00'),
+            shipping_cost=Decimal('5.00'),
+            total=Decimal('100.00'),
+        )
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session['pending_order_id'] = order.pk
+        session.save()
+        return order, session
+
+    def wait_until_up(self, url, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Server exited with status {process.returncode}")
+            try:
+                httpx.get(url, timeout=5)
+                return
+            except httpx.TransportError:
+                time.sleep(0.2)
+        raise CommandError(f"Server did not answer {url} within {timeout}s")
+
+    async def load(self, url, concurrency, seconds, cookies):
+        """Keep ``concurrency`` requests in flight for ``seconds``; (successful timings in ms, errors, elapsed)."""
+        timings = []
+        errors = 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+        async with httpx.AsyncClient(limits=limits, timeout=60, cookies=cookies) as client:
+            async def visitor():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    if response.status_code >= 400:
+                        errors += 1
+                    else:
+                        timings.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            deadline = started + seconds
+            await asyncio.gather(*(visitor() for _ in range(concurrency)))
+        return timings, errors, time.perf_counter() - started
@@ -0,0 +1,169 @@
+# artworks/management/commands/check_query_plans.py
+# Request the hot gallery/cart/order/refund pages through the test client,
+# EXPLAIN every SELECT they run and fail if any falls back to a sequential
+# scan on a big table, or if a page doesn't answer 2xx. Caches are replaced
+# by a dummy one so every page takes its cache-miss path. Everything runs in
+# a transaction that is rolled back. Run it against a database holding
+# production-sized data; on tiny tables every plan is a seq scan:
+#   python manage.py seed_data --scale large && python manage.py check_query_plans
+
+import json
+from contextlib import ExitStack
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from cart.models import Cart
+from orders.models import Order, OrderItem
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def _sample(queryset, field):
+    return queryset.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True).first()
+
+
+def hot_pages():
+    """(name, URL, visitor) for the pages whose queries must stay on indexes."""
+    gallery = reverse('artworks:gallery')
+    return [
+        ('home', reverse('artworks:home'), 'anonymous'),
+        ('gallery newest', gallery, 'anonymous'),
+        ('gallery price low', f"{gallery}?sort=price_low", 'anonymous'),
+        ('gallery price high', f"{gallery}?sort=price_high", 'anonymous'),
+        # cart.context_processors.cart_context, by session and by user
+        ('gallery with a session cart', gallery, 'session'),
+        ('customer orders', reverse('orders:my_orders'), 'customer'),
+        ('customer orders by status', f"{reverse('orders:my_orders')}?status=delivered", 'customer'),
+        ('artist dashboard', reverse('orders:artist_dashboard'), 'artist'),
+        ('artist orders', reverse('orders:artist_list'), 'artist'),
+        ('artist refunds', reverse('orders:artist_refund_list'), 'artist'),
+    ]
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk(child)
+
+
+def _estimated_rows(tables):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s)",
+            [list(tables)],
+        )
+        return dict(cursor.fetchall())
+
+
+def _explain(sql, analyze):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON{', ANALYZE' if analyze else ''}) {sql}")
+        plan = cursor.fetchone()[0]
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries the hot pages run and fail if any sequentially scans a large table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Ignore sequential scans on tables smaller than this; Postgres rightly prefers them there'
+        )
+        parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE and report execution time')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Query plans can only be checked on PostgreSQL.")
+
+        failures = []
+        with transaction.atomic(), override_settings(
+            CACHES=DUMMY_CACHES, PAGE_CACHE_TIMEOUT=0, CONDITIONAL_PAGES=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            clients = self.clients()
+            for name, url, visitor in hot_pages():
+                if clients.get(visitor) is None:
+                    self.stdout.write(self.style.WARNING(f"skip {name}: no {visitor} in this database"))
+                    continue
+                # Every alias, so reads the router sends to the replica are checked too.
+                with ExitStack() as stack:
+                    captured = [stack.enter_context(CaptureQueriesContext(db)) for db in connections.all()]
+                    response = clients[visitor].get(url)
+                if not 200 <= response.status_code < 300:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"FAIL {name}: {url} answered {response.status_code}"))
+                    continue
+                if not self.check_page(name, captured, options):
+                    failures.append(name)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot page(s) failed: {', '.join(failures)}")
+
+    def clients(self):
+        """A logged-out client, one with a cart in its session, and logged-in customer and artist clients."""
+        clients = {'anonymous': Client(raise_request_exception=False)}
+
+        session_key = _sample(Cart.objects.filter(is_active=True, items__isnull=False), 'session_key')
+        if session_key:
+            session = import_module(settings.SESSION_ENGINE).SessionStore(session_key=session_key)
+            session['check_query_plans'] = True
+            session.save()
+            clients['session'] = Client(raise_request_exception=False)
+            clients['session'].cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+        users = {
+            'customer': _sample(Order.objects.exclude(status='pending'), 'user_id'),
+            'artist': _sample(OrderItem.objects.filter(order__is_paid=True), 'artwork__artist_id'),
+        }
+        for visitor, pk in users.items():
+            if pk is not None:
+                clients[visitor] = Client(raise_request_exception=False)
+                clients[visitor].force_login(User.objects.get(pk=pk))
+        return clients
+
+    def check_page(self, name, captured, options):
+        """EXPLAIN each distinct SELECT the page ran; False if any seq-scanned a large table."""
+        statements = list(dict.fromkeys(
+            query['sql'] for context in captured for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ))
+        plans = [(sql, _explain(sql, options['analyze'])) for sql in statements]
+        tables = {node['Relation Name'] for _, explained in plans for node in _walk(explained['Plan'])
+                  if node.get('Relation Name')}
+        sizes = _estimated_rows(tables)
+
+        ok = True
+        indexes = set()
+        elapsed = 0.0
+        for sql, explained in plans:
+            nodes = list(_walk(explained['Plan']))
+            seq_scans = sorted({
+                node['Relation Name'] for node in nodes
+                if node['Node Type'] == 'Seq Scan' and sizes.get(node.get('Relation Name'), 0) >= options['min_rows']
+            })
+            indexes.update(node['Index Name'] for node in nodes if node.get('Index Name'))
+            elapsed += explained.get('Execution Time', 0.0)
+            if seq_scans:
+                ok = False
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: seq scan on {', '.join(seq_scans)}"))
+                self.stdout.write(f"     {sql[:500]}")
+            if options['verbose_plans'] or seq_scans:
+                self.stdout.write(json.dumps(explained['Plan'], indent=2))
+        if ok:
+            timing = f" {elapsed:.2f}ms" if options['analyze'] else ''
+            self.stdout.write(
+                f"ok   {name}: {len(statements)} queries, {', '.join(sorted(indexes)) or 'no index needed'}{timing}"
+            )
+        return ok
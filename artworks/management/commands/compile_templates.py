@@ -0,0 +1,58 @@
+# artworks/management/commands/compile_templates.py
+# Compile every template and time a render of each, slowest first, e.g.
+#   python manage.py compile_templates                 (fails on a syntax error)
+#   python manage.py compile_templates --slow-ms 20    (also fails on slow renders)
+from django.core.management.base import BaseCommand, CommandError
+
+from artworks.templating import compile_template, render_profile, sample_contexts, template_names
+
+
+class Command(BaseCommand):
+    help = 'Compile every template and report compile and render time per template'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5, help='Renders per template; the median is reported')
+        parser.add_argument('--slow-ms', type=float, default=None, help='Fail if a render takes longer than this')
+        parser.add_argument('--compile-only', action='store_true', help='Skip rendering')
+        parser.add_argument('--all', action='store_true', help='Include the templates of Django and installed packages')
+
+    def handle(self, *args, **options):
+        contexts = {} if options['compile_only'] else sample_contexts()
+        rows = []
+        broken = []
+        for name in template_names(project_only=not options['all']):
+            template, compile_seconds, error = compile_template(name)
+            if error is not None:
+                broken.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {error}"))
+                continue
+            row = {'name': name, 'compile_ms': compile_seconds * 1000, 'render_ms': None, 'bytes': None,
+                   'sample': name in contexts, 'error': None}
+            if not options['compile_only']:
+                try:
+                    seconds, size = render_profile(template, contexts.get(name, {}), options['iterations'])
+                    row.update(render_ms=seconds * 1000, bytes=size)
+                except Exception as e:  # templates rendered without their view's context may not cope
+                    row['error'] = f"{type(e).__name__}: {e}"
+            rows.append(row)
+
+        rows.sort(key=lambda row: -(row['render_ms'] or 0))
+        self.stdout.write(f"{'template':<48} {'compile ms':>10} {'render ms':>10} {'bytes':>8}  context")
+        for row in rows:
+            render = f"{row['render_ms']:.2f}" if row['render_ms'] is not None else '-'
+            size = row['bytes'] if row['bytes'] is not None else '-'
+            context = 'sample' if row['sample'] else 'empty'
+            line = f"{row['name']:<48} {row['compile_ms']:>10.2f} {render:>10} {size:>8}  {context}"
+            if row['error']:
+                line = self.style.WARNING(f"{line}  render failed: {row['error'][:120]}")
+            elif options['slow_ms'] is not None and row['render_ms'] > options['slow_ms']:
+                line = self.style.ERROR(f"{line}  SLOW")
+            self.stdout.write(line)
+
+        slow = [row['name'] for row in rows
+                if options['slow_ms'] is not None and (row['render_ms'] or 0) > options['slow_ms']]
+        if broken:
+            raise CommandError(f"{len(broken)} template(s) failed to compile: {', '.join(broken)}")
+        if slow:
+            raise CommandError(f"{len(slow)} template(s) rendered slower than {options['slow_ms']}ms: {', '.join(slow)}")
+        self.stdout.write(self.style.SUCCESS(f"Compiled {len(rows)} templates"))
@@ -0,0 +1,386 @@
+# artworks/metrics.py
+"""
+Per-view request metrics, filled in by ``artworks.middleware.RequestMetricsMiddleware``
+and exposed in the Prometheus text format at ``/metrics/``.
+
+Every request adds to its view's request count and latency histogram.
+A sampled fraction (``REQUEST_METRICS_SAMPLE_RATE``) also records SQL
+query count and time, template render time and repeated queries: the same
+statement run more than once in one request, which is how an N+1 shows up.
+Statements are fingerprinted with their parameters left out and ``IN``
+lists collapsed, so ``WHERE id = %s`` for fifty different ids is one
+fingerprint executed fifty times.
+
+SQL run while a template renders (lazy querysets, ``{{ artwork.artist }}``)
+counts towards both the SQL and the template time.
+
+Database connection use is reported too when ``DATABASES`` uses the
+``artworks.backends.postgresql`` engine: connections opened and the time
+spent opening them, and how long each request waited for a usable
+connection (opening one, a health check, or a turn from the psycopg pool).
+
+Counters are kept per process and published to the cache every
+``PUBLISH_INTERVAL`` seconds, so a scrape answered by any worker reports
+every worker's counters under a ``worker`` (host:pid) label and
+``sum by (view)`` in PromQL gives the totals. That needs a cache shared
+by the workers (``REDIS_URL``); with the default per-process cache, run
+one worker or scrape each worker on its own port.
+"""
+import contextvars
+import copy
+import hashlib
+import hmac
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import base as template_base
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_FINGERPRINTS_PER_VIEW = 10
+PUBLISH_INTERVAL = 5.0  # seconds between a worker's snapshots in the cache
+WORKER_TIMEOUT = 60 * 60  # a worker that stops publishing drops out of the scrape after this long
+WORKERS_KEY = 'metrics:workers'
+
+_IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_active = contextvars.ContextVar('request_metrics', default=None)
+
+
+def fingerprint(sql):
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('IN (...)', sql)).strip()
+
+
+def fingerprint_id(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()[:10]
+
+
+class RequestRecorder:
+    """SQL and template timings for one sampled request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements = Counter()
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """{fingerprint: extra executions} for statements run more than once."""
+        return {statement: n - 1 for statement, n in self.statements.items() if n > 1}
+
+    def _wrap_connections(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+
+    def __enter__(self):
+        self._wrap_connections()
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.reset(self._token)
+        self._stack.close()
+
+    async def __aenter__(self):
+        # Connections are per thread: hook the ones of the thread the ORM runs
+        # in (one per request under ASGI), not the event loop's.
+        await sync_to_async(self._wrap_connections)()
+        self._token = _active.set(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        _active.reset(self._token)
+        await sync_to_async(self._stack.close)()
+
+
+_original_render = template_base.Template.render
+
+
+def _timed_render(self, context):
+    recorder = _active.get()
+    if recorder is None:
+        return _original_render(self, context)
+    # Included and extended templates render inside their parent; only the outermost is timed.
+    recorder._template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        recorder._template_depth -= 1
+        if not recorder._template_depth:
+            recorder.template_seconds += time.perf_counter() - start
+
+
+def install_template_timer():
+    template_base.Template.render = _timed_render
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.sampled = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.duplicate_queries = 0
+        self.fingerprints = Counter()
+
+
+class ConnectionStats:
+    """
+    Updated by ``artworks.backends.postgresql``. A connection is in use from
+    a request's first query until the request ends, and idle between
+    requests while it stays open for reuse.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.closed = 0
+        self.connect_seconds = 0.0
+        self.checkouts = 0
+        self.releases = 0
+        self.wait_seconds = 0.0
+
+    def record_open(self, seconds):
+        with self.lock:
+            self.opened += 1
+            self.connect_seconds += seconds
+
+    def record_close(self):
+        with self.lock:
+            self.closed += 1
+
+    def record_checkout(self, seconds):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+
+    def record_release(self):
+        with self.lock:
+            self.releases += 1
+
+    def snapshot(self):
+        with self.lock:
+            in_use = self.checkouts - self.releases
+            return {
+                'opened': self.opened,
+                'connect_seconds': self.connect_seconds,
+                'checkouts': self.checkouts,
+                'wait_seconds': self.wait_seconds,
+                'in_use': in_use,
+                'idle': max(0, self.opened - self.closed - in_use),
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+def _pool_stats():
+    """psycopg pool counters when Django (5.1+) is managing a pool, else {}."""
+    pool = getattr(connections['default'], 'pool', None)
+    return pool.get_stats() if pool is not None else {}
+
+
+def worker_id():
+    # Worked out on each call: workers forked from a preloading master share its import.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _worker_key(worker):
+    return f"metrics:worker:{worker}"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+        self.statements = {}
+        self.published = 0.0
+
+    def record(self, view, status, seconds, recorder=None):
+        with self.lock:
+            stats = self.views[view]
+            stats.requests += 1
+            if status >= 500:
+                stats.errors += 1
+            stats.latency_sum += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.latency_buckets[i] += 1
+            if recorder is None:
+                return
+            stats.sampled += 1
+            stats.queries += recorder.queries
+            stats.sql_seconds += recorder.sql_seconds
+            stats.template_seconds += recorder.template_seconds
+            for statement, extra in recorder.duplicates().items():
+                stats.duplicate_queries += extra
+                key = fingerprint_id(statement)
+                if key in stats.fingerprints or len(stats.fingerprints) < MAX_FINGERPRINTS_PER_VIEW:
+                    stats.fingerprints[key] += extra
+                    self.statements[key] = statement
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.statements.clear()
+
+    def snapshot(self):
+        """This worker's counters, as published to the cache."""
+        with self.lock:
+            views = copy.deepcopy(dict(self.views))
+            statements = dict(self.statements)
+        return {'views': views, 'statements': statements, 'db': connection_stats.snapshot(), 'pool': _pool_stats()}
+
+    def publish_due(self):
+        return time.monotonic() - self.published >= PUBLISH_INTERVAL
+
+    def publish(self):
+        """Put this worker's counters where a scrape answered by any worker finds them."""
+        self.published = time.monotonic()
+        worker = worker_id()
+        snapshot = self.snapshot()
+        cache.set(_worker_key(worker), snapshot, timeout=WORKER_TIMEOUT)
+        workers = cache.get(WORKERS_KEY, [])
+        if worker not in workers:
+            cache.set(WORKERS_KEY, [*workers, worker], timeout=None)
+        return worker, snapshot
+
+    def collect(self):
+        """{worker: snapshot} for every worker that published within WORKER_TIMEOUT, this one up to date."""
+        worker, own = self.publish()
+        workers = cache.get(WORKERS_KEY, [])
+        found = cache.get_many([_worker_key(w) for w in workers])
+        snapshots = {w: found[_worker_key(w)] for w in workers if _worker_key(w) in found}
+        if len(snapshots) < len(workers):
+            # Stopped workers; a live one dropped by a race adds itself back on its next publish.
+            cache.set(WORKERS_KEY, list(snapshots), timeout=None)
+        snapshots[worker] = own
+        return sorted(snapshots.items())
+
+    def render(self):
+        snapshots = self.collect()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for worker, labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in (('worker', worker),) + labels)
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        def per_view(value):
+            return [
+                (worker, (('view', view),), value(stats))
+                for worker, snapshot in snapshots for view, stats in sorted(snapshot['views'].items())
+            ]
+
+        metric('storefront_requests_total', 'counter', 'Requests handled, by view', per_view(lambda s: s.requests))
+        metric('storefront_request_errors_total', 'counter', 'Requests answered with a 5xx status',
+               per_view(lambda s: s.errors))
+
+        lines.append('# HELP storefront_request_duration_seconds Time spent in the middleware stack and view')
+        lines.append('# TYPE storefront_request_duration_seconds histogram')
+        for worker, snapshot in snapshots:
+            for view, stats in sorted(snapshot['views'].items()):
+                labels = f'worker="{_escape(worker)}",view="{_escape(view)}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    lines.append(f'storefront_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'storefront_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.requests}')
+                lines.append(f'storefront_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}')
+                lines.append(f'storefront_request_duration_seconds_count{{{labels}}} {stats.requests}')
+
+        metric('storefront_sampled_requests_total', 'counter', 'Requests whose SQL and templates were measured',
+               per_view(lambda s: s.sampled))
+        metric('storefront_sql_queries_total', 'counter', 'SQL queries run by sampled requests',
+               per_view(lambda s: s.queries))
+        metric('storefront_sql_seconds_total', 'counter', 'Time spent in SQL by sampled requests',
+               per_view(lambda s: f'{s.sql_seconds:.6f}'))
+        metric('storefront_template_seconds_total', 'counter', 'Time spent rendering templates by sampled requests',
+               per_view(lambda s: f'{s.template_seconds:.6f}'))
+        metric('storefront_duplicate_queries_total', 'counter',
+               'Repeated executions of a statement already run in the same sampled request',
+               per_view(lambda s: s.duplicate_queries))
+        metric('storefront_duplicate_query_fingerprint_total', 'counter',
+               'Repeated executions by statement fingerprint (statements listed below)',
+               [(worker, (('view', view), ('fingerprint', key)), n)
+                for worker, snapshot in snapshots for view, stats in sorted(snapshot['views'].items())
+                for key, n in stats.fingerprints.most_common()])
+        statements = {}
+        for _, snapshot in snapshots:
+            statements.update(snapshot['statements'])
+        for key, statement in sorted(statements.items()):
+            lines.append(f"# fingerprint {key}: {statement[:500]}")
+
+        databases = [(worker, snapshot['db']) for worker, snapshot in snapshots if snapshot['db']['checkouts']]
+        if databases:
+            metric('storefront_db_connections_opened_total', 'counter', 'Database connections opened',
+                   [(worker, (), db['opened']) for worker, db in databases])
+            metric('storefront_db_connect_seconds_total', 'counter', 'Time spent opening database connections',
+                   [(worker, (), f"{db['connect_seconds']:.6f}") for worker, db in databases])
+            metric('storefront_db_checkouts_total', 'counter', 'Requests (or commands) that used the database',
+                   [(worker, (), db['checkouts']) for worker, db in databases])
+            metric('storefront_db_wait_seconds_total', 'counter', 'Time spent getting a usable connection',
+                   [(worker, (), f"{db['wait_seconds']:.6f}") for worker, db in databases])
+            metric('storefront_db_connections', 'gauge', 'Open database connections by state',
+                   [(worker, (('state', state),), db[state]) for worker, db in databases for state in ('in_use', 'idle')])
+        pools = [(worker, snapshot['pool']) for worker, snapshot in snapshots if snapshot['pool']]
+        if pools:
+            metric('storefront_db_pool_connections', 'gauge', 'Connections held by the psycopg pool by state',
+                   [(worker, (('state', state),), pool.get(stat, 0))
+                    for worker, pool in pools for state, stat in (('total', 'pool_size'), ('available', 'pool_available'))])
+            metric('storefront_db_pool_waiting', 'gauge', 'Requests queued for a pool connection',
+                   [(worker, (), pool.get('requests_waiting', 0)) for worker, pool in pools])
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Open in DEBUG, otherwise for staff or a
+    request carrying ``Authorization: Bearer <REQUEST_METRICS_TOKEN>``.
+    """
+    token = getattr(settings, 'REQUEST_METRICS_TOKEN', '')
+    allowed = (
+        settings.DEBUG
+        or (request.user.is_authenticated and request.user.is_staff)
+        or (token and hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+        ))
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
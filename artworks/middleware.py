@@ -0,0 +1,238 @@
+# artworks/middleware.py
+
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import pagecache
+from .metrics import RequestRecorder, install_template_timer, registry
+from .querybudget import QueryTracker
+from .routers import PrimaryPinning, replica_configured
+
+logger = logging.getLogger('artworks.querybudget')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency for every request, and SQL query count/time, duplicate
+    queries and template render time for a sample of them, per resolved
+    view name (see ``artworks.metrics``).
+
+    With ``REQUEST_METRICS_HEADERS`` (on in DEBUG) sampled responses carry
+    the numbers as ``X-Metrics-*`` headers. Put it first in MIDDLEWARE so
+    the latency includes the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+        self.headers = getattr(settings, 'REQUEST_METRICS_HEADERS', settings.DEBUG)
+        if self.sample_rate > 0:
+            install_template_timer()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            with RequestRecorder() as recorder:
+                response = self.get_response(request)
+        else:
+            recorder = None
+            response = self.get_response(request)
+        response = self.record(request, response, time.perf_counter() - start, recorder)
+        if registry.publish_due():
+            registry.publish()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            async with RequestRecorder() as recorder:
+                response = await self.get_response(request)
+        else:
+            recorder = None
+            response = await self.get_response(request)
+        response = self.record(request, response, time.perf_counter() - start, recorder)
+        if registry.publish_due():
+            await sync_to_async(registry.publish)()
+        return response
+
+    def record(self, request, response, seconds, recorder):
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else '<unresolved>'
+        registry.record(view, response.status_code, seconds, recorder)
+
+        if self.headers and recorder is not None:
+            duplicates = recorder.duplicates()
+            response['X-Metrics-View'] = view
+            response['X-Metrics-Queries'] = str(recorder.queries)
+            response['X-Metrics-SQL-Ms'] = f'{recorder.sql_seconds * 1000:.1f}'
+            response['X-Metrics-Duplicate-Queries'] = str(sum(duplicates.values()))
+            response['X-Metrics-Template-Ms'] = f'{recorder.template_seconds * 1000:.1f}'
+            response['X-Metrics-Total-Ms'] = f'{seconds * 1000:.1f}'
+            if duplicates:
+                worst = max(duplicates, key=duplicates.get)
+                response['X-Metrics-Worst-Duplicate'] = f'{duplicates[worst] + 1}x {worst[:200]}'
+        return response
+
+
+class QueryRepeatMiddleware:
+    """
+    Log a warning for requests that run the same statement
+    ``QUERY_REPEAT_THRESHOLD`` or more times, with the template line or
+    Python frame behind each. Meant for the development server (the
+    walk up the stack per query is not free); disabled when the threshold is 0.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 0)
+        if not self.threshold:
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryTracker() as tracker:
+            response = self.get_response(request)
+        self.report(request, tracker)
+        return response
+
+    async def __acall__(self, request):
+        async with QueryTracker() as tracker:
+            response = await self.get_response(request)
+        self.report(request, tracker)
+        return response
+
+    def report(self, request, tracker):
+        if tracker.repeated(self.threshold):
+            logger.warning(
+                "%s %s ran %d queries; repeated statements:\n%s",
+                request.method, request.path, tracker.count, tracker.report(self.threshold),
+            )
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for ``artworks.routers``: a request that writes to the
+    database sets a short-lived cookie, and requests carrying it (or using
+    an unsafe method) read from the primary. Place it before
+    SessionMiddleware so session saves count as writes. Not used when no
+    replica is configured.
+    """
+    cookie_name = 'db_pin'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with PrimaryPinning(self.pinned(request)) as pinning:
+            response = self.get_response(request)
+        return self.pin(response, pinning)
+
+    async def __acall__(self, request):
+        with PrimaryPinning(self.pinned(request)) as pinning:
+            response = await self.get_response(request)
+        return self.pin(response, pinning)
+
+    def pinned(self, request):
+        return self.cookie_name in request.COOKIES or request.method not in ('GET', 'HEAD', 'OPTIONS')
+
+    def pin(self, response, pinning):
+        if pinning.wrote:
+            response.set_cookie(self.cookie_name, '1', max_age=self.seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class PageCacheMiddleware:
+    """
+    Serve the pages of views marked with ``artworks.pagecache.page_cache``
+    from the cache to anonymous visitors with an empty cart, and cache them
+    on a miss; responses say which with ``X-Page-Cache`` (``bypass`` for a
+    miss that couldn't be cached, e.g. one setting a cookie). Place it after
+    MessageMiddleware. Not used when ``PAGE_CACHE_TIMEOUT`` is 0.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'PAGE_CACHE_TIMEOUT', 0):
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if hasattr(request, '_page_cache'):
+            self.store(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if hasattr(request, '_page_cache'):
+            await sync_to_async(self.store)(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        tags = getattr(view_func, 'page_cache_tags', None)
+        if tags is None or not pagecache.cacheable(request):
+            return None
+        tags = [tag.format(**view_kwargs) for tag in tags]
+        key, entry, versions = pagecache.lookup(request, tags)
+        if entry is None:
+            request._page_cache = (key, tags, versions)
+            return None
+        return self.cached_response(request, entry)
+
+    def store(self, request, response):
+        stored = pagecache.store(request, response, *request._page_cache)
+        response['X-Page-Cache'] = 'miss' if stored else 'bypass'
+
+    def cached_response(self, request, entry):
+        if entry['csrf']:
+            response = HttpResponse(pagecache.fill_csrf(request, entry['content']))
+        else:
+            response = HttpResponse(entry['content'])
+        for name, value in entry['headers']:
+            response[name] = value
+        response['X-Page-Cache'] = 'hit'
+        if entry['csrf']:
+            # The page now differs per visitor, and its validators were worked
+            # out for the CSRF cookie of whoever it was rendered for.
+            response.headers.pop('ETag', None)
+            response.headers.pop('Last-Modified', None)
+            return response
+        last_modified = parse_http_date_safe(response.get('Last-Modified'))
+        return get_conditional_response(request, response.get('ETag'), last_modified, response)
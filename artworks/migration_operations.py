@@ -0,0 +1,23 @@
+# artworks/migration_operations.py
+"""Migration operations shared by the project's apps."""
+from django.contrib.postgres import operations as postgres
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(postgres.AddIndexConcurrently):
+    """
+    ``CREATE INDEX CONCURRENTLY`` on PostgreSQL, so a live table stays
+    writable while the index builds; a plain ``AddIndex`` on any other
+    database (SQLite in development), which has no such option. Migrations
+    using it must still set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+from artworks.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so the tables stay writable on a live database.
+    atomic = False
+
+    dependencies = [
+        ('artworks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='artwork',
+            index=models.Index(condition=models.Q(('is_available', True), ('status', 'active')), fields=['-created_at'], name='artwork_listed_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='artwork',
+            index=models.Index(condition=models.Q(('is_available', True), ('status', 'active')), fields=['price'], name='artwork_listed_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='artwork',
+            index=models.Index(condition=models.Q(('is_available', True), ('status', 'active')), fields=['-featured', '-created_at'], name='artwork_listed_featured_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='artwork',
+            index=models.Index(fields=['status', 'is_available', '-created_at'], name='artwork_status_recent_idx'),
+        ),
+    ]
@@ -127,6 +127,25 @@ class Artwork(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Gallery and home page: only listed artworks, in each sort order offered.
+            models.Index(
+                fields=['-created_at'],
+                name='artwork_listed_recent_idx',
+                condition=models.Q(status='active', is_available=True),
+            ),
+            models.Index(
+                fields=['price'],
+                name='artwork_listed_price_idx',
+                condition=models.Q(status='active', is_available=True),
+            ),
+            models.Index(
+                fields=['-featured', '-created_at'],
+                name='artwork_listed_featured_idx',
+                condition=models.Q(status='active', is_available=True),
+            ),
+            models.Index(fields=['status', 'is_available', '-created_at'], name='artwork_status_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.artist.get_full_name()}"
@@ -0,0 +1,144 @@
+# artworks/pagecache.py
+"""
+Full-page cache for anonymous visitors.
+
+Views opt in with the tags their page depends on; ``{name}`` placeholders
+are filled from the URL's keyword arguments::
+
+    @page_cache('artwork:{pk}')
+    async def artwork_detail(request, pk): ...
+
+``artworks.middleware.PageCacheMiddleware`` then serves those pages from the
+cache, one entry per URL with the query string in normalised order, to any
+visitor who isn't logged in, has nothing in their cart and has no pending
+messages. A hit runs no view, template or context processor, and for a
+visitor without a session cookie no query at all.
+
+``invalidate_pages(tags)`` drops the pages carrying any of the tags. Each
+tag keeps an index of its pages in the cache, so only those entries are
+deleted. Each tag also has a version that is stored with every page and
+checked on every hit. A page rendered from data that changed while it was
+being rendered is never served, and neither is one the index lost track of
+(evicted, or raced by another worker's update).
+
+CSRF tokens in cached pages are replaced with a placeholder and filled in
+with the visitor's own token on every hit.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.utils.http import urlencode
+
+from cart.models import Cart
+
+from .templating import template_fingerprint
+
+MESSAGES_COOKIE_NAME = 'messages'
+MESSAGES_SESSION_KEY = '_messages'
+MAX_INDEXED = 1000  # pages remembered per tag; older ones are left to their versions and timeout
+
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_PLACEHOLDER = b'\x00csrf\x00'
+_CSRF_FILL = re.compile(re.escape(_CSRF_PLACEHOLDER))
+_UNCACHED_HEADERS = {'content-length', 'set-cookie'}
+
+
+def page_cache(*tags):
+    """Mark a view's page as cacheable for anonymous visitors, tagged with ``tags``."""
+    def decorator(view):
+        view.page_cache_tags = tags
+        return view
+    return decorator
+
+
+def _version_key(tag):
+    return f"pagetag:v:{tag}"
+
+
+def _index_key(tag):
+    return f"pagetag:i:{tag}"
+
+
+def page_key(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    digest, _ = template_fingerprint()
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}|{digest}"
+    return 'page:' + hashlib.sha1(url.encode()).hexdigest()
+
+
+def cacheable(request):
+    """Whether this visitor may get, and leave behind, a page shared with other anonymous visitors."""
+    if request.method not in ('GET', 'HEAD') or MESSAGES_COOKIE_NAME in request.COOKIES:
+        return False
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    session = request.session
+    if session.get(SESSION_KEY) is not None or session.get(MESSAGES_SESSION_KEY):
+        return False
+    return not Cart.objects.filter(
+        session_key=session.session_key, is_active=True, items__isnull=False
+    ).exists()
+
+
+def lookup(request, tags):
+    """(cache key, cached entry or None, tag versions) for this request's page."""
+    key = page_key(request)
+    version_keys = {_version_key(tag): tag for tag in tags}
+    found = cache.get_many([key, *version_keys])
+    missing = [version_key for version_key in version_keys if version_key not in found]
+    if missing:
+        # Never set, or evicted: start a new version no stored page carries.
+        for version_key in missing:
+            cache.add(version_key, time.time(), timeout=None)
+        found.update(cache.get_many(missing))
+    versions = {tag: found.get(version_key) for version_key, tag in version_keys.items()}
+    entry = found.get(key)
+    if entry is not None and entry['versions'] != versions:
+        entry = None
+    return key, entry, versions
+
+
+def store(request, response, key, tags, versions):
+    """Cache ``response`` under ``key`` if it is the same for every anonymous visitor."""
+    if request.method != 'GET' or response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    session = getattr(request, 'session', None)
+    if session is not None and session.modified:
+        return False
+    content = response.content
+    csrf = bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+    if csrf:
+        content, punched = _CSRF_INPUT.subn(rb'\1' + _CSRF_PLACEHOLDER + rb'\2', content)
+        if not punched:
+            return False  # the token went somewhere other than a form field
+    entry = {
+        'headers': [(name, value) for name, value in response.headers.items() if name.lower() not in _UNCACHED_HEADERS],
+        'content': content,
+        'csrf': csrf,
+        'versions': versions,
+    }
+    cache.set(key, entry, timeout=settings.PAGE_CACHE_TIMEOUT)
+    for tag in tags:
+        indexed = [page for page in cache.get(_index_key(tag), []) if page != key]
+        cache.set(_index_key(tag), indexed[-(MAX_INDEXED - 1):] + [key], timeout=settings.PAGE_CACHE_TIMEOUT)
+    return True
+
+
+def fill_csrf(request, content):
+    """Put a CSRF token for this visitor where the cached page had one."""
+    return _CSRF_FILL.sub(lambda match: get_token(request).encode(), content)
+
+
+def invalidate_pages(tags):
+    """Drop every cached page carrying any of ``tags``."""
+    if not tags:
+        return
+    now = time.time()
+    cache.set_many({_version_key(tag): now for tag in tags}, timeout=None)
+    indexes = cache.get_many([_index_key(tag) for tag in tags])
+    cache.delete_many([page for pages in indexes.values() for page in pages] + list(indexes))
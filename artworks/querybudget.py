@@ -0,0 +1,175 @@
+# artworks/querybudget.py
+"""
+Query budgets and repeated-query (N+1) detection.
+
+``query_budget(n)`` caps the SQL queries a view (or any block) may run:
+
+    @query_budget(8)
+    def gallery(request): ...
+
+    @method_decorator(query_budget(8), name='dispatch')
+    class CartView(TemplateView): ...
+
+    with query_budget(3, name='cart summary'):
+        ...
+
+As a decorator it also renders a lazy TemplateResponse inside the budget,
+so queries run from templates are counted. It works on async views too. Going over budget raises
+``QueryBudgetExceeded`` when ``QUERY_BUDGET_RAISE`` is set (the default
+under ``manage.py test``) and otherwise logs an error on the
+``artworks.querybudget`` logger; both carry a report of statements run more
+than once and the template line or Python frame that ran them.
+
+``QueryRepeatMiddleware`` applies the same detection to every request on
+the development server, see ``QUERY_REPEAT_THRESHOLD``.
+"""
+import logging
+import os
+import sys
+import sysconfig
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from functools import wraps
+
+import django
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node, TokenType
+
+from . import metrics
+from .metrics import fingerprint
+
+logger = logging.getLogger(__name__)
+
+_LIBRARY_PATHS = tuple(
+    {os.path.dirname(django.__file__)}
+    | {sysconfig.get_paths()[key] for key in ('stdlib', 'purelib', 'platlib')}
+)
+_INSTRUMENTATION = {__file__, metrics.__file__}
+_RENDER_NODE = Node.render_annotated.__code__
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_origin(frame):
+    """'template:line {% tag %}' and/or 'file:line in function' of the code that ran a query."""
+    template_line = code_line = None
+    while frame is not None and not (template_line and code_line):
+        code = frame.f_code
+        if template_line is None and code is _RENDER_NODE:
+            node = frame.f_locals.get('self')
+            token, origin = getattr(node, 'token', None), getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                tag = '{{ %s }}' if token.token_type == TokenType.VAR else '{%% %s %%}'
+                template_line = f"{origin.template_name}:{token.lineno} {tag % token.contents[:60]}"
+        elif code_line is None and code.co_filename not in _INSTRUMENTATION and not code.co_filename.startswith(_LIBRARY_PATHS):
+            code_line = f"{os.path.relpath(code.co_filename, settings.BASE_DIR)}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return ' via '.join(part for part in (template_line, code_line) if part) or 'unknown'
+
+
+class QueryTracker:
+    """Count the queries run on any connection while active, with where each came from."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = Counter()
+        self.origins = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = fingerprint(sql)
+        self.count += 1
+        self.statements[statement] += 1
+        self.origins[statement][query_origin(sys._getframe(1))] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    async def __aenter__(self):
+        # Hook the connections of the thread the ORM runs in, see RequestRecorder.
+        return await sync_to_async(self.__enter__)()
+
+    async def __aexit__(self, *exc_info):
+        await sync_to_async(self.__exit__)(*exc_info)
+
+    def repeated(self, threshold=2):
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+    def report(self, threshold=2, limit=5):
+        lines = []
+        for statement, n in self.repeated(threshold)[:limit]:
+            lines.append(f"  {n}x {statement[:300]}")
+            for origin, count in self.origins[statement].most_common(3):
+                lines.append(f"      {count}x from {origin}")
+        return '\n'.join(lines)
+
+
+class QueryBudget:
+    def __init__(self, limit, name=None):
+        self.limit = limit
+        self.name = name
+
+    def __enter__(self):
+        self.tracker = QueryTracker().__enter__()
+        return self.tracker
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracker.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.tracker.count > self.limit:
+            self.exceeded()
+
+    async def __aenter__(self):
+        self.tracker = await QueryTracker().__aenter__()
+        return self.tracker
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.tracker.__aexit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.tracker.count > self.limit:
+            self.exceeded()
+
+    def exceeded(self):
+        message = f"{self.name or 'block'} ran {self.tracker.count} queries (budget {self.limit})"
+        details = self.tracker.report()
+        if details:
+            message = f"{message}; repeated statements:\n{details}"
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.error(message)
+
+    def __call__(self, func):
+        def budget(args):
+            match = getattr(args[0], 'resolver_match', None) if args else None
+            return QueryBudget(self.limit, self.name or (match.view_name if match else func.__qualname__))
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def ainner(*args, **kwargs):
+                async with budget(args):
+                    response = await func(*args, **kwargs)
+                    if not getattr(response, 'is_rendered', True):
+                        await sync_to_async(response.render)()
+                return response
+            return ainner
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            with budget(args):
+                response = func(*args, **kwargs)
+                if not getattr(response, 'is_rendered', True):
+                    response.render()
+            return response
+        return inner
+
+
+def query_budget(limit, name=None):
+    return QueryBudget(limit, name)
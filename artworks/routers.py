@@ -0,0 +1,120 @@
+# artworks/routers.py
+"""
+Read-replica routing.
+
+Nothing reads from the replica unless asked to: views and analytics code
+opt in with ``replica_reads``, as a decorator or a ``with`` block::
+
+    @replica_reads
+    def gallery(request): ...
+
+    @method_decorator(replica_reads, name='dispatch')
+    class ArtistDashboardView(...): ...
+
+Inside, reads go to the ``replica`` alias and writes still go to
+``default``. Reads fall back to ``default`` when no replica is configured,
+after anything in the same request (or command) has written, and for a
+short window after a visitor's last write: ``ReplicaPinningMiddleware``
+sets a cookie on any request that wrote, and requests carrying it read from
+the primary until the replica has had time to catch up
+(``REPLICA_PIN_SECONDS``). That keeps a customer's order or an artist's
+edit visible on the next page even if replication lags.
+
+Sessions are always read from the primary. The flags are context
+variables, so they reach the ORM from async views as well: ``sync_to_async``
+runs each query with a copy of the caller's context.
+"""
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_replica_ok = contextvars.ContextVar('replica_ok', default=False)
+_pinned = contextvars.ContextVar('replica_pinned', default=False)
+_wrote = contextvars.ContextVar('replica_wrote', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def read_alias():
+    """The alias reads should use right now."""
+    if _replica_ok.get() and not (_pinned.get() or _wrote.get()) and replica_configured():
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaReads:
+    def __enter__(self):
+        self._token = _replica_ok.set(True)
+        return self
+
+    def __exit__(self, *exc_info):
+        _replica_ok.reset(self._token)
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def ainner(*args, **kwargs):
+                with ReplicaReads():
+                    response = await func(*args, **kwargs)
+                    if not getattr(response, 'is_rendered', True):
+                        await sync_to_async(response.render)()
+                return response
+            return ainner
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            with ReplicaReads():
+                response = func(*args, **kwargs)
+                # A TemplateResponse renders after the view returns; its queries belong to the view.
+                if not getattr(response, 'is_rendered', True):
+                    response.render()
+            return response
+        return inner
+
+
+def replica_reads(func=None):
+    """``@replica_reads`` on a view, or ``with replica_reads():`` around a block."""
+    reads = ReplicaReads()
+    return reads(func) if func is not None else reads
+
+
+class PrimaryPinning:
+    """Scope one request's stickiness: ``pinned`` on entry, and whether it wrote on exit."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+
+    def __enter__(self):
+        self._tokens = (_pinned.set(self.pinned), _wrote.set(False))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wrote = _wrote.get()
+        _pinned.reset(self._tokens[0])
+        _wrote.reset(self._tokens[1])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
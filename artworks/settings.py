@@ -1,5 +1,7 @@
 import os
+import sys
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -30,15 +32,21 @@ INSTALLED_APPS = [
     'orders',
     'payments',
     'subscriptions',
+    'emails',
 ]
 
 MIDDLEWARE = [
+    'artworks.middleware.RequestMetricsMiddleware',  # first, so its latency covers the whole stack
+    'artworks.middleware.QueryRepeatMiddleware',  # N+1 warnings; only active with QUERY_REPEAT_THRESHOLD
+    'artworks.middleware.ReplicaPinningMiddleware',  # read-your-writes; only active with a replica configured
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RollingSessionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'artworks.middleware.PageCacheMiddleware',  # anonymous full-page cache; only active with PAGE_CACHE_TIMEOUT
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -48,8 +56,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept per process (reset by the autoreloader in
+            # development); see TEMPLATE_PREWARM for compiling them all at boot.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -63,18 +78,93 @@ TEMPLATES = [
 
 
 
+# Compile every template when a worker boots instead of on first use (artworks.templating.prewarm)
+TEMPLATE_PREWARM = os.getenv('TEMPLATE_PREWARM', str(not DEBUG)).lower() == 'true'
+
 WSGI_APPLICATION = 'artworks.wsgi.application'
 # Database
+# The stock PostgreSQL backend plus connection metrics on /metrics/ (artworks.backends.postgresql)
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "artworks.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB", "jersey_artwork"),
         "USER": os.getenv("POSTGRES_USER", "jersey"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "secret"),
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Each worker thread keeps its connection between requests instead of reconnecting
+        # every time; it is pinged before reuse and replaced if the server has dropped it.
+        # 0 restores a connection per request, which artworks.asgi always uses.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "300")),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() == "true",
     }
 }
+# A psycopg pool shared by a worker's threads instead (Django 5.1+ with psycopg-pool installed);
+# DB_POOL_MAX_SIZE=0 keeps the persistent connections above
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "0"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+if DB_POOL_MAX_SIZE:
+    import django
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured("DB_POOL_MAX_SIZE needs Django 5.1 or later; unset it to use persistent connections")
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # the pool does the keeping
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {"min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE, "timeout": DB_POOL_TIMEOUT},
+    }
+# Read replica for the views and analytics code marked with artworks.routers.replica_reads.
+# Set the host (a streaming replica) or just the database name (two local databases for testing).
+if os.getenv("POSTGRES_REPLICA_HOST") or os.getenv("POSTGRES_REPLICA_DB"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.getenv("POSTGRES_REPLICA_DB", DATABASES["default"]["NAME"]),
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST", DATABASES["default"]["HOST"]),
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ['artworks.routers.ReplicaRouter']
+# How long reads stay on the primary after a visitor writes; should exceed the worst replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+# Cache (shared between workers when REDIS_URL is set; needs the redis package)
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            # Room for a fragment and a version counter per listed artwork
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+# Artwork card/detail fragments (artworks.templatetags.artwork_fragments)
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv("FRAGMENT_CACHE_TIMEOUT", str(24 * 60 * 60)))
+# How long browsers and CDNs may keep the about and legal pages (artworks.conditional.StaticPageView)
+STATIC_PAGE_MAX_AGE = int(os.getenv("STATIC_PAGE_MAX_AGE", str(24 * 60 * 60)))
+# ETag/Last-Modified on the gallery, artist and artwork pages (artworks.conditional.conditional_page).
+# Off by default without REDIS_URL: they follow catalogue versions kept in the cache, which a
+# per-process cache only moves in the process that saw the change.
+CONDITIONAL_PAGES = os.getenv("CONDITIONAL_PAGES", "True" if os.getenv("REDIS_URL") else "False").lower() == "true"
+# Seconds anonymous visitors' pages stay in the full-page cache (artworks.pagecache); 0 turns it off.
+# Off by default without REDIS_URL: invalidation only reaches the cache of the process that saw the change.
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", "600" if os.getenv("REDIS_URL") else "0"))
+
+# Per-view request metrics (artworks.metrics), scraped from /metrics/; workers share them
+# through the cache, so with several workers and no REDIS_URL each reports only its own.
+# Latency is recorded for every request; SQL and template timings for this fraction of them.
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+REQUEST_METRICS_HEADERS = os.getenv('REQUEST_METRICS_HEADERS', str(DEBUG)).lower() == 'true'  # X-Metrics-* response headers
+REQUEST_METRICS_TOKEN = os.getenv('REQUEST_METRICS_TOKEN', '')  # bearer token for the scraper; staff can always read it
+
+# Query budgets (artworks.querybudget): raise under `manage.py test`, log an error otherwise.
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', str(sys.argv[1:2] == ['test'])).lower() == 'true'
+# Warn when one request runs the same statement this many times (0 turns the detector off)
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5' if DEBUG else '0'))
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -109,6 +199,8 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 # MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Rendered invoices (orders/invoices.py); deliberately not under MEDIA_ROOT
+INVOICE_ROOT = os.getenv('INVOICE_ROOT', os.path.join(BASE_DIR, 'private', 'invoices'))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -118,31 +210,61 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Outgoing mail is queued (emails.mailqueue) and sent by `manage.py send_queued_email --loop`;
+# a stuck SMTP server then fails the worker's attempt instead of hanging it
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '15'))
+
 # Email configuration (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Session configuration
-SESSION_SAVE_EVERY_REQUEST = True
 SESSION_COOKIE_AGE = 86400  # 1 day
+# Sessions are only written when they change; accounts.middleware.RollingSessionMiddleware
+# extends an active session's expiry at most this often instead of on every request
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', '3600'))
+if os.getenv("REDIS_URL"):
+    # Anonymous sessions in the shared cache, logged-in ones in the database
+    SESSION_ENGINE = 'accounts.sessions'
 
 # SumUp API Configuration
 SUMUP_API_URL = 'https://api.sumup.com/v0.1'  # Use sandbox URL for testing
-SUMUP_MERCHANT_CODE = 'YOUR_MERCHANT_CODE'
-SUMUP_ACCESS_TOKEN = 'YOUR_ACCESS_TOKEN'
+SUMUP_MERCHANT_CODE = os.getenv('SUMUP_MERCHANT_CODE', 'YOUR_MERCHANT_CODE')
+SUMUP_ACCESS_TOKEN = os.getenv('SUMUP_ACCESS_TOKEN', 'YOUR_ACCESS_TOKEN')
+# Create real SumUp checkouts in ProcessSumUpPaymentView (False keeps the offline test checkout)
+SUMUP_LIVE_CHECKOUTS = os.getenv('SUMUP_LIVE_CHECKOUTS', 'False').lower() == 'true'
+# Unpaid checkouts expire after this long; `manage.py expire_checkouts` cancels their orders
+SUMUP_CHECKOUT_TTL_MINUTES = int(os.getenv('SUMUP_CHECKOUT_TTL_MINUTES', '30'))
 SUMUP_CLIENT_ID = 'YOUR_CLIENT_ID'
 SUMUP_CLIENT_SECRET = 'YOUR_CLIENT_SECRET'
 # SumUp
-SUMUP_BASE_URL = "https://api.sumup.com"
+SUMUP_BASE_URL = os.getenv("SUMUP_BASE_URL", "https://api.sumup.com")  # point at a local stub for testing
 SUMUP_CLIENT_ID = os.getenv("SUMUP_CLIENT_ID")
 SUMUP_CLIENT_SECRET = os.getenv("SUMUP_CLIENT_SECRET")
 SUMUP_REDIRECT_URI = os.getenv("SUMUP_REDIRECT_URI")  # e.g. https://your.site/payments/sumup/callback/
 SUMUP_SUCCESS_URL = "https://your.site/payments/success/"
 SUMUP_FAIL_URL = "https://your.site/payments/fail/"
+# SumUp HTTP client (payments/sumup.py): pooled session, retries and circuit breaker
+SUMUP_CONNECT_TIMEOUT = float(os.getenv("SUMUP_CONNECT_TIMEOUT", "3.05"))
+SUMUP_READ_TIMEOUT = float(os.getenv("SUMUP_READ_TIMEOUT", "8"))
+SUMUP_MAX_RETRIES = int(os.getenv("SUMUP_MAX_RETRIES", "2"))  # idempotent calls only
+SUMUP_POOL_SIZE = int(os.getenv("SUMUP_POOL_SIZE", "10"))
+SUMUP_BREAKER_FAILURES = int(os.getenv("SUMUP_BREAKER_FAILURES", "5"))
+SUMUP_BREAKER_RESET_SECONDS = float(os.getenv("SUMUP_BREAKER_RESET_SECONDS", "30"))
+# Refresh artist OAuth tokens this many seconds before they expire (payments/tokens.py)
+SUMUP_TOKEN_REFRESH_MARGIN = int(os.getenv("SUMUP_TOKEN_REFRESH_MARGIN", "120"))
 
 # CityPay (if you choose CityPay for monthly billing)
 CITYPAY_BASE_URL = os.getenv("CITYPAY_BASE_URL", "https://api.citypay.com")  # adjust to their endpoint
 CITYPAY_MERCHANT_ID = os.getenv("CITYPAY_MERCHANT_ID")
 CITYPAY_LICENCE = os.getenv("CITYPAY_LICENCE")  # API key / licence code (name varies)
+CITYPAY_CONNECT_TIMEOUT = float(os.getenv("CITYPAY_CONNECT_TIMEOUT", "3.05"))
+CITYPAY_READ_TIMEOUT = float(os.getenv("CITYPAY_READ_TIMEOUT", "15"))
+CITYPAY_MAX_RETRIES = int(os.getenv("CITYPAY_MAX_RETRIES", "2"))  # safe: charges de-duplicate on identifier
+
+# Subscription billing (payments/billing.py)
+BILLING_PERIOD_DAYS = 30
+BILLING_RETRY_DAYS = [1, 3, 7]  # dunning: days before retry 1, 2, 3; deactivate after the last
 
 # Email Configuration
 EMAIL_USE_MAILHOG = os.environ.get('USE_MAILHOG', 'True') == 'True'  # Default to MailHog in development
@@ -181,6 +303,8 @@ else:
 
 # Default email settings
 DEFAULT_FROM_EMAIL = 'Jersey Artwork <noreply@coderra.je>'
+# Absolute links in mail sent outside a request (campaigns, queued notifications)
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000').rstrip('/')
 EMAIL_SUBJECT_PREFIX = '[Jersey Artwork] '
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
@@ -0,0 +1,42 @@
+# artworks/signals.py
+"""
+Invalidate cached fragments, validators and pages when anything the
+storefront shows about an artwork or the catalogue changes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+
+from .caching import catalogue_changed
+from .models import Artwork, ArtworkImage, Category
+
+
+@receiver([post_save, post_delete], sender=Artwork)
+def artwork_changed(sender, instance, **kwargs):
+    catalogue_changed([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ArtworkImage)
+def artwork_image_changed(sender, instance, **kwargs):
+    catalogue_changed([instance.artwork_id])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, created=False, **kwargs):
+    catalogue_changed([] if created else Artwork.objects.filter(category=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def artist_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Logging in saves last_login, which no page shows.
+    if update_fields == frozenset({'last_login'}) or instance.user_type != 'artist':
+        return
+    # New artists only show on the listings.
+    catalogue_changed([] if created else Artwork.objects.filter(artist=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def artist_deleted(sender, instance, **kwargs):
+    if instance.user_type == 'artist':
+        catalogue_changed()
@@ -0,0 +1,97 @@
+# artworks/templatetags/artwork_fragments.py
+"""
+Cached artwork fragments, keyed on the artwork's pk, ``updated_at`` and
+version counter (``artworks.caching``). Saving an artwork, one of its
+images, its category or its artist bumps the counter (``artworks.signals``),
+so a cached fragment never outlives the data it shows.
+
+    {% load artwork_fragments %}
+    {% artwork_cards artworks 'artworks/includes/gallery_card.html' as cards %}
+    {% for card in cards %}{{ card }}{% empty %}...{% endfor %}
+
+    {% artwork_fragment 'detail-info' artwork %} ... {% endartwork_fragment %}
+
+Fragments are shared by every visitor, so they must not depend on the
+request: keep forms, CSRF tokens and per-user state outside them.
+"""
+from django import template
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import QuerySet
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from artworks.caching import fragment_key, fragment_timeout, get_version, get_versions
+from artworks.models import Artwork
+
+register = template.Library()
+
+
+@register.simple_tag
+def artwork_cards(artworks, template_name):
+    """
+    ``template_name`` rendered for each artwork, in order.
+
+    Given a queryset only ``pk`` and ``updated_at`` are read, so a warm page
+    costs one narrow query and two cache round trips; artworks missing from
+    the cache are loaded with their artist, category and images in one go.
+    """
+    if isinstance(artworks, QuerySet):
+        stubs = list(artworks.values_list('pk', 'updated_at'))
+        loaded = {}
+    else:
+        artworks = list(artworks)
+        stubs = [(artwork.pk, artwork.updated_at) for artwork in artworks]
+        loaded = {artwork.pk: artwork for artwork in artworks}
+
+    versions = get_versions('artwork', [pk for pk, _ in stubs])
+    keys = {pk: fragment_key(template_name, pk, updated_at, versions[pk]) for pk, updated_at in stubs}
+    cards = cache.get_many(keys.values())
+
+    missing = [pk for pk, key in keys.items() if key not in cards]
+    if missing:
+        to_load = [pk for pk in missing if pk not in loaded]
+        if to_load:
+            # Cached cards are shared, so fill them from the primary even when the
+            # page reads from a replica that may still be behind the version bump.
+            loaded.update(
+                Artwork.objects.using(DEFAULT_DB_ALIAS).select_related('artist', 'category')
+                .prefetch_related('additional_images')
+                .in_bulk(to_load)
+            )
+        rendered = {
+            keys[pk]: render_to_string(template_name, {'artwork': loaded[pk]})
+            for pk in missing if pk in loaded
+        }
+        cache.set_many(rendered, timeout=fragment_timeout())
+        cards.update(rendered)
+
+    return [mark_safe(cards[keys[pk]]) for pk, _ in stubs if keys[pk] in cards]
+
+
+class ArtworkFragmentNode(template.Node):
+    def __init__(self, nodelist, name, artwork):
+        self.nodelist = nodelist
+        self.name = name
+        self.artwork = artwork
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        artwork = self.artwork.resolve(context)
+        key = fragment_key(name, artwork.pk, artwork.updated_at, get_version('artwork', artwork.pk))
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, fragment_timeout())
+        return html
+
+
+@register.tag
+def artwork_fragment(parser, token):
+    """{% artwork_fragment 'name' artwork %} ... {% endartwork_fragment %}"""
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and an artwork")
+    nodelist = parser.parse(('endartwork_fragment',))
+    parser.delete_first_token()
+    return ArtworkFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
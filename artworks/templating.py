@@ -0,0 +1,159 @@
+# artworks/templating.py
+"""
+Template pre-warming and render profiling.
+
+With the cached loader every worker compiles a template the first time it
+is used, so the first visitors after a deploy pay for parsing ``base.html``
+and whatever extends it. ``prewarm()`` compiles every template up front;
+``artworks.wsgi`` calls it at boot when ``TEMPLATE_PREWARM`` is set, and
+under ``gunicorn --preload`` the compiled templates are shared by the
+forked workers.
+"""
+import hashlib
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import transaction
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.test import RequestFactory
+
+logger = logging.getLogger(__name__)
+
+
+def template_files(engine=None, project_only=False):
+    """{name: path} of every template the Django engine can load, first directory wins like the loaders."""
+    engine = engine or engines['django']
+    files = {}
+    for directory in list(engine.dirs) + list(get_app_template_dirs('templates')):
+        if project_only and not str(directory).startswith(str(settings.BASE_DIR)):
+            continue
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                files.setdefault(os.path.relpath(path, directory).replace(os.sep, '/'), path)
+    return files
+
+
+def template_names(engine=None, project_only=False):
+    """
+    Every template the Django engine can load. ``project_only`` leaves out
+    those of Django and installed packages.
+    """
+    return sorted(template_files(engine, project_only))
+
+
+_fingerprint = None
+
+
+def template_fingerprint():
+    """
+    (digest, newest mtime) of the project's templates, for the validators of
+    rendered pages: a deploy that changes a template changes them all.
+    Worked out once per process, except under DEBUG where templates reload
+    as they are edited.
+    """
+    global _fingerprint
+    if _fingerprint is None or settings.DEBUG:
+        digest = hashlib.sha1()
+        newest = 0.0
+        for name, path in sorted(template_files(project_only=True).items()):
+            with open(path, 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+            newest = max(newest, os.path.getmtime(path))
+        _fingerprint = (digest.hexdigest()[:12], newest)
+    return _fingerprint
+
+
+def compile_template(name, engine=None):
+    """(template, seconds, error); a second call is a cache hit under the cached loader."""
+    engine = engine or engines['django']
+    start = time.perf_counter()
+    try:
+        template = engine.get_template(name)
+    except (TemplateSyntaxError, TemplateDoesNotExist) as e:
+        return None, time.perf_counter() - start, e
+    return template, time.perf_counter() - start, None
+
+
+def prewarm(engine=None):
+    """Compile every template into the cached loader; returns (compiled, failed names)."""
+    compiled, failed = 0, []
+    for name in template_names(engine):
+        template, _, error = compile_template(name, engine)
+        if error is None:
+            compiled += 1
+        else:
+            failed.append(name)
+            logger.warning("Template %s failed to compile: %s", name, error)
+    return compiled, failed
+
+
+def sample_request(path='/'):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    request.session = SessionBase()
+    return request
+
+
+def sample_contexts():
+    """{template name: context} built from whatever data the database holds."""
+    from accounts.models import User
+    from artworks.models import Artwork
+    from cart.models import Cart
+    from orders.invoices import invoice_context
+    from orders.models import Order
+
+    listed = Artwork.objects.filter(status='active', is_available=True)
+    artwork = listed.select_related('artist', 'category').first()
+    order = Order.objects.exclude(status='pending').select_related('user').first()
+    cart = Cart.objects.filter(is_active=True, items__isnull=False).first()
+    contexts = {
+        'artworks/gallery.html': {'artworks': listed.order_by('-created_at')},
+        'artworks/home.html': {
+            'featured_artworks': listed.order_by('-featured', '-created_at')[:8],
+            'featured_artists': User.objects.filter(user_type='artist', is_active=True)[:4],
+        },
+    }
+    if artwork is not None:
+        contexts.update({
+            'artworks/detail.html': {'artwork': artwork},
+            'artworks/includes/gallery_card.html': {'artwork': artwork},
+            'artworks/includes/home_card.html': {'artwork': artwork},
+        })
+    if cart is not None:
+        contexts['cart/view.html'] = {
+            'cart': cart,
+            'cart_items': cart.items.select_related('artwork', 'artwork__artist'),
+        }
+    if order is not None:
+        contexts.update({
+            'orders/customer_list.html': {'orders': Order.objects.filter(user=order.user)[:10]},
+            'orders/detail.html': {
+                'order': order,
+                'order_items': order.items.select_related('artwork', 'artwork__artist'),
+                'status_history': order.status_history.order_by('-created_at'),
+            },
+            'orders/emails/order_confirmation.html': {'order': order, 'order_items': order.items.all()},
+            'orders/invoice.html': invoice_context(order),
+            'orders/invoice_pdf.html': invoice_context(order),
+        })
+    return contexts
+
+
+def render_profile(template, context, iterations=5):
+    """(median seconds, bytes) of rendering ``template``; writes are rolled back."""
+    timings = []
+    size = 0
+    for _ in range(iterations):
+        with transaction.atomic():
+            start = time.perf_counter()
+            size = len(template.render(context, sample_request()))
+            timings.append(time.perf_counter() - start)
+            transaction.set_rollback(True)
+    timings.sort()
+    return timings[len(timings) // 2], size
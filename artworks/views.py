@@ -1,8 +1,13 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from artworks.models import Artwork, ArtworkImage, Category
+from artworks.conditional import artwork_state, catalogue_state, conditional_page
 from artworks.forms import ArtworkUploadForm
+from artworks.pagecache import page_cache
+from artworks.querybudget import query_budget
+from artworks.routers import replica_reads
 from django.conf import settings
 from django.db.models import Count
 from django.views.generic import DetailView
@@ -10,6 +15,10 @@ from .models import Artwork
 from django.views.generic import ListView, DetailView
 from .models import Artwork
 
+# Templates and the context processors (cart, user) run queries, so async
+# views render in the ORM's thread.
+arender = sync_to_async(render)
+
 @login_required
 def artwork_upload(request):
     # Check if user is an artist
@@ -61,7 +70,12 @@ def my_artworks(request):
     artworks = Artwork.objects.filter(artist=request.user).order_by('-created_at')
     return render(request, 'artworks/my_artworks.html', {'artworks': artworks})
 
-def gallery(request):
+@page_cache('catalogue')
+@replica_reads
+@conditional_page(catalogue_state)
+@query_budget(8)
+async def gallery(request):
+    # Cards come from the fragment cache (artwork_cards), which reads only pk and updated_at here
     artworks = Artwork.objects.filter(status='active', is_available=True)
     
     # Filter by category
@@ -83,33 +97,32 @@ def gallery(request):
     else:
         artworks = artworks.order_by('-created_at')
     
-    return render(request, 'artworks/gallery.html', {'artworks': artworks})
+    return await arender(request, 'artworks/gallery.html', {'artworks': artworks})
 
-def artwork_detail(request, pk):
-    artwork = get_object_or_404(Artwork, pk=pk)
-    if artwork.status != 'active' and artwork.artist != request.user:
-        messages.error(request, "This artwork is not available")
-        return redirect('artworks:gallery')
-    return render(request, 'artworks/detail.html', {'artwork': artwork})
+@page_cache('artwork:{pk}')
+@conditional_page(artwork_state)
+async def artwork_detail(request, pk):
+    artwork = await aget_object_or_404(Artwork, pk=pk)
+    if artwork.status != 'active':
+        user = await request.auser()
+        if artwork.artist_id != user.pk:
+            messages.error(request, "This artwork is not available")
+            return redirect('artworks:gallery')
+    return await arender(request, 'artworks/detail.html', {'artwork': artwork})
 
 # Add this updated home view to artworks/views.py
 
-def home(request):
+@page_cache('catalogue')
+async def home(request):
     """Homepage view with featured artworks and artists."""
     from accounts.models import User
     
-    # Get featured artworks (active, available, and featured or recent)
+    # Get featured artworks (active, available, and featured or recent); left
+    # unevaluated so artwork_cards only reads ids when the cards are cached
     featured_artworks = Artwork.objects.filter(
         status='active',
         is_available=True
-    ).select_related('artist', 'category').order_by('-featured', '-created_at')[:8]
-    
-    # If no featured artworks, just get the latest ones
-    if not featured_artworks:
-        featured_artworks = Artwork.objects.filter(
-            status='active',
-            is_available=True
-        ).select_related('artist', 'category').order_by('-created_at')[:8]
+    ).order_by('-featured', '-created_at')[:8]
     
     # Get featured artists (those with active artworks)
     featured_artists = User.objects.filter(
@@ -125,7 +138,7 @@ def home(request):
         'featured_artists': featured_artists,
     }
     
-    return render(request, 'artworks/home.html', context)
+    return await arender(request, 'artworks/home.html', context)
 
 # Add these at the end of artworks/views.py
 
@@ -137,6 +150,7 @@ def contact(request):
     """Contact page."""
     return render(request, 'artworks/contact.html')
 
+@conditional_page(catalogue_state)
 def artists_list(request):
     """List all artists."""
     from accounts.models import User
@@ -6,3 +6,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'artworks.settings')
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402  (settings are configured by get_wsgi_application)
+
+if settings.TEMPLATE_PREWARM:
+    from artworks.templating import prewarm  # noqa: E402
+    prewarm()
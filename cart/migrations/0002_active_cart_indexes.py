@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+from artworks.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so the tables stay writable on a live database.
+    atomic = False
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user'], name='cart_active_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['session_key'], name='cart_active_session_idx'),
+        ),
+    ]
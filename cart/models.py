@@ -26,6 +26,11 @@ class Cart(models.Model):
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Looked up on every page by the cart context processor.
+            models.Index(fields=['user'], name='cart_active_user_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['session_key'], name='cart_active_session_idx', condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         if self.user:
@@ -5,6 +5,7 @@ app_name = 'cart'
 
 urlpatterns = [
     path('', views.CartView.as_view(), name='view'),
+    path('summary/', views.cart_summary, name='summary'),
     path('add/<int:artwork_id>/', views.AddToCartView.as_view(), name='add'),
     path('update/<int:item_id>/', views.UpdateCartItemView.as_view(), name='update'),
     path('remove/<int:item_id>/', views.RemoveFromCartView.as_view(), name='remove'),
@@ -3,15 +3,17 @@ from django.views import View
 from django.views.generic import TemplateView
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import F
+from django.db.models import F, Prefetch, prefetch_related_objects
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from decimal import Decimal
 
 from .models import Cart, CartItem, SavedItem
 from artworks.models import Artwork
+from artworks.querybudget import query_budget
 
 
+@method_decorator(query_budget(8), name='dispatch')
 class CartView(TemplateView):
     """Display shopping cart."""
     template_name = 'cart/view.html'
@@ -41,11 +43,13 @@ class CartView(TemplateView):
         context = super().get_context_data(**kwargs)
         cart = self.get_cart()
         
-        # Get cart items with related artwork data
-        cart_items = cart.items.select_related(
-            'artwork', 
-            'artwork__artist'
-        ).order_by('-added_at')
+        # Get cart items with related artwork data, loaded onto the cart so
+        # the subtotal/shipping/total properties reuse them instead of re-querying
+        prefetch_related_objects([cart], Prefetch(
+            'items',
+            queryset=CartItem.objects.select_related('artwork', 'artwork__artist').order_by('-added_at')
+        ))
+        cart_items = cart.items.all()
         
         # Check availability for each item
         for item in cart_items:
@@ -68,6 +72,42 @@ class CartView(TemplateView):
         return context
 
 
+async def cart_summary(request):
+    """The visitor's cart as JSON, for the header badge and mini-cart."""
+    user = await request.auser()
+    if user.is_authenticated:
+        carts = Cart.objects.filter(user=user, is_active=True)
+    elif request.session.session_key:
+        carts = Cart.objects.filter(session_key=request.session.session_key, is_active=True)
+    else:
+        carts = Cart.objects.none()
+    cart = await carts.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('artwork').order_by('-added_at'))
+    ).afirst()
+    if cart is None:
+        return JsonResponse({'items': [], 'total_items': 0, 'subtotal': '0.00', 'shipping': '0.00', 'total': '0.00'})
+
+    # The totals below add up the prefetched items; none of them query again.
+    items = cart.items.all()
+    return JsonResponse({
+        'items': [
+            {
+                'id': item.id,
+                'artwork_id': item.artwork_id,
+                'title': item.artwork.title,
+                'quantity': item.quantity,
+                'price': item.price_at_time,
+                'total': item.total_price,
+            }
+            for item in items
+        ],
+        'total_items': sum(item.quantity for item in items),
+        'subtotal': cart.subtotal,
+        'shipping': cart.shipping_cost,
+        'total': cart.total,
+    })
+
+
 class AddToCartView(View):
     """Add artwork to cart."""
     
@@ -0,0 +1,33 @@
+from django.contrib import admin
+
+from .campaigns import progress
+from .models import Campaign, QueuedEmail
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'from_email', 'attempts', 'created_at', 'sent_at', 'failed_at']
+    list_filter = ['sent_at', 'failed_at']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['created_at']
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    """Recipients are added and sent with ``manage.py send_campaign``."""
+    list_display = ['name', 'kind', 'status', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['name', 'subject']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'delivery']
+    actions = ['pause']
+
+    def delivery(self, obj):
+        if obj.pk is None:
+            return '-'
+        return ', '.join(f"{count} {status}" for status, count in progress(obj).items())
+
+    def pause(self, request, queryset):
+        """Running senders stop after their current chunk."""
+        updated = queryset.filter(status='sending').update(status='paused')
+        self.message_user(request, f'{updated} campaign(s) paused. Run send_campaign again to resume.')
+    pause.short_description = 'Pause selected campaigns'
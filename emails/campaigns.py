@@ -0,0 +1,409 @@
+# emails/campaigns.py
+"""
+Bulk campaign sending.
+
+A ``Campaign`` is one email to many ``CampaignRecipient`` rows. Sending it
+through ``send_mail()`` one message at a time would re-render the template
+and reconnect to SMTP for every recipient; instead ``CampaignSender``:
+
+* renders the templates once per variant, then splits the output at its
+  ``[[ field ]]`` merge fields so each recipient costs a string join;
+* claims recipients in chunks with ``SELECT ... FOR UPDATE SKIP LOCKED``
+  leases, so several senders can share a campaign;
+* sends each chunk from a thread pool, every thread on an SMTP connection
+  borrowed from a pool that stays open for the whole run, under one
+  messages-per-second limit shared by the threads;
+* writes results back per chunk, keeping only a small status row per
+  message.
+
+A run that is interrupted (or a campaign paused from the admin) resumes by
+running ``send_campaign`` again: sent rows are never claimed twice, and
+rows leased by a dead sender come back once the lease expires. Delivery is
+at-least-once, like the mail queue.
+
+Marketing campaigns re-check ``CustomerProfile.marketing_consent`` as each
+chunk is claimed, so a customer who opts out halfway through a long
+campaign is skipped.
+"""
+import datetime
+import logging
+import queue
+import re
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+
+from accounts.models import User
+from artworks.leases import LeaseSummary, LeaseWorker
+from .models import Campaign, CampaignRecipient
+
+logger = logging.getLogger(__name__)
+
+MERGE_FIELD = re.compile(r"\[\[\s*(\w+)\s*\]\]")
+
+
+def marketing_audience():
+    """Active customers who have agreed to marketing email."""
+    return (
+        User.objects.filter(is_active=True, customerprofile__marketing_consent=True)
+        .exclude(email='')
+        .order_by('pk')
+    )
+
+
+def add_recipients(campaign, rows, chunk_size=1000):
+    """
+    Add recipients from an iterable of dicts with ``email`` and optionally
+    ``user_id``, ``variant`` and ``merge`` (per-recipient merge fields).
+    Addresses already on the campaign are ignored, so this can be re-run.
+    """
+    added = 0
+    chunk = []
+
+    def flush():
+        nonlocal added
+        added += len(CampaignRecipient.objects.bulk_create(chunk, ignore_conflicts=True))
+        chunk.clear()
+
+    for row in rows:
+        chunk.append(CampaignRecipient(
+            campaign=campaign,
+            email=row['email'],
+            user_id=row.get('user_id'),
+            variant=row.get('variant', ''),
+            merge=row.get('merge'),
+        ))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return added
+
+
+def add_users(campaign, users, variant=None, chunk_size=1000):
+    """Add every user in ``users``; ``variant(user)`` picks each one's variant."""
+    return add_recipients(campaign, (
+        {'email': user.email, 'user_id': user.pk, 'variant': variant(user) if variant else ''}
+        for user in users.iterator(chunk_size=chunk_size)
+    ), chunk_size=chunk_size)
+
+
+def progress(campaign):
+    """Recipient counts by status name, in one query."""
+    counts = dict(
+        CampaignRecipient.objects.filter(campaign=campaign)
+        .values_list('status')
+        .annotate(n=Count('pk'))
+        .order_by()
+    )
+    return {label.lower(): counts.get(value, 0) for value, label in CampaignRecipient.STATUS_CHOICES}
+
+
+class MergeTemplate:
+    """Rendered text split once into literal runs and merge field names."""
+
+    def __init__(self, text, html=False):
+        parts = MERGE_FIELD.split(text)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+        self.html = html
+
+    def merge(self, data):
+        out = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            value = str(data.get(name, ''))
+            out.append(escape(value) if self.html else value)
+            out.append(literal)
+        return ''.join(out)
+
+
+@dataclass
+class RenderedVariant:
+    subject: MergeTemplate
+    text: MergeTemplate
+    html: MergeTemplate
+
+
+def render_variant(campaign, variant):
+    context = {
+        **campaign.context,
+        'campaign': campaign,
+        'variant': variant,
+        'site_url': settings.SITE_URL,
+    }
+    html = render_to_string(campaign.html_template, context)
+    if campaign.text_template:
+        text = render_to_string(campaign.text_template, context)
+    else:
+        text = strip_tags(html)
+    return RenderedVariant(
+        subject=MergeTemplate(campaign.subject),
+        text=MergeTemplate(text),
+        html=MergeTemplate(html, html=True),
+    )
+
+
+def merge_data(recipient):
+    user = recipient.user
+    data = {'email': recipient.email}
+    if user is not None:
+        data.update(
+            first_name=user.first_name or user.username,
+            last_name=user.last_name,
+            full_name=user.get_full_name() or user.username,
+            username=user.username,
+        )
+    data.update(recipient.merge or {})
+    return data
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second, shared between threads."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConnectionPool:
+    """
+    Mail backend connections kept open for the length of a run. A
+    connection that fails is closed before it goes back, and reopened by
+    whoever borrows it next.
+    """
+
+    def __init__(self, size, backend=None):
+        self._connections = [get_connection(backend, fail_silently=False) for _ in range(size)]
+        self._idle = queue.LifoQueue()
+        self._open = set()
+        for connection in self._connections:
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._idle.get()
+        try:
+            if id(connection) not in self._open:
+                connection.open()
+                self._open.add(id(connection))
+            yield connection
+        except Exception:
+            self._discard(connection)
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def _discard(self, connection):
+        self._open.discard(id(connection))
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        for connection in self._connections:
+            if id(connection) in self._open:
+                self._discard(connection)
+
+
+def is_permanent(error):
+    """A 5xx reply, or every recipient refused, won't get better on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+@dataclass
+class CampaignSummary(LeaseSummary):
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class CampaignSender(LeaseWorker):
+    model = CampaignRecipient
+    summary_class = CampaignSummary
+
+    def __init__(self, campaign, chunk_size=500, workers=4, rate=0, lease_seconds=300, max_attempts=3,
+                 retry_seconds=60, worker_id=None, backend=None):
+        super().__init__(chunk_size, lease_seconds, worker_id)
+        self.campaign = campaign
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.retry = datetime.timedelta(seconds=retry_seconds)
+        self.backend = backend
+        self.from_email = campaign.from_email or settings.DEFAULT_FROM_EMAIL
+        self.variants = {}
+        self.pool = None
+
+    @property
+    def chunk_size(self):
+        return self.batch_size
+
+    def pending(self, now):
+        return CampaignRecipient.objects.filter(
+            campaign=self.campaign,
+            status=CampaignRecipient.PENDING,
+        ).filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+    def lease_rows(self, rows, now):
+        # Still inside the claiming transaction, so consent is checked on the rows as locked.
+        if self.campaign.kind == 'marketing':
+            rows.exclude(user__customerprofile__marketing_consent=True).update(
+                status=CampaignRecipient.SKIPPED, error="No marketing consent",
+            )
+        super().lease_rows(rows.filter(status=CampaignRecipient.PENDING), now)
+
+    def claim_chunk(self):
+        """Lease the next chunk; returns ``(recipients, rows claimed, rows skipped)``."""
+        ids = self.claim()
+        recipients = list(
+            self.held().filter(pk__in=ids, status=CampaignRecipient.PENDING).select_related("user").order_by("pk")
+        )
+        skipped = 0
+        if ids and self.campaign.kind == 'marketing':
+            # Only pending rows are claimable, so any skipped among them were skipped just now.
+            skipped = CampaignRecipient.objects.filter(pk__in=ids, status=CampaignRecipient.SKIPPED).count()
+        return recipients, len(ids), skipped
+
+    def build_message(self, recipient, connection):
+        variant = self.variants[recipient.variant]
+        data = merge_data(recipient)
+        message = EmailMultiAlternatives(
+            subject=variant.subject.merge(data),
+            body=variant.text.merge(data),
+            from_email=self.from_email,
+            to=[recipient.email],
+            connection=connection,
+        )
+        message.attach_alternative(variant.html.merge(data), 'text/html')
+        return message
+
+    def send_slice(self, pool, recipients):
+        """Send ``recipients`` on one pooled connection; returns ``(recipient, error)`` pairs."""
+        results = []
+        for recipient in recipients:
+            self.limiter.acquire()
+            try:
+                with pool.connection() as connection:
+                    if not connection.send_messages([self.build_message(recipient, connection)]):
+                        raise RuntimeError("The mail backend did not accept the message")
+            except Exception as e:
+                logger.warning("Campaign %s: sending to %s failed: %s", self.campaign.pk, recipient.email, e)
+                results.append((recipient, e))
+            else:
+                results.append((recipient, None))
+        return results
+
+    def run_once(self):
+        """Claim, send and record one chunk on the run's connection pool."""
+        recipients, claimed, skipped = self.claim_chunk()
+        summary = CampaignSummary(claimed=claimed, skipped=skipped)
+        if not recipients:
+            return summary
+
+        # Only the SMTP conversations run in the pool; rendering and all database work stay on this thread.
+        for name in {recipient.variant for recipient in recipients} - self.variants.keys():
+            self.variants[name] = render_variant(self.campaign, name)
+        slices = [recipients[i::self.workers] for i in range(self.workers)]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="campaign") as executor:
+            results = [result for chunk in executor.map(lambda s: self.send_slice(self.pool, s), slices) for result in chunk]
+
+        self.record(results, summary)
+        return summary
+
+    def stopping(self):
+        # Lets the campaign be paused from the admin between chunks.
+        if Campaign.objects.filter(pk=self.campaign.pk, status='paused').exists():
+            logger.info("Campaign %s paused", self.campaign.pk)
+            return True
+        return False
+
+    def report(self, summary, seconds):
+        logger.info(
+            "Campaign %s run by %s: %d claimed, %d sent, %d retried, %d failed, %d skipped in %.1fs",
+            self.campaign.pk, self.worker_id, summary.claimed, summary.sent, summary.retried,
+            summary.failed, summary.skipped, seconds,
+        )
+
+    def run(self, max_chunks=None, max_seconds=None):
+        Campaign.objects.filter(pk=self.campaign.pk, status__in=['draft', 'paused']).update(
+            status='sending', started_at=timezone.now(),
+        )
+        self.pool = ConnectionPool(self.workers, self.backend)
+        try:
+            summary = super().run(max_batches=max_chunks, max_seconds=max_seconds)
+        finally:
+            self.pool.close()
+            self.pool = None
+        self.finish_if_done()
+        return summary
+
+    def finish_if_done(self):
+        if not CampaignRecipient.objects.filter(campaign=self.campaign, status=CampaignRecipient.PENDING).exists():
+            Campaign.objects.filter(pk=self.campaign.pk, status='sending').update(
+                status='finished', finished_at=timezone.now(),
+            )
+
+    @transaction.atomic
+    def record(self, results, summary):
+        now = timezone.now()
+        held = self.held()
+        sent = [recipient.pk for recipient, error in results if error is None]
+        if sent:
+            summary.sent += held.filter(pk__in=sent).update(
+                status=CampaignRecipient.SENT,
+                sent_at=now,
+                attempts=F("attempts") + 1,
+                claimed_until=None,
+                claimed_by="",
+                error="",
+            )
+        for recipient, error in results:
+            if error is None:
+                continue
+            attempt = recipient.attempts + 1
+            if is_permanent(error) or attempt >= self.max_attempts:
+                status, until = CampaignRecipient.FAILED, None
+                summary.failed += 1
+            else:
+                # The row stays pending; the lease doubles as the retry delay.
+                status, until = CampaignRecipient.PENDING, now + self.retry * 2 ** (attempt - 1)
+                summary.retried += 1
+            held.filter(pk=recipient.pk).update(
+                status=status,
+                attempts=attempt,
+                claimed_until=until,
+                claimed_by="",
+                error=str(error)[:255],
+            )
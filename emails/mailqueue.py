@@ -0,0 +1,166 @@
+# emails/mailqueue.py
+"""
+Outgoing email queue.
+
+``enqueue()`` stores a message and returns immediately; it joins the
+caller's transaction, so mail about something that rolled back is never
+sent. ``manage.py send_queued_email`` drains the queue:
+
+* rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased to
+  one worker, so several can run side by side;
+* a worker keeps one SMTP connection open across batches instead of a
+  connect/EHLO/login/QUIT per message, reopening it after a failure;
+* each message goes out as its own ``send_messages()`` call on that
+  connection, so one rejected recipient neither loses track of which
+  messages of the batch were delivered nor stops the rest;
+* failures are retried with exponential backoff until ``max_attempts``,
+  after which the message is parked with ``failed_at`` set.
+
+Delivery is at-least-once: a worker that dies between the SMTP server
+accepting a message and recording it will have it sent again.
+"""
+import datetime
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from artworks.leases import LeaseSummary, LeaseWorker
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(subject, body, to, from_email=None, html_body='', headers=None):
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        headers=headers or {},
+    )
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        headers=email.headers,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+@dataclass
+class SendSummary(LeaseSummary):
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class MailQueueWorker(LeaseWorker):
+    model = QueuedEmail
+    order_by = ("available_at", "pk")
+    summary_class = SendSummary
+
+    def __init__(self, batch_size=50, lease_seconds=300, max_attempts=6, backoff_seconds=60, worker_id=None,
+                 connection=None):
+        super().__init__(batch_size, lease_seconds, worker_id)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.connection = connection or get_connection(fail_silently=False)
+        self.connected = False
+
+    def pending(self, now):
+        return QueuedEmail.objects.filter(
+            sent_at__isnull=True,
+            failed_at__isnull=True,
+            available_at__lte=now,
+        ).filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+    def claim_batch(self):
+        ids = self.claim()
+        return list(self.held().filter(pk__in=ids).order_by("pk"))
+
+    def open(self):
+        if not self.connected:
+            # An explicitly opened backend stays open across send_messages() calls.
+            self.connection.open()
+            self.connected = True
+
+    def close(self):
+        if self.connected:
+            try:
+                self.connection.close()
+            finally:
+                self.connected = False
+
+    def send(self, email):
+        self.open()
+        try:
+            if not self.connection.send_messages([build_message(email, self.connection)]):
+                raise RuntimeError("The mail backend did not accept the message")
+        except Exception:
+            # The server may have dropped us mid-conversation; start the next message afresh.
+            self.close()
+            raise
+
+    def run_once(self):
+        """Claim and send one batch."""
+        batch = self.claim_batch()
+        summary = SendSummary(claimed=len(batch))
+        sent, errors = [], []
+        for email in batch:
+            try:
+                self.send(email)
+            except Exception as e:
+                logger.warning("Queued email %s failed on attempt %d: %s", email.pk, email.attempts + 1, e)
+                errors.append((email, str(e)))
+            else:
+                sent.append(email.pk)
+        self.record(sent, errors, summary)
+        return summary
+
+    def report(self, summary, seconds):
+        if summary.claimed:
+            logger.info(
+                "Mail queue run by %s: %d claimed, %d sent, %d retried, %d failed in %.1fs",
+                self.worker_id, summary.claimed, summary.sent, summary.retried, summary.failed, seconds,
+            )
+
+    @transaction.atomic
+    def record(self, sent, errors, summary):
+        now = timezone.now()
+        held = self.held()
+        if sent:
+            summary.sent += held.filter(pk__in=sent).update(
+                sent_at=now,
+                attempts=F("attempts") + 1,
+                claimed_until=None,
+                claimed_by="",
+            )
+        for email, error in errors:
+            attempt = email.attempts + 1
+            exhausted = attempt >= self.max_attempts
+            held.filter(pk=email.pk).update(
+                attempts=attempt,
+                last_error=error,
+                available_at=now + datetime.timedelta(seconds=self.backoff_seconds * 2 ** (attempt - 1)),
+                failed_at=now if exhausted else None,
+                claimed_until=None,
+                claimed_by="",
+            )
+            if exhausted:
+                summary.failed += 1
+                logger.error("Queued email %s gave up after %d attempts: %s", email.pk, attempt, error)
+            else:
+                summary.retried += 1
@@ -0,0 +1,59 @@
+# emails/management/commands/send_campaign.py
+# Send (or resume) a campaign created in the admin:
+#   python manage.py send_campaign 3 --add-audience --workers 4 --rate 20
+# Re-running it picks up wherever the previous run stopped.
+from django.core.management.base import BaseCommand, CommandError
+
+from emails.campaigns import CampaignSender, add_users, marketing_audience, progress
+from emails.models import Campaign
+
+
+class Command(BaseCommand):
+    help = 'Send a bulk email campaign over pooled SMTP connections; safe to resume and to run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+        parser.add_argument(
+            '--add-audience',
+            action='store_true',
+            help='First add every customer with marketing consent (already-added addresses are left alone)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Recipients claimed per chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Parallel SMTP connections')
+        parser.add_argument('--rate', type=float, default=0, help='Messages per second across all workers; 0 for no limit')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds a claimed chunk is reserved for this sender')
+        parser.add_argument('--max-attempts', type=int, default=3, help='Give up on a recipient after this many failures')
+        parser.add_argument('--retry-after', type=float, default=60.0, help='Seconds before the first retry; doubles each time')
+        parser.add_argument('--max-chunks', type=int, default=None)
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop claiming new chunks after this long')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = Campaign.objects.get(pk=options['campaign_id'])
+        except Campaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign_id']} does not exist")
+        if campaign.status == 'finished' and not options['add_audience']:
+            raise CommandError(f"Campaign {campaign.pk} has already finished")
+
+        if options['add_audience']:
+            added = add_users(campaign, marketing_audience())
+            self.stdout.write(f"Added {added} recipients")
+            if added and campaign.status == 'finished':
+                Campaign.objects.filter(pk=campaign.pk).update(status='sending', finished_at=None)
+
+        sender = CampaignSender(
+            campaign,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            rate=options['rate'],
+            lease_seconds=options['lease'],
+            max_attempts=options['max_attempts'],
+            retry_seconds=options['retry_after'],
+        )
+        summary = sender.run(max_chunks=options['max_chunks'], max_seconds=options['max_seconds'])
+        self.stdout.write(
+            f"{sender.worker_id}: claimed {summary.claimed}, sent {summary.sent}, retried {summary.retried}, "
+            f"failed {summary.failed}, skipped {summary.skipped}"
+        )
+        totals = progress(campaign)
+        self.stdout.write(f"Campaign {campaign.pk}: " + ', '.join(f"{count} {status}" for status, count in totals.items()))
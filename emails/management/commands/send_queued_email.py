@@ -0,0 +1,47 @@
+# emails/management/commands/send_queued_email.py
+# Run one or more long-lived workers, e.g. under systemd:
+#   python manage.py send_queued_email --loop
+import time
+
+from django.core.management.base import BaseCommand
+
+from emails.mailqueue import MailQueueWorker
+
+
+class Command(BaseCommand):
+    help = 'Send queued email over one persistent SMTP connection; safe to run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per batch')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds a claimed batch is reserved for this worker')
+        parser.add_argument('--max-attempts', type=int, default=6, help='Give up on a message after this many failures')
+        parser.add_argument('--backoff', type=float, default=60.0, help='Seconds before the first retry; doubles each time')
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop claiming new batches after this long')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new mail')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds between polls when idle with --loop')
+
+    def handle(self, *args, **options):
+        worker = MailQueueWorker(
+            batch_size=options['batch_size'],
+            lease_seconds=options['lease'],
+            max_attempts=options['max_attempts'],
+            backoff_seconds=options['backoff'],
+        )
+        try:
+            while True:
+                summary = worker.run(max_batches=options['max_batches'], max_seconds=options['max_seconds'])
+                if summary.claimed or not options['loop']:
+                    self.stdout.write(
+                        f"{worker.worker_id}: claimed {summary.claimed}, sent {summary.sent}, "
+                        f"retried {summary.retried}, failed {summary.failed}"
+                    )
+                if not options['loop']:
+                    break
+                if not summary.claimed:
+                    # Don't hold the SMTP connection open through idle periods.
+                    worker.close()
+                if summary.claimed < worker.batch_size:
+                    time.sleep(options['sleep'])
+        finally:
+            worker.close()
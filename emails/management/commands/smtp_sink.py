@@ -0,0 +1,115 @@
+# emails/management/commands/smtp_sink.py
+# A local SMTP server that accepts everything and keeps it on disk, for
+# testing the mail queue without MailHog or a real relay. It listens where
+# the DEBUG MailHog settings point (localhost:1025):
+#   python manage.py smtp_sink
+#   python manage.py smtp_sink --fail-rate 0.2      (exercise retries)
+import os
+import random
+import socket
+import socketserver
+import time
+from email import message_from_bytes
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply(f"220 {socket.gethostname()} smtp sink ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply(f"250-{socket.gethostname()}")
+                self.reply("250-8BITMIME")
+                self.reply("250 SMTPUTF8")
+            elif verb == 'HELO':
+                self.reply(f"250 {socket.gethostname()}")
+            elif verb == 'MAIL':
+                sender, recipients = command.partition(':')[2].strip(), []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(command.partition(':')[2].strip())
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.reply(self.server.deliver(sender, recipients, self.read_data()))
+                sender, recipients = None, []
+            elif verb in ('RSET', 'NOOP'):
+                if verb == 'RSET':
+                    sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, maildir, fail_rate, stdout):
+        super().__init__(address, SinkHandler)
+        self.maildir = maildir
+        self.fail_rate = fail_rate
+        self.stdout = stdout
+        self.count = 0
+
+    def deliver(self, sender, recipients, data):
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.stdout.write(f"rejected mail from {sender} (simulated failure)")
+            return "451 Simulated temporary failure, try again later"
+        self.count += 1
+        if self.maildir:
+            name = f"{time.time():.6f}-{self.count}.eml"
+            with open(os.path.join(self.maildir, name), 'wb') as f:
+                f.write(data)
+        subject = message_from_bytes(data).get('Subject', '')
+        self.stdout.write(f"#{self.count} {sender} -> {', '.join(recipients)}: {subject}")
+        return "250 OK: queued"
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that stores every message it receives (for development and tests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument(
+            '--maildir',
+            default=os.path.join(settings.BASE_DIR, 'private', 'mail'),
+            help="Directory for the .eml files; '' to keep nothing"
+        )
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of messages to reject with a 451')
+
+    def handle(self, *args, **options):
+        if options['maildir']:
+            os.makedirs(options['maildir'], exist_ok=True)
+        server = SinkServer((options['host'], options['port']), options['maildir'], options['fail_rate'], self.stdout)
+        self.stdout.write(f"SMTP sink listening on {options['host']}:{options['port']}, saving to {options['maildir'] or 'nowhere'}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,136 @@
+from django.db import models
+from django.utils import timezone
+
+from accounts.models import User
+
+
+class QueuedEmail(models.Model):
+    """
+    An email waiting to be sent (or already sent) by ``manage.py send_queued_email``.
+    Views enqueue instead of talking SMTP, so a slow mail server never
+    holds up a request.
+    """
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict, blank=True)
+
+    # Delivery
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Only unsent mail is ever scanned by the worker.
+            models.Index(
+                fields=['available_at'],
+                name='queuedemail_pending_idx',
+                condition=models.Q(sent_at__isnull=True, failed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
+
+
+class Campaign(models.Model):
+    """
+    One email sent to many recipients by ``manage.py send_campaign``. The
+    templates are rendered once per variant; ``[[ field ]]`` merge fields
+    are filled in per recipient (see emails/campaigns.py).
+    """
+    KIND_CHOICES = [
+        ('marketing', 'Marketing'),
+        ('transactional', 'Transactional'),
+    ]
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('sending', 'Sending'),
+        ('paused', 'Paused'),
+        ('finished', 'Finished'),
+    ]
+
+    name = models.CharField(max_length=200)
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        default='marketing',
+        help_text="Marketing mail only goes to customers who currently consent to it"
+    )
+    subject = models.CharField(max_length=255, help_text="May contain merge fields, e.g. [[ first_name ]]")
+    html_template = models.CharField(max_length=200)
+    text_template = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Defaults to the HTML version with the tags stripped"
+    )
+    context = models.JSONField(default=dict, blank=True, help_text="Extra template context shared by every recipient")
+    from_email = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name
+
+
+class CampaignRecipient(models.Model):
+    """
+    Delivery status of one campaign message. Kept deliberately narrow -
+    campaigns can run to tens of thousands of rows, and the message itself
+    is rebuilt from the campaign at send time.
+    """
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+    SKIPPED = 3
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+        (SKIPPED, 'Skipped'),
+    ]
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='recipients')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    email = models.CharField(max_length=254)
+    variant = models.CharField(max_length=30, blank=True)
+    merge = models.JSONField(null=True, blank=True)
+
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='campaignrecipient_unique_email'),
+        ]
+        indexes = [
+            # Only unsent rows are ever scanned by the sender.
+            models.Index(
+                fields=['campaign', 'id'],
+                name='campaignrecipient_pending_idx',
+                condition=models.Q(status=0),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.get_status_display()})"
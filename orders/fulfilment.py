@@ -0,0 +1,81 @@
+# orders/fulfilment.py
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from artworks.models import Artwork
+
+logger = logging.getLogger(__name__)
+
+
+def allocate_stock(order):
+    """
+    Take the stock for every line of a paid order in one conditional UPDATE.
+
+    Originals flip to sold; prints decrement ``stock_quantity`` and are only
+    touched while ``stock_quantity >= quantity``. Lines that fail the guard are
+    left alone and returned as an oversell report (a list of dicts) so the
+    caller can deal with them instead of driving stock negative.
+    """
+    wanted = defaultdict(int)
+    for artwork_id, quantity in order.items.filter(artwork__isnull=False).values_list('artwork_id', 'quantity'):
+        wanted[artwork_id] += quantity
+
+    if not wanted:
+        return []
+
+    with transaction.atomic():
+        # Lock the rows so the snapshot below matches what the UPDATE sees.
+        current = {
+            row['pk']: row
+            for row in Artwork.objects.select_for_update()
+            .filter(pk__in=wanted)
+            .values('pk', 'title', 'artwork_type', 'stock_quantity', 'is_available', 'status')
+        }
+
+        originals, prints, oversold = [], [], []
+        for artwork_id, quantity in wanted.items():
+            row = current.get(artwork_id)
+            if row is None:
+                continue
+            if row['artwork_type'] == 'original':
+                if row['is_available'] and row['status'] != 'sold':
+                    originals.append(artwork_id)
+                else:
+                    oversold.append(_oversell_line(row, quantity))
+            elif row['stock_quantity'] >= quantity:
+                prints.append((artwork_id, quantity))
+            else:
+                oversold.append(_oversell_line(row, quantity))
+
+        guard = Q(pk__in=originals, is_available=True) & ~Q(status='sold')
+        for artwork_id, quantity in prints:
+            guard |= Q(pk=artwork_id, stock_quantity__gte=quantity)
+
+        if originals or prints:
+            Artwork.objects.filter(guard).update(
+                stock_quantity=Case(
+                    *[When(pk=artwork_id, then=F('stock_quantity') - quantity) for artwork_id, quantity in prints],
+                    default=F('stock_quantity'),
+                ),
+                status=Case(When(pk__in=originals, then=Value('sold')), default=F('status')),
+                is_available=Case(When(pk__in=originals, then=Value(False)), default=F('is_available')),
+                updated_at=timezone.now(),
+            )
+
+    if oversold:
+        logger.warning("Order %s oversold %d line(s): %s", order.order_number, len(oversold), oversold)
+    return oversold
+
+
+def _oversell_line(row, quantity):
+    return {
+        'artwork_id': row['pk'],
+        'title': row['title'],
+        'artwork_type': row['artwork_type'],
+        'requested': quantity,
+        'available': row['stock_quantity'] if row['is_available'] and row['status'] != 'sold' else 0,
+    }
@@ -0,0 +1,112 @@
+# orders/handlers.py
+"""
+Outbox handlers (see orders/outbox.py). Delivery is at-least-once, so every
+handler here must be safe to run more than once for the same event.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from artworks.caching import catalogue_changed
+from cart.models import Cart
+from subscriptions.models import Subscription, SubscriptionUsage
+from .invoices import render_invoice_pdf
+from .models import Order, OrderItem
+from .outbox import handler
+
+logger = logging.getLogger(__name__)
+
+
+def order_paid_events(order):
+    """The events ``publish_many`` should write when ``order`` is paid."""
+    artwork_ids = list(order.items.filter(artwork__isnull=False).values_list('artwork_id', flat=True))
+    events = [
+        ('order.confirmation_email', {'order_id': order.pk}, order),
+        ('order.invoice', {'order_id': order.pk}, order),
+        ('order.usage_rollup', {'order_id': order.pk}, order),
+        ('cache.invalidate', {'artwork_ids': artwork_ids}, order),
+    ]
+    if order.user_id:
+        events.append(('cart.clear', {'user_id': order.user_id}, order))
+    return events
+
+
+@handler('order.confirmation_email')
+def send_confirmation_email(payload, event):
+    order = Order.objects.get(pk=payload['order_id'])
+    message = render_to_string('orders/emails/order_confirmation.html', {
+        'order': order,
+        'order_items': order.items.all(),
+    })
+    send_mail(
+        f"Order confirmation - {order.order_number}",
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [order.email],
+        html_message=message,
+        fail_silently=False,
+    )
+
+
+@handler('order.invoice')
+def render_invoice(payload, event):
+    render_invoice_pdf(Order.objects.get(pk=payload['order_id']))
+
+
+@handler('order.usage_rollup')
+def update_usage_rollup(payload, event):
+    """
+    Recompute this month's sales figures for each artist on the order.
+    Recomputing rather than incrementing keeps repeated deliveries harmless.
+    """
+    order = Order.objects.get(pk=payload['order_id'])
+    paid_at = timezone.localtime(order.paid_at or timezone.now())
+    month = paid_at.date().replace(day=1)
+    month_start = timezone.make_aware(datetime.datetime.combine(month, datetime.time.min))
+    next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+    month_end = timezone.make_aware(datetime.datetime.combine(next_month, datetime.time.min))
+
+    artist_ids = set(order.items.filter(artwork__isnull=False).values_list('artwork__artist_id', flat=True))
+    subscriptions = {
+        sub.artist_id: sub
+        for sub in Subscription.objects.filter(
+            artist_id__in=artist_ids,
+            status__in=['trialing', 'active', 'past_due'],
+        ).order_by('created_at')
+    }
+    totals = (
+        OrderItem.objects.filter(
+            artwork__artist_id__in=subscriptions,
+            order__is_paid=True,
+            order__paid_at__gte=month_start,
+            order__paid_at__lt=month_end,
+        )
+        .values('artwork__artist_id')
+        .annotate(sold=Sum('quantity'), amount=Sum('total'), commission=Sum('artist_commission'))
+    )
+    for row in totals:
+        SubscriptionUsage.objects.update_or_create(
+            subscription=subscriptions[row['artwork__artist_id']],
+            month=month,
+            defaults={
+                'artworks_sold': row['sold'],
+                'total_sales_amount': row['amount'] or 0,
+                'commission_earned': row['commission'] or 0,
+            },
+        )
+
+
+@handler('cache.invalidate')
+def invalidate_artworks(payload, event):
+    # Stock changes go through queryset.update(), which sends no signals.
+    catalogue_changed(payload.get('artwork_ids', []))
+
+
+@handler('cart.clear')
+def clear_cart(payload, event):
+    Cart.objects.filter(user_id=payload['user_id'], is_active=True).delete()
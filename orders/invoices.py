@@ -0,0 +1,51 @@
+# orders/invoices.py
+"""
+Invoice rendering. PDFs are rendered once, by the outbox after payment, and
+kept outside MEDIA_ROOT so they are only ever served through the
+owner-checked ``DownloadInvoiceView``.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.template.loader import render_to_string
+
+invoice_storage = FileSystemStorage(location=settings.INVOICE_ROOT)
+
+
+def invoice_context(order):
+    return {
+        'order': order,
+        'order_items': order.items.select_related('artwork'),
+        'company_name': 'Jersey Artwork',
+        'company_address': 'St. Helier, Jersey',
+        'company_email': 'info@jerseyartwork.je',
+        'company_phone': '+44 1534 123456'
+    }
+
+
+def invoice_html(order):
+    return render_to_string('orders/invoice_pdf.html', invoice_context(order))
+
+
+def invoice_name(order):
+    return f"invoice_{order.order_number}.pdf"
+
+
+def render_invoice_pdf(order):
+    """Render the invoice and store it, replacing any earlier copy."""
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    pdf = HTML(string=invoice_html(order)).write_pdf(font_config=FontConfiguration())
+    name = invoice_name(order)
+    invoice_storage.delete(name)
+    invoice_storage.save(name, ContentFile(pdf))
+    return name
+
+
+def stored_invoice(order):
+    """Open the pre-rendered PDF, or return None if there isn't one yet."""
+    name = invoice_name(order)
+    if invoice_storage.exists(name):
+        return invoice_storage.open(name, 'rb')
+    return None
@@ -0,0 +1,41 @@
+# orders/management/commands/dispatch_outbox.py
+# Run one or more long-lived workers, e.g. under systemd:
+#   python manage.py dispatch_outbox --loop
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.outbox import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox events (emails, invoices, rollups, cache invalidation); safe to run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events claimed per batch')
+        parser.add_argument('--lease', type=int, default=120, help='Seconds a claimed batch is reserved for this worker')
+        parser.add_argument('--max-attempts', type=int, default=8, help='Give up on an event after this many failures')
+        parser.add_argument('--backoff', type=float, default=30.0, help='Seconds before the first retry; doubles each time')
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop claiming new batches after this long')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds between polls when idle with --loop')
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher(
+            batch_size=options['batch_size'],
+            lease_seconds=options['lease'],
+            max_attempts=options['max_attempts'],
+            backoff_seconds=options['backoff'],
+        )
+        while True:
+            summary = dispatcher.run(max_batches=options['max_batches'], max_seconds=options['max_seconds'])
+            if summary.claimed or not options['loop']:
+                self.stdout.write(
+                    f"{dispatcher.worker_id}: claimed {summary.claimed}, delivered {summary.delivered}, "
+                    f"retried {summary.retried}, failed {summary.failed}"
+                )
+            if not options['loop']:
+                break
+            if summary.claimed < dispatcher.batch_size:
+                time.sleep(options['sleep'])
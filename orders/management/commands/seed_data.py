@@ -0,0 +1,49 @@
+# orders/management/commands/seed_data.py
+# Build a realistic dataset for load tests and query-plan checks, e.g.
+#   python manage.py seed_data --scale large --seed 7      (~10M rows)
+#   python manage.py seed_data --scale small --orders 50000
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.seeding import SCALES, Seeder
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, deterministic synthetic dataset (users, artworks, orders, views, carts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Preset volumes (default small)')
+        parser.add_argument('--seed', type=int, default=42, help='Same seed and --end-date give the same data')
+        parser.add_argument('--end-date', help='Newest date to generate (YYYY-MM-DD, default today)')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        for name in ('artists', 'artworks-per-artist', 'customers', 'orders', 'views', 'carts'):
+            parser.add_argument(f'--{name}', type=int, help='Override the preset')
+
+    def handle(self, *args, **options):
+        counts = dict(SCALES[options['scale']])
+        for name in counts:
+            if options.get(name) is not None:
+                counts[name] = options[name]
+        end_date = None
+        if options['end_date']:
+            end_date = datetime.date.fromisoformat(options['end_date'])
+
+        self.stdout.write(f"Seeding {options['scale']} dataset with seed {options['seed']}: {counts}")
+        seeder = Seeder(
+            seed=options['seed'],
+            end_date=end_date,
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+            **counts,
+        )
+        try:
+            summary = seeder.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for label, rows in sorted(summary.rows.items()):
+            self.stdout.write(f"  {label}: {rows}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summary.total} rows in {summary.seconds:.1f}s ({summary.total / max(summary.seconds, 0.001):.0f} rows/s)"
+        ))
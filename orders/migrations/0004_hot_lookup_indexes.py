@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+from artworks.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so the tables stay writable on a live database.
+    atomic = False
+
+    dependencies = [
+        ('orders', '0003_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending'), _negated=True), fields=['user', '-created_at'], name='order_user_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['-created_at'], name='order_paid_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='orderitem',
+            index=models.Index(fields=['artwork', 'order'], name='orderitem_artwork_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='refundrequest',
+            index=models.Index(fields=['artist', 'status'], name='refundreq_artist_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='refundrequest',
+            index=models.Index(fields=['artist', '-created_at'], name='refundreq_artist_recent_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from accounts.models import User
 from artworks.models import Artwork
 from decimal import Decimal
@@ -110,6 +111,17 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Customer order list (pending orders are hidden there).
+            models.Index(
+                fields=['user', '-created_at'],
+                name='order_user_recent_idx',
+                condition=~models.Q(status='pending'),
+            ),
+            models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_idx'),
+            # Artist views join paid orders through their items.
+            models.Index(fields=['-created_at'], name='order_paid_recent_idx', condition=models.Q(is_paid=True)),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
@@ -192,6 +204,10 @@ class OrderItem(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Artist sales: covers artwork -> order without touching the heap.
+            models.Index(fields=['artwork', 'order'], name='orderitem_artwork_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.artwork_title}"
@@ -304,3 +320,44 @@ class RefundRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['artist', 'status'], name='refundreq_artist_status_idx'),
+            models.Index(fields=['artist', '-created_at'], name='refundreq_artist_recent_idx'),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effects of an order change, written in the same transaction as the
+    change and delivered afterwards by ``manage.py dispatch_outbox``.
+    """
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='outbox_events')
+
+    # Delivery
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Only undelivered events are ever scanned by the dispatcher.
+            models.Index(
+                fields=['available_at'],
+                name='outbox_pending_idx',
+                condition=models.Q(processed_at__isnull=True, failed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
@@ -0,0 +1,138 @@
+# orders/outbox.py
+"""
+Transactional outbox for order side effects.
+
+Code that changes an order calls ``publish()`` inside the same transaction,
+so an event exists exactly when the change it describes was committed.
+``manage.py dispatch_outbox`` then delivers events in batches:
+
+* rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased to
+  one dispatcher, so several can run side by side;
+* an event is marked processed only after its handler returns, so delivery
+  is at-least-once and handlers must tolerate repeats;
+* failures are retried with exponential backoff until ``max_attempts``,
+  after which the event is parked with ``failed_at`` set for inspection.
+
+Each side effect is its own topic, so one failing handler never re-runs
+the others. Handlers are registered with ``@handler(topic)`` in
+``orders/handlers.py``.
+"""
+import datetime
+import logging
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from artworks.leases import LeaseSummary, LeaseWorker
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(topic):
+    """Register ``func(payload, event)`` as the handler for ``topic``."""
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+def publish(topic, payload=None, order=None):
+    return OutboxEvent.objects.create(topic=topic, payload=payload or {}, order=order)
+
+
+def publish_many(events):
+    """Insert several ``(topic, payload, order)`` events in one query."""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(topic=topic, payload=payload or {}, order=order)
+        for topic, payload, order in events
+    ])
+
+
+@dataclass
+class DispatchSummary(LeaseSummary):
+    delivered: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class OutboxDispatcher(LeaseWorker):
+    model = OutboxEvent
+    order_by = ("available_at", "pk")
+    summary_class = DispatchSummary
+
+    def __init__(self, batch_size=100, lease_seconds=120, max_attempts=8, backoff_seconds=30, worker_id=None):
+        from . import handlers  # noqa: F401  (registers the handlers)
+
+        super().__init__(batch_size, lease_seconds, worker_id)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+    def pending(self, now):
+        return OutboxEvent.objects.filter(
+            processed_at__isnull=True,
+            failed_at__isnull=True,
+            available_at__lte=now,
+        ).filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+    def claim_batch(self):
+        ids = self.claim()
+        return list(self.held().filter(pk__in=ids).order_by("pk"))
+
+    def run_once(self):
+        """Claim and deliver one batch."""
+        batch = self.claim_batch()
+        summary = DispatchSummary(claimed=len(batch))
+        delivered, errors = [], []
+        for event in batch:
+            func = _handlers.get(event.topic)
+            try:
+                if func is None:
+                    raise LookupError(f"No outbox handler for {event.topic!r}")
+                func(event.payload, event)
+            except Exception as e:
+                logger.warning("Outbox event %s (%s) failed on attempt %d: %s", event.pk, event.topic, event.attempts + 1, e)
+                errors.append((event, str(e)))
+            else:
+                delivered.append(event.pk)
+        self.record(delivered, errors, summary)
+        return summary
+
+    def report(self, summary, seconds):
+        if summary.claimed:
+            logger.info(
+                "Outbox dispatch by %s: %d claimed, %d delivered, %d retried, %d failed in %.1fs",
+                self.worker_id, summary.claimed, summary.delivered, summary.retried, summary.failed, seconds,
+            )
+
+    @transaction.atomic
+    def record(self, delivered, errors, summary):
+        now = timezone.now()
+        held = self.held()
+        if delivered:
+            summary.delivered += held.filter(pk__in=delivered).update(
+                processed_at=now,
+                attempts=F("attempts") + 1,
+                claimed_until=None,
+                claimed_by="",
+            )
+        for event, error in errors:
+            attempt = event.attempts + 1
+            exhausted = attempt >= self.max_attempts
+            held.filter(pk=event.pk).update(
+                attempts=attempt,
+                last_error=error,
+                available_at=now + datetime.timedelta(seconds=self.backoff_seconds * 2 ** (attempt - 1)),
+                failed_at=now if exhausted else None,
+                claimed_until=None,
+                claimed_by="",
+            )
+            if exhausted:
+                summary.failed += 1
+                logger.error("Outbox event %s (%s) gave up after %d attempts: %s", event.pk, event.topic, attempt, error)
+            else:
+                summary.retried += 1
@@ -0,0 +1,429 @@
+# orders/seeding.py
+"""
+Synthetic dataset generator for performance work (``manage.py seed_data``).
+
+Small tables (users, profiles, plans, subscriptions) go through
+``bulk_create``. The big ones (artworks, images, orders, order items,
+views, carts) are streamed straight into PostgreSQL with ``COPY``; other
+databases fall back to batched ``executemany``. Rows are generated with
+explicit ids so orders and their items can be written in chunks without
+reading anything back, and the sequences are reset at the end.
+
+Everything is drawn from one ``random.Random(seed)`` anchored on
+``end_date``, so the same arguments always produce the same data.
+Popularity is Zipf-skewed: a few artworks take most of the views, orders
+and carts, and a few customers place most of the orders, which is what
+makes caches and indexes behave realistically.
+"""
+import bisect
+import datetime
+import itertools
+import logging
+import random
+import string
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+
+from accounts.models import ArtistProfile, CustomerProfile, User
+from artworks.models import Artwork, ArtworkImage, ArtworkView, Category
+from cart.models import Cart, CartItem
+from subscriptions.models import Subscription, SubscriptionPlan
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+SCALES = {
+    # artists, artworks per artist, customers, orders, views, carts
+    'small': dict(artists=20, artworks_per_artist=10, customers=200, orders=2000, views=10000, carts=300),
+    'medium': dict(artists=200, artworks_per_artist=25, customers=10000, orders=100000, views=500000, carts=20000),
+    'large': dict(artists=2000, artworks_per_artist=50, customers=200000, orders=2000000, views=4000000, carts=300000),
+}
+
+CATEGORIES = [
+    'Painting', 'Photography', 'Printmaking', 'Sculpture', 'Ceramics', 'Textiles',
+    'Drawing', 'Mixed Media', 'Digital Art', 'Jewellery', 'Glass', 'Woodwork',
+]
+PARISHES = [
+    'st_helier', 'st_brelade', 'st_clement', 'st_john', 'st_lawrence', 'st_martin',
+    'st_ouen', 'st_peter', 'st_saviour', 'trinity', 'st_mary', 'grouville',
+]
+FIRST_NAMES = ['Alex', 'Sam', 'Jo', 'Chris', 'Morgan', 'Taylor', 'Jamie', 'Robin', 'Charlie', 'Ali', 'Kim', 'Pat']
+LAST_NAMES = ['Le Breton', 'Renouf', 'Le Cornu', 'Vibert', 'Amy', 'Le Sueur', 'Pallot', 'De Gruchy', 'Le Maistre', 'Hamon']
+SUBJECTS = ['Harbour', 'Tide', 'Cliffs', 'Lighthouse', 'Dunes', 'Orchard', 'Granite', 'Gorey', 'Rozel', 'Plémont']
+ADJECTIVES = ['Morning', 'Winter', 'Quiet', 'Golden', 'Storm', 'Low', 'Evening', 'Blue', 'Salt', 'Summer']
+
+ARTWORK_TYPES = (['original', 'print', 'digital', 'commission'], [50, 35, 10, 5])
+ARTWORK_STATUSES = (['active', 'sold', 'draft', 'archived', 'reserved'], [70, 15, 8, 5, 2])
+ORDER_STATUSES = (['delivered', 'shipped', 'processing', 'confirmed', 'cancelled', 'pending', 'refunded'],
+                  [60, 8, 6, 5, 12, 7, 2])
+PAID_STATUSES = {'delivered', 'shipped', 'processing', 'confirmed', 'refunded'}
+
+
+@dataclass
+class SeedSummary:
+    rows: dict
+    seconds: float
+
+    @property
+    def total(self):
+        return sum(self.rows.values())
+
+
+class TableWriter:
+    """Stream tuples for ``columns`` (attnames) into ``model``'s table."""
+
+    def __init__(self, model, columns, batch_size=10000):
+        self.model = model
+        self.batch_size = batch_size
+        fields = {f.attname: f for f in model._meta.concrete_fields}
+        now = timezone.now()
+        # Columns we don't generate get their model default, prepared once. An
+        # auto primary key we don't supply is left to its sequence: an
+        # explicit NULL would violate NOT NULL on PostgreSQL.
+        self.extra = [
+            (name, f.get_db_prep_save(now if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+                                      else f.get_default(), connection))
+            for name, f in fields.items()
+            if name not in columns and not (f.primary_key and isinstance(f, AutoFieldMixin))
+        ]
+        self.columns = list(columns) + [name for name, _ in self.extra]
+        self.constants = tuple(value for _, value in self.extra)
+        table = connection.ops.quote_name(model._meta.db_table)
+        cols = ', '.join(connection.ops.quote_name(c) for c in self.columns)
+        self.copy_sql = f"COPY {table} ({cols}) FROM STDIN"
+        self.insert_sql = f"INSERT INTO {table} ({cols}) VALUES ({', '.join(['%s'] * len(self.columns))})"
+
+    def write(self, rows):
+        count = 0
+        constants = self.constants
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                with cursor.copy(self.copy_sql) as copy:
+                    for row in rows:
+                        copy.write_row(row + constants)
+                        count += 1
+            else:
+                rows = iter(rows)
+                while batch := [row + constants for row in itertools.islice(rows, self.batch_size)]:
+                    cursor.executemany(self.insert_sql, batch)
+                    count += len(batch)
+        return count
+
+
+def _next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def _zipf_cum_weights(n, s, rng):
+    """Cumulative Zipf weights over ``n`` items, in a seed-dependent random rank order."""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1.0 / rank ** s for rank in ranks))
+
+
+class ZipfPicker:
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.cum = _zipf_cum_weights(n, s, rng)
+        self.total = self.cum[-1]
+        self.n = n
+
+    def __call__(self):
+        return min(bisect.bisect(self.cum, self.rng.random() * self.total), self.n - 1)
+
+
+class Seeder:
+    def __init__(self, seed=42, end_date=None, batch_size=10000, artists=20, artworks_per_artist=10,
+                 customers=200, orders=2000, views=10000, carts=300, stdout=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        end_date = end_date or timezone.localdate()
+        self.end = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time.min))
+        self.batch_size = batch_size
+        self.counts = dict(artists=artists, artworks_per_artist=artworks_per_artist, customers=customers,
+                           orders=orders, views=views, carts=carts)
+        self.prefix = f"seed{seed}"
+        self.rows = {}
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+        logger.info(message)
+
+    def days_ago(self, max_days):
+        return self.end - datetime.timedelta(seconds=self.rng.random() * max_days * 86400)
+
+    def run(self):
+        if User.objects.filter(username__startswith=f"{self.prefix}-").exists():
+            raise ValueError(f"Data for seed {self.seed} already exists; pick another --seed.")
+        started = time.monotonic()
+        self.seed_reference_data()
+        self.seed_users()
+        self.seed_artworks()
+        self.seed_orders()
+        self.seed_views()
+        self.seed_carts()
+        self.reset_sequences()
+        return SeedSummary(rows=self.rows, seconds=time.monotonic() - started)
+
+    def _count(self, model, n):
+        self.rows[model._meta.label] = self.rows.get(model._meta.label, 0) + n
+
+    # --- small tables: ORM bulk_create ---
+
+    def seed_reference_data(self):
+        self.categories = []
+        for name in CATEGORIES:
+            category, _ = Category.objects.get_or_create(slug=name.lower().replace(' ', '-'), defaults={'name': name})
+            self.categories.append(category.pk)
+        self.plans = []
+        for i, plan_type in enumerate(['basic', 'professional', 'premium']):
+            plan, _ = SubscriptionPlan.objects.get_or_create(
+                slug=f"seed-{plan_type}",
+                defaults={
+                    'name': plan_type.title(),
+                    'plan_type': plan_type,
+                    'description': f"{plan_type.title()} plan (seeded)",
+                    'price': Decimal(10 + 15 * i),
+                    'display_order': i,
+                },
+            )
+            self.plans.append(plan.pk)
+
+    def seed_users(self):
+        rng = self.rng
+        password = make_password(f"{self.prefix}-password")
+        users = []
+        for kind, n in (('artist', self.counts['artists']), ('customer', self.counts['customers'])):
+            for i in range(n):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                users.append(User(
+                    username=f"{self.prefix}-{kind}-{i}",
+                    email=f"{self.prefix}-{kind}-{i}@example.je",
+                    first_name=first,
+                    last_name=last,
+                    password=password,
+                    user_type=kind,
+                    email_verified=rng.random() < 0.9,
+                    date_joined=self.days_ago(1095),
+                ))
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+        self._count(User, len(users))
+
+        rows = User.objects.filter(username__startswith=f"{self.prefix}-").values_list(
+            'pk', 'user_type', 'email', 'first_name', 'last_name')
+        by_kind = {'artist': [], 'customer': []}
+        for row in rows.order_by('pk').iterator(chunk_size=self.batch_size):
+            by_kind[row[1]].append(row)
+        self.artists = by_kind['artist']
+        self.customers = by_kind['customer']
+        self.artist_rates = [Decimal(rng.choice([10, 12, 15, 15, 20])) for _ in self.artists]
+
+        with transaction.atomic():
+            ArtistProfile.objects.bulk_create([
+                ArtistProfile(user_id=pk, display_name=f"{first} {last}", commission_rate=rate, is_approved=True)
+                for (pk, _, _, first, last), rate in zip(self.artists, self.artist_rates)
+            ], batch_size=self.batch_size)
+            CustomerProfile.objects.bulk_create([
+                CustomerProfile(user_id=pk, parish=rng.choice(PARISHES), marketing_consent=rng.random() < 0.3)
+                for pk, *_ in self.customers
+            ], batch_size=self.batch_size)
+            now = self.end
+            Subscription.objects.bulk_create([
+                Subscription(
+                    subscription_id=f"SUB-{self.prefix}-{pk}",
+                    artist_id=pk,
+                    plan_id=rng.choices(self.plans, weights=[60, 30, 10])[0],
+                    status=rng.choices(['active', 'trialing', 'past_due', 'cancelled'], weights=[80, 8, 4, 8])[0],
+                    current_period_start=now - datetime.timedelta(days=rng.randrange(30)),
+                    current_period_end=now + datetime.timedelta(days=rng.randrange(1, 30)),
+                )
+                for pk, *_ in self.artists
+            ], batch_size=self.batch_size)
+        self._count(ArtistProfile, len(self.artists))
+        self._count(CustomerProfile, len(self.customers))
+        self._count(Subscription, len(self.artists))
+        self.log(f"  users: {len(self.artists)} artists, {len(self.customers)} customers")
+
+    # --- big tables: COPY ---
+
+    def seed_artworks(self):
+        rng = self.rng
+        first_id = _next_id(Artwork)
+        n = len(self.artists) * self.counts['artworks_per_artist']
+        self.artwork_ids = range(first_id, first_id + n)
+        self.artwork_price = []
+        self.artwork_artist = []
+        self.artwork_type = []
+        self.artwork_title = []
+        self.artwork_available = []
+
+        def artworks():
+            pk = first_id
+            for artist_idx in range(len(self.artists)):
+                for _ in range(self.counts['artworks_per_artist']):
+                    kind = rng.choices(*ARTWORK_TYPES)[0]
+                    status = rng.choices(*ARTWORK_STATUSES)[0]
+                    if status == 'sold' and kind != 'original':
+                        status = 'active'
+                    price = Decimal(round(rng.lognormvariate(5.0 if kind == 'original' else 3.5, 0.6), 2)).quantize(Decimal('0.01'))
+                    title = f"{rng.choice(ADJECTIVES)} {rng.choice(SUBJECTS)} {pk}"
+                    created = self.days_ago(1095)
+                    self.artwork_price.append(price)
+                    self.artwork_artist.append(artist_idx)
+                    self.artwork_type.append(kind)
+                    self.artwork_title.append(title)
+                    self.artwork_available.append(status == 'active')
+                    yield (
+                        pk, title, f"{self.prefix}-artwork-{pk}", self.artists[artist_idx][0],
+                        f"{title}, seeded for load testing.", rng.choice(self.categories), kind,
+                        price, status == 'active', status, rng.randint(5, 50) if kind != 'original' else 1,
+                        f"artworks/seed/{pk % 97}.jpg", rng.random() < 0.03, rng.randint(0, 5000),
+                        created, created,
+                    )
+                    pk += 1
+
+        written = TableWriter(Artwork, [
+            'id', 'title', 'slug', 'artist_id', 'description', 'category_id', 'artwork_type', 'price',
+            'is_available', 'status', 'stock_quantity', 'main_image', 'featured', 'views', 'created_at', 'updated_at',
+        ]).write(artworks())
+        self._count(Artwork, written)
+
+        def images():
+            for pk in self.artwork_ids:
+                for position in range(rng.randint(0, 3)):
+                    yield (pk, f"artworks/gallery/seed/{(pk + position) % 97}.jpg", position == 0, position)
+
+        self._count(ArtworkImage, TableWriter(ArtworkImage, ['artwork_id', 'image', 'is_primary', 'order']).write(images()))
+        self.artwork_picker = ZipfPicker(n, 1.1, rng)
+        self.log(f"  artworks: {written}")
+
+    def seed_orders(self):
+        rng = self.rng
+        n = self.counts['orders']
+        customer_picker = ZipfPicker(len(self.customers), 0.8, rng)
+        span = 730 * 86400
+        start = self.end - datetime.timedelta(seconds=span)
+        order_id = _next_id(Order)
+        order_writer = TableWriter(Order, [
+            'id', 'order_number', 'user_id', 'email', 'phone', 'delivery_first_name', 'delivery_last_name',
+            'delivery_address_line_1', 'delivery_parish', 'delivery_postcode', 'status', 'subtotal',
+            'shipping_cost', 'total', 'payment_method', 'transaction_id', 'is_paid', 'paid_at',
+            'delivery_method', 'delivered_at', 'created_at', 'updated_at',
+        ], self.batch_size)
+        item_writer = TableWriter(OrderItem, [
+            'order_id', 'artwork_id', 'artwork_title', 'artwork_artist', 'artwork_type', 'quantity', 'price',
+            'total', 'artist_commission', 'created_at',
+        ], self.batch_size)
+
+        done = 0
+        while done < n:
+            orders, items = [], []
+            for i in range(done, min(n, done + self.batch_size)):
+                # Monotonic with jitter, so ids grow with time like a real table.
+                created = start + datetime.timedelta(seconds=span * (i + rng.random()) / n)
+                status = rng.choices(*ORDER_STATUSES)[0]
+                if created > self.end - datetime.timedelta(days=3) and status == 'delivered':
+                    status = 'processing'
+                paid = status in PAID_STATUSES
+                guest = rng.random() < 0.03
+                customer_pk, _, email, first, last = self.customers[customer_picker()]
+                subtotal = Decimal('0.00')
+                for _ in range(1 + min(3, int(rng.expovariate(1.5)))):
+                    idx = self.artwork_picker()
+                    kind = self.artwork_type[idx]
+                    quantity = 1 if kind == 'original' else rng.choice([1, 1, 1, 2, 3])
+                    price = self.artwork_price[idx]
+                    total = price * quantity
+                    subtotal += total
+                    artist_idx = self.artwork_artist[idx]
+                    _, _, _, a_first, a_last = self.artists[artist_idx]
+                    items.append((
+                        order_id, self.artwork_ids[idx], self.artwork_title[idx], f"{a_first} {a_last}", kind,
+                        quantity, price, total, (total * self.artist_rates[artist_idx] / 100).quantize(Decimal('0.01')),
+                        created,
+                    ))
+                shipping = Decimal('0.00') if subtotal >= 100 else Decimal('5.00')
+                delivery = rng.choices(['standard', 'express', 'collection'], weights=[75, 15, 10])[0]
+                orders.append((
+                    order_id, f"SD-{self.seed}-{order_id}", None if guest else customer_pk,
+                    email, '+44 7700 900000', first, last, f"{rng.randint(1, 200)} Seed Road",
+                    rng.choice(PARISHES), f"JE{rng.randint(1, 3)} {rng.randint(1, 9)}{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}",
+                    status, subtotal, shipping, subtotal + shipping, 'sumup' if paid else '',
+                    f"T{order_id:010d}" if paid else '', paid, created + datetime.timedelta(minutes=2) if paid else None,
+                    delivery, created + datetime.timedelta(days=rng.randint(2, 7)) if status == 'delivered' else None,
+                    created, created,
+                ))
+                order_id += 1
+            self._count(Order, order_writer.write(orders))
+            self._count(OrderItem, item_writer.write(items))
+            done += len(orders)
+            if done % (self.batch_size * 20) == 0 or done == n:
+                self.log(f"  orders: {done}/{n}")
+
+    def seed_views(self):
+        rng = self.rng
+        customers = self.customers
+
+        def views():
+            for _ in range(self.counts['views']):
+                viewer = customers[rng.randrange(len(customers))][0] if rng.random() < 0.4 else None
+                yield (
+                    self.artwork_ids[self.artwork_picker()], viewer,
+                    f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                    self.days_ago(365),
+                )
+
+        written = TableWriter(ArtworkView, ['artwork_id', 'viewer_id', 'ip_address', 'viewed_at'], self.batch_size).write(views())
+        self._count(ArtworkView, written)
+        self.log(f"  views: {written}")
+
+    def seed_carts(self):
+        rng = self.rng
+        first_id = _next_id(Cart)
+        cart_ids = range(first_id, first_id + self.counts['carts'])
+        alphabet = string.ascii_lowercase + string.digits
+
+        # Customers have at most one cart (views assume a single active one); the rest are anonymous.
+        owners = rng.sample([pk for pk, *_ in self.customers], min(len(self.customers), len(cart_ids) * 6 // 10))
+
+        def carts():
+            for i, pk in enumerate(cart_ids):
+                created = self.days_ago(90)
+                if i < len(owners):
+                    user, session_key = owners[i], None
+                else:
+                    user, session_key = None, ''.join(rng.choices(alphabet, k=32))
+                yield (pk, user, session_key, created, created, rng.random() < 0.8)
+
+        def items():
+            for pk in cart_ids:
+                chosen = {self.artwork_picker() for _ in range(1 + int(rng.expovariate(1.2)))}
+                for idx in sorted(chosen):
+                    yield (pk, self.artwork_ids[idx], 1, self.artwork_price[idx])
+
+        self._count(Cart, TableWriter(Cart, ['id', 'user_id', 'session_key', 'created_at', 'updated_at', 'is_active'],
+                                      self.batch_size).write(carts()))
+        self._count(CartItem, TableWriter(CartItem, ['cart_id', 'artwork_id', 'quantity', 'price_at_time'],
+                                          self.batch_size).write(items()))
+        self.log(f"  carts: {len(cart_ids)}")
+
+    def reset_sequences(self):
+        models = [Artwork, ArtworkImage, ArtworkView, Order, OrderItem, Cart, CartItem]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+            if connection.vendor == 'postgresql':
+                # Fresh statistics so the planner sees the new volumes straight away.
+                for model in models:
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
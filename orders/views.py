@@ -7,13 +7,14 @@ from django.views.generic import ListView, DetailView, TemplateView, FormView, U
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponse
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponse, FileResponse
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
 from django.db import transaction
 from django.db.models import Q, Sum, Count, Avg
 from django.core.paginator import Paginator
 from django.views.decorators.http import require_POST
+from django.utils.decorators import method_decorator
 from decimal import Decimal
 import json
 from datetime import datetime, timedelta
@@ -21,9 +22,12 @@ from django.template.loader import render_to_string
 # Import your models
 from .models import Order, OrderItem, OrderStatusHistory, RefundRequest
 from .forms import CheckoutForm, PaymentMethodForm, OrderStatusForm, RefundRequestForm
+from .invoices import invoice_html, invoice_name, stored_invoice
 from cart.models import Cart
 from accounts.models import User
 from artworks.models import Artwork
+from artworks.querybudget import query_budget
+from artworks.routers import replica_reads
 from payments.models import SumUpCheckout
 import csv
 # Any other app imports you might need
@@ -108,6 +112,7 @@ class CustomerOrderListView(LoginRequiredMixin, ListView):
         return context
 
 
+@method_decorator(query_budget(8), name='dispatch')
 class OrderDetailView(LoginRequiredMixin, DetailView):
     """Detailed view of a specific order."""
     model = Order
@@ -288,18 +293,13 @@ class DownloadInvoiceView(LoginRequiredMixin, View):
             user=request.user
         )
         
-        # Prepare context for template
-        context = {
-            'order': order,
-            'order_items': order.items.select_related('artwork'),
-            'company_name': 'Jersey Artwork',
-            'company_address': 'St. Helier, Jersey',
-            'company_email': 'info@jerseyartwork.je',
-            'company_phone': '+44 1534 123456'
-        }
+        # Rendered by the outbox after payment; fall back to rendering now.
+        stored = stored_invoice(order)
+        if stored:
+            return FileResponse(stored, as_attachment=True, filename=invoice_name(order), content_type='application/pdf')
         
         # Render HTML template
-        html_string = render_to_string('orders/invoice_pdf.html', context)
+        html_string = invoice_html(order)
         
         # Create PDF
         try:
@@ -329,6 +329,7 @@ class DownloadInvoiceView(LoginRequiredMixin, View):
             return response
 
 
+@method_decorator(replica_reads, name='dispatch')
 class OrderStatisticsView(LoginRequiredMixin, View):
     """API endpoint for order statistics (for charts)."""
     
@@ -377,6 +378,7 @@ class OrderStatisticsView(LoginRequiredMixin, View):
 
 
 
+@method_decorator(replica_reads, name='dispatch')
 class ArtistDashboardView(LoginRequiredMixin, TemplateView):
     """Main dashboard for artists showing sales overview."""
     template_name = 'orders/artist_dashboard.html'
@@ -616,6 +618,7 @@ class ArtistHandleRefundView(LoginRequiredMixin, FormView):
         return redirect('orders:artist_refund_list')
 
 
+@method_decorator(replica_reads, name='dispatch')
 class ArtistSalesReportView(LoginRequiredMixin, View):
     """Generate sales report for artist."""
     
@@ -0,0 +1,205 @@
+# payments/billing.py
+"""
+Subscription billing engine.
+
+Due subscriptions are claimed in batches with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and leased to this worker, charged with a bounded thread pool,
+and then written back in bulk. Any number of runners can work the same
+table:
+
+* a claimed row carries ``claimed_until``/``claimed_by``, so other runners
+  skip it until the lease runs out;
+* the PSP reference is derived from (subscription, period, attempt), so a
+  charge repeated after a crashed worker's lease expires is de-duplicated
+  by the provider instead of billing twice;
+* only a definite decline moves to the next attempt (and reference). An
+  error may have been charged anyway, e.g. a read timeout after the
+  provider authorised it, so it is retried later under the same
+  reference, and never counts towards deactivation;
+* results are applied only while this worker still holds the lease.
+"""
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from artworks.leases import LeaseSummary, LeaseWorker
+from . import citypay as citypay_api
+from .models import BillingAttempt, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChargeResult:
+    subscription_id: int
+    artist_id: int
+    period: datetime.date
+    attempt: int
+    reference: str
+    amount_gbp: object
+    status: str
+    gateway: str = "citypay"
+    error: str = ""
+    raw: dict = field(default_factory=dict)
+    duration_ms: int = 0
+
+
+@dataclass
+class BillingSummary(LeaseSummary):
+    succeeded: int = 0
+    declined: int = 0
+    errors: int = 0
+    deactivated: int = 0
+    results: list = field(default_factory=list)
+
+
+class BillingRunner(LeaseWorker):
+    model = Subscription
+    order_by = ("next_charge_date", "pk")
+    summary_class = BillingSummary
+
+    def __init__(self, batch_size=100, concurrency=8, lease_seconds=300, worker_id=None):
+        super().__init__(batch_size, lease_seconds, worker_id)
+        self.concurrency = concurrency
+        self.retry_days = list(settings.BILLING_RETRY_DAYS)
+
+    def pending(self, now):
+        return Subscription.objects.filter(
+            is_active=True,
+            next_charge_date__lte=now.date(),
+        ).filter(
+            Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=now),
+            Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+        )
+
+    def claim_batch(self):
+        ids = self.claim()
+        return list(self.held().filter(pk__in=ids))
+
+    def run_once(self):
+        """Claim, charge and record one batch."""
+        batch = self.claim_batch()
+        summary = BillingSummary(claimed=len(batch))
+        if not batch:
+            return summary
+
+        # Only the PSP calls run in the pool; all database work stays on this thread.
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="billing") as pool:
+            results = list(pool.map(self.charge, batch))
+
+        self.record(results, summary)
+        return summary
+
+    def report(self, summary, seconds):
+        logger.info(
+            "Billing run by %s: %d claimed, %d succeeded, %d declined, %d errors in %.1fs",
+            self.worker_id, summary.claimed, summary.succeeded, summary.declined, summary.errors, seconds,
+        )
+
+    def charge(self, sub):
+        period = sub.next_charge_date
+        attempt = sub.failed_attempts + 1
+        result = ChargeResult(
+            subscription_id=sub.pk,
+            artist_id=sub.artist_id,
+            period=period,
+            attempt=attempt,
+            reference=f"sub-{sub.pk}-{period:%Y%m%d}-{attempt}",
+            amount_gbp=sub.amount_gbp,
+            status="error",
+        )
+        started = time.perf_counter()
+        try:
+            if sub.citypay_token:
+                response = citypay_api.charge_citypay_token(sub.citypay_token, sub.amount_gbp, result.reference)
+                result.raw = response
+                if citypay_api.is_authorised(response):
+                    result.status = "succeeded"
+                else:
+                    result.status = "declined"
+                    result.error = str(response.get("result_message", "Declined"))
+            elif sub.sumup_token:
+                result.gateway = "sumup"
+                result.error = "SumUp token charging not implemented."
+            else:
+                result.error = "No stored token for subscription."
+        except Exception as e:
+            result.error = str(e)
+        result.duration_ms = int((time.perf_counter() - started) * 1000)
+        return result
+
+    @transaction.atomic
+    def record(self, results, summary):
+        now = timezone.now()
+        held_ids = set()
+        for r in results:
+            # Only touch rows we still hold, for the period we charged.
+            held = self.held().filter(pk=r.subscription_id, next_charge_date=r.period)
+            exhausted = False
+            if r.status == "succeeded":
+                updated = held.update(
+                    next_charge_date=r.period + datetime.timedelta(days=settings.BILLING_PERIOD_DAYS),
+                    failed_attempts=0,
+                    next_retry_at=None,
+                    claimed_until=None,
+                    claimed_by="",
+                )
+                summary.succeeded += updated
+            elif r.status == "declined":
+                exhausted = r.attempt > len(self.retry_days)
+                updated = held.update(
+                    failed_attempts=F("failed_attempts") + 1,
+                    next_retry_at=None if exhausted else now + datetime.timedelta(days=self.retry_days[r.attempt - 1]),
+                    is_active=not exhausted,
+                    claimed_until=None,
+                    claimed_by="",
+                )
+                summary.declined += updated
+            else:
+                # Unknown outcome or nothing we can charge with: try again on
+                # the first dunning day, same attempt and reference.
+                updated = held.update(
+                    next_retry_at=now + datetime.timedelta(days=self.retry_days[0]),
+                    claimed_until=None,
+                    claimed_by="",
+                )
+                summary.errors += updated
+            if updated:
+                held_ids.add(r.subscription_id)
+                if exhausted:
+                    summary.deactivated += 1
+                    # Dunning: email the artist / pause listings once retries run out.
+                    logger.warning("Subscription %s deactivated after %d failed attempts", r.subscription_id, r.attempt)
+            summary.results.append({"artist": r.artist_id, "subscription": r.subscription_id, "ok": r.status == "succeeded", "error": r.error})
+
+        attempts = {True: [], False: []}
+        for r in results:
+            attempts[r.subscription_id in held_ids].append(BillingAttempt(
+                subscription_id=r.subscription_id,
+                period=r.period,
+                attempt=r.attempt,
+                reference=r.reference,
+                gateway=r.gateway,
+                amount_gbp=r.amount_gbp,
+                status=r.status,
+                error=r.error,
+                raw=r.raw,
+                duration_ms=r.duration_ms,
+                worker=self.worker_id,
+            ))
+        # A retried error reuses its reference, so its row takes the latest
+        # outcome; one whose lease was lost never overwrites the holder's.
+        BillingAttempt.objects.bulk_create(
+            attempts[True],
+            update_conflicts=True,
+            unique_fields=["reference"],
+            update_fields=["status", "error", "raw", "duration_ms", "worker", "created_at"],
+        )
+        BillingAttempt.objects.bulk_create(attempts[False], ignore_conflicts=True)
@@ -0,0 +1,62 @@
+# payments/citypay.py
+import threading
+
+from django.conf import settings
+
+from .http import PSPClient
+
+
+class CityPayClient(PSPClient):
+    """CityPay card-holder-not-present API (stored card token charges)."""
+
+    name = "citypay"
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            settings.CITYPAY_BASE_URL,
+            connect_timeout=settings.CITYPAY_CONNECT_TIMEOUT,
+            read_timeout=settings.CITYPAY_READ_TIMEOUT,
+            max_retries=settings.CITYPAY_MAX_RETRIES,
+        )
+
+    def charge_token(self, token, amount_pence, identifier, currency="GBP"):
+        # CityPay de-duplicates on ``identifier``, so a retried charge cannot bill twice.
+        r = self.post(
+            "/v6/charge",
+            endpoint="POST /v6/charge",
+            idempotent=True,
+            headers={"cp-api-key": settings.CITYPAY_LICENCE or "", "Content-Type": "application/json"},
+            json={
+                "merchantid": settings.CITYPAY_MERCHANT_ID,
+                "token": token,
+                "amount": amount_pence,
+                "currency": currency,
+                "identifier": identifier,
+            },
+        )
+        return r.json()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide CityPay client (one connection pool per worker)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CityPayClient.from_settings()
+    return _client
+
+
+def charge_citypay_token(token, amount_gbp, reference):
+    """Charge a stored card token; returns CityPay's AuthResponse dict."""
+    data = get_client().charge_token(token, int(round(float(amount_gbp) * 100)), reference)
+    return data.get("AuthResponse", data)
+
+
+def is_authorised(auth_response):
+    return bool(auth_response.get("authorised")) or auth_response.get("result") == 1
@@ -0,0 +1,327 @@
+# payments/fakepsp.py
+"""
+An in-memory stand-in for the SumUp and CityPay APIs, for integration and
+load testing without touching the real providers.
+
+    python manage.py run_fake_psp --port 8765 --latency-ms 80 --error-rate 0.02 \
+        --webhook-url http://127.0.0.1:8000/payments/callback/
+
+then run the site with SUMUP_BASE_URL / CITYPAY_BASE_URL set to
+http://127.0.0.1:8765. It can also be started in-process:
+
+    with FakePSPServer(port=0) as psp:
+        settings.SUMUP_BASE_URL = psp.url
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FakePSPConfig:
+    latency_ms: float = 0.0           # added to every response
+    jitter_ms: float = 0.0            # uniform extra latency on top of latency_ms
+    error_rate: float = 0.0           # share of API calls answered with 503
+    decline_rate: float = 0.0         # share of payments that end FAILED / declined
+    webhook_url: str = ""             # where to POST payment results; empty disables webhooks
+    webhook_delay_ms: float = 0.0     # delay between checkout creation and its webhook
+    token_ttl: int = 3600             # expires_in handed out by /token
+    seed: int = None
+
+
+def _now():
+    return datetime.now(dt_timezone.utc)
+
+
+class FakePSP:
+    """Provider state and behaviour, independent of the HTTP transport."""
+
+    def __init__(self, config=None):
+        self.config = config or FakePSPConfig()
+        self.random = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.checkouts = {}
+        self.transactions = []
+        self.charges = {}
+        self.counters = {}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self):
+        extra = self.config.jitter_ms * self.random.random() if self.config.jitter_ms else 0
+        if self.config.latency_ms or extra:
+            time.sleep((self.config.latency_ms + extra) / 1000)
+
+    # --- SumUp ---
+
+    def issue_token(self, form):
+        grant = form.get("grant_type")
+        if grant not in ("authorization_code", "refresh_token", "client_credentials"):
+            return 400, {"error": "unsupported_grant_type"}
+        return 200, {
+            "access_token": f"fake_at_{uuid.uuid4().hex}",
+            "refresh_token": f"fake_rt_{uuid.uuid4().hex}",
+            "token_type": "Bearer",
+            "expires_in": self.config.token_ttl,
+            "scope": form.get("scope", "payments checkouts"),
+        }
+
+    def create_checkout(self, body):
+        reference = body.get("checkout_reference")
+        if not reference or body.get("amount") is None:
+            return 400, {"error_code": "MISSING", "message": "checkout_reference and amount are required"}
+        with self.lock:
+            if any(c["checkout_reference"] == reference for c in self.checkouts.values()):
+                return 409, {"error_code": "DUPLICATED_CHECKOUT", "message": "Checkout already exists"}
+            checkout = {
+                "id": str(uuid.uuid4()),
+                "checkout_reference": reference,
+                "amount": body["amount"],
+                "currency": body.get("currency", "GBP"),
+                "description": body.get("description", ""),
+                "merchant_code": body.get("merchant_code", "FAKEMERCHANT"),
+                "return_url": body.get("return_url", ""),
+                "status": "PENDING",
+                "date": _now().isoformat(),
+                "valid_until": (_now() + timedelta(minutes=30)).isoformat(),
+                "transactions": [],
+            }
+            self.checkouts[checkout["id"]] = checkout
+        if self.config.webhook_url:
+            threading.Timer(self.config.webhook_delay_ms / 1000, self.complete, args=(checkout["id"],)).start()
+        return 201, checkout
+
+    def get_checkout(self, checkout_id):
+        with self.lock:
+            checkout = self.checkouts.get(checkout_id)
+            return (200, dict(checkout)) if checkout else (404, {"error_code": "NOT_FOUND"})
+
+    def complete(self, checkout_id, paid=None):
+        """Settle a checkout as PAID or FAILED and deliver the webhook, if configured."""
+        if paid is None:
+            paid = not self.roll(self.config.decline_rate)
+        with self.lock:
+            checkout = self.checkouts.get(checkout_id)
+            if checkout is None or checkout["status"] != "PENDING":
+                return checkout
+            checkout["status"] = "PAID" if paid else "FAILED"
+            if paid:
+                txn = {
+                    "id": str(uuid.uuid4()),
+                    "transaction_code": f"T{uuid.uuid4().hex[:10].upper()}",
+                    "amount": checkout["amount"],
+                    "currency": checkout["currency"],
+                    "status": "SUCCESSFUL",
+                    "payment_type": "ECOM",
+                    "timestamp": _now().isoformat(),
+                    "checkout_reference": checkout["checkout_reference"],
+                }
+                checkout["transactions"] = [txn]
+                self.transactions.append(txn)
+            payload = dict(checkout, checkout_id=checkout_id)
+        if self.config.webhook_url:
+            self.send_webhook(payload)
+        return payload
+
+    def send_webhook(self, payload):
+        self.count("webhooks")
+        try:
+            requests.post(self.config.webhook_url, json=payload, timeout=10)
+        except requests.RequestException as exc:
+            self.count("webhook_errors")
+            logger.warning("Fake PSP webhook to %s failed: %s", self.config.webhook_url, exc)
+
+    def list_transactions(self, query):
+        """Transaction history, paged with an ``oldest_ref`` cursor like SumUp's ``next`` links."""
+        limit = min(int(query.get("limit", 10)), 1000)
+        oldest = datetime.fromisoformat(query["oldest_time"]) if query.get("oldest_time") else None
+        newest = datetime.fromisoformat(query["newest_time"]) if query.get("newest_time") else None
+        cursor = query.get("oldest_ref")
+        with self.lock:
+            items = [
+                (datetime.fromisoformat(t["timestamp"]), t) for t in self.transactions
+            ]
+        items = [
+            t for at, t in sorted(items, key=lambda pair: (pair[0], pair[1]["transaction_code"]))
+            if (oldest is None or at >= oldest) and (newest is None or at < newest)
+        ]
+        if cursor:
+            codes = [t["transaction_code"] for t in items]
+            items = items[codes.index(cursor) + 1:] if cursor in codes else []
+        page, rest = items[:limit], items[limit:]
+        links = []
+        if rest:
+            params = {k: v for k, v in query.items() if k != "oldest_ref"}
+            params["oldest_ref"] = page[-1]["transaction_code"]
+            links.append({"rel": "next", "href": urlencode(params)})
+        return 200, {"items": page, "links": links}
+
+    def add_transaction(self, checkout_reference, amount, currency="GBP", status="SUCCESSFUL", timestamp=None):
+        """Record a transaction directly, e.g. a payment whose webhook was lost."""
+        txn = {
+            "id": str(uuid.uuid4()),
+            "transaction_code": f"T{uuid.uuid4().hex[:10].upper()}",
+            "amount": amount,
+            "currency": currency,
+            "status": status,
+            "payment_type": "ECOM",
+            "timestamp": (timestamp or _now()).isoformat(),
+            "checkout_reference": checkout_reference,
+        }
+        with self.lock:
+            self.transactions.append(txn)
+        return txn
+
+    # --- CityPay ---
+
+    def charge_token(self, body):
+        identifier = body.get("identifier")
+        if not body.get("token") or not identifier or body.get("amount") is None:
+            return 400, {"code": "MISSING", "message": "token, identifier and amount are required"}
+        with self.lock:
+            if identifier in self.charges:
+                # CityPay de-duplicates on the merchant identifier.
+                return 200, self.charges[identifier]
+        authorised = not self.roll(self.config.decline_rate)
+        response = {
+            "AuthResponse": {
+                "identifier": identifier,
+                "amount": body["amount"],
+                "currency": body.get("currency", "GBP"),
+                "authorised": authorised,
+                "result": 1 if authorised else 2,
+                "result_code": "001" if authorised else "005",
+                "result_message": "Approved" if authorised else "Declined",
+                "authcode": f"A{self.random.randint(10000, 99999)}" if authorised else "",
+                "transno": self.random.randint(100000, 999999),
+                "datetime": _now().isoformat(),
+            }
+        }
+        with self.lock:
+            self.charges[identifier] = response
+        return 200, response
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakePSP/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def psp(self):
+        return self.server.psp
+
+    def log_message(self, format, *args):
+        logger.debug("fakepsp %s", format % args)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            return self._send(200, self._stats())
+        if url.path == "/authorize":
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            location = f"{query.get('redirect_uri', '/')}?{urlencode({'code': uuid.uuid4().hex, 'state': query.get('state', '')})}"
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if url.path == "/v0.1/me/transactions/history":
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            return self._api("list_transactions", lambda: self.psp.list_transactions(query))
+        if url.path.startswith("/v0.1/checkouts/"):
+            return self._api("get_checkout", lambda: self.psp.get_checkout(url.path.rsplit("/", 1)[-1]))
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if url.path == "/token":
+            form = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+            return self._api("token", lambda: self.psp.issue_token(form))
+        body = json.loads(raw or b"{}")
+        if url.path == "/v0.1/checkouts":
+            return self._api("create_checkout", lambda: self.psp.create_checkout(body))
+        if url.path.startswith("/v0.1/checkouts/") and url.path.endswith("/complete"):
+            # Test hook: settle a checkout on demand instead of waiting for the timer.
+            checkout = self.psp.complete(url.path.split("/")[-2], paid=body.get("paid", True))
+            return self._send(200, checkout) if checkout else self._send(404, {"error_code": "NOT_FOUND"})
+        if url.path == "/v6/charge":
+            return self._api("citypay_charge", lambda: self.psp.charge_token(body))
+        self._send(404, {"error": "not found"})
+
+    def _api(self, name, handler):
+        self.psp.count(name)
+        self.psp.delay()
+        if self.psp.roll(self.psp.config.error_rate):
+            self.psp.count("injected_errors")
+            return self._send(503, {"error": "injected failure"})
+        status, body = handler()
+        self._send(status, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stats(self):
+        with self.psp.lock:
+            return {
+                "counters": dict(self.psp.counters),
+                "checkouts": len(self.psp.checkouts),
+                "transactions": len(self.psp.transactions),
+                "charges": len(self.psp.charges),
+            }
+
+
+class FakePSPServer:
+    """Threaded HTTP server around a FakePSP; usable as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.psp = FakePSP(config)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.psp = self.psp
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,287 @@
+# payments/http.py
+"""Shared HTTP plumbing for the payment service providers (SumUp, CityPay)."""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a provider that is currently failing."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures.
+    Open -> half-open once ``reset_timeout`` seconds have passed; the next
+    call is let through as a trial and closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class CallStats:
+    """Per-endpoint call counters and latency totals, safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def record(self, endpoint, elapsed_ms, ok):
+        with self._lock:
+            row = self._data.setdefault(endpoint, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["calls"] += 1
+            row["errors"] += 0 if ok else 1
+            row["total_ms"] += elapsed_ms
+            row["max_ms"] = max(row["max_ms"], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(row) for endpoint, row in self._data.items()}
+
+
+class PSPClient:
+    """
+    A ``requests.Session`` with connection pooling, split connect/read
+    timeouts, jittered retries for idempotent calls, a circuit breaker and
+    per-call latency stats.
+
+    Non-idempotent calls (POST) are only retried when the connection could
+    not be established, i.e. when the provider never saw the request.
+    """
+
+    name = "psp"
+
+    def __init__(self, base_url, *, connect_timeout=3.05, read_timeout=10.0, max_retries=2,
+                 backoff_base=0.25, backoff_max=4.0, pool_size=10, breaker=None, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = CallStats()
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, path, *, idempotent=None, endpoint=None, **kwargs):
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        endpoint = endpoint or f"{method} {path}"
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                self.stats.record(endpoint, 0.0, ok=False)
+                raise CircuitOpenError(f"{self.name} circuit open, not calling {endpoint}")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as exc:
+                self._finish(endpoint, started, attempt, ok=False, detail=exc.__class__.__name__)
+                if (idempotent or _never_sent(exc)) and attempt <= self.max_retries:
+                    self._sleep(attempt)
+                    continue
+                raise
+            except requests.Timeout as exc:
+                # A read timeout means the provider may already have acted on the request.
+                self._finish(endpoint, started, attempt, ok=False, detail=exc.__class__.__name__)
+                if idempotent and attempt <= self.max_retries:
+                    self._sleep(attempt)
+                    continue
+                raise
+
+            ok = response.status_code < 500
+            self._finish(endpoint, started, attempt, ok=ok, detail=response.status_code)
+            if response.status_code in RETRYABLE_STATUS and idempotent and attempt <= self.max_retries:
+                self._sleep(attempt, response.headers.get("Retry-After"))
+                continue
+            response.raise_for_status()
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def _finish(self, endpoint, started, attempt, *, ok, detail):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(endpoint, elapsed_ms, ok)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        logger.info("%s %s -> %s in %.1fms (attempt %d)", self.name, endpoint, detail, elapsed_ms, attempt)
+
+    def _sleep(self, attempt, retry_after=None):
+        # Full jitter: anywhere between 0 and the capped exponential delay.
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+
+class AsyncPSPClient:
+    """
+    ``PSPClient`` for async views: the same timeouts, retry rules, circuit
+    breaker and stats, on an ``httpx.AsyncClient`` so a slow provider holds
+    up a coroutine rather than a worker thread.
+
+    Errors are httpx's (``httpx.HTTPError``) plus ``CircuitOpenError``; see
+    ``ASYNC_ERRORS``. Pass the sync client's ``breaker`` and ``stats`` to
+    share one view of the provider's health between the two.
+    """
+
+    name = "psp"
+
+    def __init__(self, base_url, *, connect_timeout=3.05, read_timeout=10.0, max_retries=2,
+                 backoff_base=0.25, backoff_max=4.0, pool_size=10, breaker=None, stats=None, transport=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = stats or CallStats()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    async def request(self, method, path, *, idempotent=None, endpoint=None, **kwargs):
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        endpoint = endpoint or f"{method} {path}"
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                self.stats.record(endpoint, 0.0, ok=False)
+                raise CircuitOpenError(f"{self.name} circuit open, not calling {endpoint}")
+
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                # Never reached the provider, so even a POST is safe to repeat.
+                self._finish(endpoint, started, attempt, ok=False, detail=exc.__class__.__name__)
+                if attempt <= self.max_retries:
+                    await self._sleep(attempt)
+                    continue
+                raise
+            except httpx.TransportError as exc:
+                # A read timeout or dropped connection: the provider may already have acted.
+                self._finish(endpoint, started, attempt, ok=False, detail=exc.__class__.__name__)
+                if idempotent and attempt <= self.max_retries:
+                    await self._sleep(attempt)
+                    continue
+                raise
+
+            ok = response.status_code < 500
+            self._finish(endpoint, started, attempt, ok=ok, detail=response.status_code)
+            if response.status_code in RETRYABLE_STATUS and idempotent and attempt <= self.max_retries:
+                await self._sleep(attempt, response.headers.get("Retry-After"))
+                continue
+            response.raise_for_status()
+            return response
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    # Same stats, breaker and logging as the sync client
+    _finish = PSPClient._finish
+
+    async def _sleep(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        await asyncio.sleep(delay)
+
+
+ASYNC_ERRORS = (httpx.HTTPError, CircuitOpenError)
+
+
+def _never_sent(exc):
+    """True when a ConnectionError happened before the request reached the server."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the error that ended the last try.
+    cause = exc.args[0] if exc.args else None
+    reason = getattr(cause, "reason", cause)
+    # Refused or unresolvable (NameResolutionError is a NewConnectionError): no byte was sent.
+    return isinstance(reason, NewConnectionError)
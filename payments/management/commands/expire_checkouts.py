@@ -0,0 +1,39 @@
+# payments/management/commands/expire_checkouts.py
+# Run every minute, e.g. from cron:
+#   * * * * * cd /srv/jersey_artwork && venv/bin/python manage.py expire_checkouts
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.sweeper import sweep_expired_checkouts
+
+
+class Command(BaseCommand):
+    help = 'Expire stale SumUp checkouts and cancel their pending orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=50.0,
+            help='Stop after this long so minutely runs never overlap (default 50)'
+        )
+        parser.add_argument('--loop', action='store_true', help='Sweep every --interval seconds instead of once')
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            summary = sweep_expired_checkouts(
+                batch_size=options['batch_size'],
+                max_seconds=options['max_seconds'],
+            )
+            self.stdout.write(
+                f"Expired {summary.checkouts_expired} checkout(s), cancelled {summary.orders_cancelled} order(s) "
+                f"in {summary.seconds:.2f}s "
+                f"({summary.rate:.0f}/s)"
+            )
+            if not options['loop']:
+                break
+            time.sleep(max(0.0, options['interval'] - (time.monotonic() - started)))
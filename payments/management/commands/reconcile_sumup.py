@@ -0,0 +1,66 @@
+# payments/management/commands/reconcile_sumup.py
+# Run nightly for the previous day, e.g. from cron:
+#   15 2 * * * cd /srv/jersey_artwork && venv/bin/python manage.py reconcile_sumup --heal --report /var/log/jersey/reconcile.jsonl
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from payments.reconcile import Reconciler, ReportWriter
+
+
+def _parse_when(value):
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Not a date or datetime: {value}")
+        when = datetime.datetime.combine(day, datetime.time.min)
+    return when if timezone.is_aware(when) else timezone.make_aware(when)
+
+
+class Command(BaseCommand):
+    help = 'Compare SumUp transaction history with recorded payments and optionally heal missing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Start of the window (date or datetime; default: start of yesterday)')
+        parser.add_argument('--until', help='End of the window, exclusive (default: --since plus one day)')
+        parser.add_argument('--heal', action='store_true', help='Record missing payments and mark their orders paid')
+        parser.add_argument('--report', help='Write discrepancies to this file instead of stdout')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['since']:
+            since = _parse_when(options['since'])
+        else:
+            today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+            since = today - datetime.timedelta(days=1)
+        until = _parse_when(options['until']) if options['until'] else since + datetime.timedelta(days=1)
+        if until <= since:
+            raise CommandError("--until must be after --since")
+
+        stream = open(options['report'], 'w', newline='') if options['report'] else sys.stdout
+        try:
+            reconciler = Reconciler(
+                ReportWriter(stream, options['format']),
+                chunk_size=options['chunk_size'],
+                page_size=options['page_size'],
+                heal=options['heal'],
+            )
+            summary = reconciler.run(since, until)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        self.stderr.write(
+            f"{summary.seen} transaction(s) from {since:%Y-%m-%d %H:%M} to {until:%Y-%m-%d %H:%M}: "
+            f"{summary.matched} matched, {summary.healed} healed, {summary.discrepancies} discrepancies "
+            f"({summary.missing} missing, {summary.unknown_checkout} unknown checkout, "
+            f"{summary.amount_mismatch} amount mismatch, {summary.heal_failed} heal failed, "
+            f"{summary.needs_refund} need refunding) "
+            f"in {summary.seconds:.1f}s"
+        )
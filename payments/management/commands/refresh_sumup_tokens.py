@@ -0,0 +1,37 @@
+# payments/management/commands/refresh_sumup_tokens.py
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import ArtistSumUpAuth
+from payments.tokens import token_manager
+
+
+class Command(BaseCommand):
+    help = 'Refresh SumUp artist tokens that expire soon, so checkouts never wait on a token refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--within',
+            type=int,
+            default=300,
+            help='Refresh tokens expiring within this many seconds (default 300)'
+        )
+
+    def handle(self, *args, **options):
+        horizon = timezone.now() + datetime.timedelta(seconds=options['within'])
+        artist_ids = ArtistSumUpAuth.objects.filter(
+            expires_at__lte=horizon
+        ).values_list('artist_id', flat=True)
+
+        refreshed = failed = 0
+        for artist_id in artist_ids.iterator():
+            try:
+                token_manager.refresh(artist_id, force=True)
+                refreshed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Artist {artist_id}: refresh failed ({e})")
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} token(s), {failed} failed"))
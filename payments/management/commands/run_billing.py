@@ -0,0 +1,35 @@
+# payments/management/commands/run_billing.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.billing import BillingRunner
+
+
+class Command(BaseCommand):
+    help = 'Charge due subscriptions; safe to run as several parallel workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Subscriptions claimed per batch')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel PSP calls per batch')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds a claimed batch is reserved for this worker')
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop claiming new batches after this long')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for due subscriptions')
+        parser.add_argument('--sleep', type=float, default=60.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        runner = BillingRunner(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            lease_seconds=options['lease'],
+        )
+        while True:
+            summary = runner.run(max_batches=options['max_batches'], max_seconds=options['max_seconds'])
+            self.stdout.write(
+                f"{runner.worker_id}: claimed {summary.claimed}, succeeded {summary.succeeded}, "
+                f"declined {summary.declined}, errors {summary.errors}, deactivated {summary.deactivated}"
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,42 @@
+# payments/management/commands/run_fake_psp.py
+from django.core.management.base import BaseCommand
+
+from payments.fakepsp import FakePSPConfig, FakePSPServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local SumUp/CityPay stand-in for offline integration and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed latency added to every API call')
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra latency, 0..N ms')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of API calls answered with 503 (0-1)')
+        parser.add_argument('--decline-rate', type=float, default=0.0, help='Share of payments that fail (0-1)')
+        parser.add_argument('--webhook-url', default='', help='POST payment results here, e.g. http://127.0.0.1:8000/payments/callback/')
+        parser.add_argument('--webhook-delay-ms', type=float, default=500.0, help='Delay before a checkout settles and its webhook fires')
+        parser.add_argument('--token-ttl', type=int, default=3600, help='expires_in for issued OAuth tokens')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible error/decline injection')
+
+    def handle(self, *args, **options):
+        config = FakePSPConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            decline_rate=options['decline_rate'],
+            webhook_url=options['webhook_url'],
+            webhook_delay_ms=options['webhook_delay_ms'],
+            token_ttl=options['token_ttl'],
+            seed=options['seed'],
+        )
+        server = FakePSPServer(options['host'], options['port'], config)
+        self.stdout.write(self.style.SUCCESS(f"Fake PSP listening on {server.url}"))
+        self.stdout.write(f"Set SUMUP_BASE_URL={server.url} and CITYPAY_BASE_URL={server.url}")
+        self.stdout.write(f"Counters: {server.url}/_stats")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
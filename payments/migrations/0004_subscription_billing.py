@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_artist_alter_subscriptionpayment_currency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='claimed_by',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='failed_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BillingAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='The next_charge_date this attempt was billing')),
+                ('attempt', models.PositiveIntegerField(default=1)),
+                ('reference', models.CharField(help_text='Identifier sent to the PSP', max_length=100, unique=True)),
+                ('gateway', models.CharField(default='citypay', max_length=20)),
+                ('amount_gbp', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('succeeded', 'Succeeded'), ('declined', 'Declined'), ('error', 'Error')], max_length=16)),
+                ('error', models.TextField(blank=True)),
+                ('raw', models.JSONField(default=dict)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_attempts', to='payments.subscription')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_refundrequest'),
+        ('payments', '0004_subscription_billing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sumupcheckout',
+            index=models.Index(condition=models.Q(('status__in', ['created', 'pending'])), fields=['valid_until'], name='checkout_open_expiry_idx'),
+        ),
+    ]
@@ -101,6 +101,14 @@ class SumUpCheckout(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Expiry sweeper (payments/sweeper.py): open checkouts ordered by expiry
+            models.Index(
+                fields=['valid_until'],
+                name='checkout_open_expiry_idx',
+                condition=models.Q(status__in=['created', 'pending']),
+            ),
+        ]
 
     def __str__(self):
         return f"Checkout {self.checkout_reference} - {self.status}"
@@ -487,3 +495,36 @@ class Subscription(models.Model):
     citypay_token = models.CharField(max_length=200, blank=True, default="")
     sumup_token = models.CharField(max_length=200, blank=True, default="")  # if you go all-in on SumUp
     next_charge_date = models.DateField(null=True, blank=True)  # set after first payment
+    # Dunning: consecutive failed charges for the current period and when to try again
+    failed_attempts = models.PositiveIntegerField(default=0)
+    next_retry_at = models.DateTimeField(null=True, blank=True)
+    # Billing worker lease (payments/billing.py) so parallel runners never charge the same row
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+
+class BillingAttempt(models.Model):
+    """One charge attempt for a subscription period (payments/billing.py)."""
+    STATUS_CHOICES = [
+        ("succeeded", "Succeeded"),
+        ("declined", "Declined"),
+        ("error", "Error"),
+    ]
+
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name="billing_attempts")
+    period = models.DateField(help_text="The next_charge_date this attempt was billing")
+    attempt = models.PositiveIntegerField(default=1)
+    reference = models.CharField(max_length=100, unique=True, help_text="Identifier sent to the PSP")
+    gateway = models.CharField(max_length=20, default="citypay")
+    amount_gbp = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    raw = models.JSONField(default=dict)
+    duration_ms = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.reference} - {self.status}"
@@ -0,0 +1,174 @@
+# payments/reconcile.py
+"""
+Reconcile SumUp's transaction history against our records.
+
+Transactions are streamed page by page from the PSP and handled in chunks:
+each chunk costs one query against ``SumUpTransaction.transaction_code``
+and one against ``SumUpCheckout.checkout_reference``, whatever its size.
+Differences go straight to the report as they are found, so memory use
+stays flat however many transactions the window holds.
+
+Payments SumUp took but we never recorded (a lost or failed webhook) can
+be healed in place through the same ``settle_checkout`` the webhook uses.
+"""
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+
+from . import sumup as sumup_api
+from .models import SumUpCheckout, SumUpTransaction
+from .settlement import NEEDS_REFUND, settle_checkout
+
+logger = logging.getLogger(__name__)
+
+REPORT_FIELDS = ['kind', 'transaction_code', 'checkout_reference', 'amount', 'currency', 'timestamp', 'detail']
+
+
+@dataclass
+class ReconcileSummary:
+    seen: int = 0
+    matched: int = 0
+    not_successful: int = 0
+    missing: int = 0
+    healed: int = 0
+    heal_failed: int = 0
+    needs_refund: int = 0
+    unknown_checkout: int = 0
+    amount_mismatch: int = 0
+    seconds: float = 0.0
+
+    @property
+    def discrepancies(self):
+        return self.missing + self.heal_failed + self.needs_refund + self.unknown_checkout + self.amount_mismatch
+
+
+class ReportWriter:
+    """Write discrepancies one line at a time as JSON lines or CSV."""
+
+    def __init__(self, stream, fmt='jsonl'):
+        self.stream = stream
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(stream, fieldnames=REPORT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, kind, txn, detail=''):
+        row = {
+            'kind': kind,
+            'transaction_code': txn.get('transaction_code'),
+            'checkout_reference': txn.get('checkout_reference'),
+            'amount': txn.get('amount'),
+            'currency': txn.get('currency'),
+            'timestamp': txn.get('timestamp'),
+            'detail': detail,
+        }
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(row) + '\n')
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _amount(txn):
+    return Decimal(str(txn.get('amount', 0))).quantize(Decimal('0.01'))
+
+
+class Reconciler:
+    def __init__(self, report, client=None, token=None, chunk_size=1000, page_size=100, heal=False):
+        self.report = report
+        self.client = client or sumup_api.get_client()
+        self.token = token or settings.SUMUP_ACCESS_TOKEN
+        self.chunk_size = chunk_size
+        self.page_size = page_size
+        self.heal = heal
+
+    def run(self, oldest_time, newest_time):
+        summary = ReconcileSummary()
+        started = time.monotonic()
+        transactions = self.client.iter_transactions(
+            self.token,
+            oldest_time=oldest_time,
+            newest_time=newest_time,
+            page_size=self.page_size,
+        )
+        for chunk in _chunks(transactions, self.chunk_size):
+            self.reconcile_chunk(chunk, summary)
+        summary.seconds = time.monotonic() - started
+        logger.info(
+            "SumUp reconciliation %s..%s: %d seen, %d matched, %d missing, %d healed, %d heal failures, "
+            "%d needing refunds, %d unknown checkouts, %d amount mismatches in %.1fs",
+            oldest_time, newest_time, summary.seen, summary.matched, summary.missing, summary.healed,
+            summary.heal_failed, summary.needs_refund, summary.unknown_checkout, summary.amount_mismatch,
+            summary.seconds,
+        )
+        return summary
+
+    def reconcile_chunk(self, chunk, summary):
+        summary.seen += len(chunk)
+        successful = [t for t in chunk if t.get('status') == 'SUCCESSFUL' and t.get('transaction_code')]
+        summary.not_successful += len(chunk) - len(successful)
+
+        recorded = dict(
+            SumUpTransaction.objects.filter(
+                transaction_code__in={t['transaction_code'] for t in successful},
+            ).values_list('transaction_code', 'amount')
+        )
+        unrecorded = [t for t in successful if t['transaction_code'] not in recorded]
+        checkouts = SumUpCheckout.objects.in_bulk(
+            {t.get('checkout_reference') for t in unrecorded if t.get('checkout_reference')},
+            field_name='checkout_reference',
+        )
+
+        for txn in successful:
+            code = txn['transaction_code']
+            if code in recorded:
+                if recorded[code] != _amount(txn):
+                    summary.amount_mismatch += 1
+                    self.report.write('amount_mismatch', txn, f"recorded {recorded[code]}")
+                else:
+                    summary.matched += 1
+                continue
+
+            checkout = checkouts.get(txn.get('checkout_reference'))
+            if checkout is None:
+                summary.unknown_checkout += 1
+                self.report.write('unknown_checkout', txn)
+            elif checkout.amount != _amount(txn):
+                summary.amount_mismatch += 1
+                self.report.write('amount_mismatch', txn, f"checkout {checkout.payment_id} is for {checkout.amount}")
+            elif not self.heal:
+                summary.missing += 1
+                self.report.write('missing', txn, f"checkout {checkout.payment_id} is {checkout.status}")
+            else:
+                self.heal_transaction(checkout, txn, summary)
+
+    def heal_transaction(self, checkout, txn, summary):
+        try:
+            settled = settle_checkout(checkout, {'source': 'reconciliation', **txn}, transaction_data=txn)
+        except Exception as e:
+            logger.exception("Could not heal SumUp transaction %s", txn.get('transaction_code'))
+            summary.heal_failed += 1
+            self.report.write('heal_failed', txn, str(e))
+            return
+        if settled == NEEDS_REFUND:
+            # Recorded, but the order was cancelled before the payment arrived.
+            summary.needs_refund += 1
+            self.report.write('needs_refund', txn, f"checkout {checkout.payment_id} paid after its order was closed")
+        elif settled:
+            summary.healed += 1
+            self.report.write('healed', txn, f"checkout {checkout.payment_id} marked paid")
+        else:
+            # Paid locally, but under another transaction code.
+            summary.missing += 1
+            self.report.write('missing', txn, f"checkout {checkout.payment_id} already paid")
@@ -0,0 +1,98 @@
+# payments/settlement.py
+"""
+Apply a successful SumUp payment to our records: checkout, transaction,
+order and stock, plus the outbox events for everything that follows.
+Shared by the webhook and by reconciliation, so a payment recorded either
+way ends up in the same state.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from orders.fulfilment import allocate_stock
+from orders.handlers import order_paid_events
+from orders.models import Order
+from orders.outbox import publish_many
+from orders.state import can_transition, transition
+from .models import SumUpCheckout, SumUpTransaction
+
+logger = logging.getLogger(__name__)
+
+NEEDS_REFUND = 'needs_refund'
+
+
+def settle_checkout(checkout, data, transaction_data=None):
+    """
+    Mark ``checkout`` paid from the PSP payload ``data``.
+
+    ``transaction_data`` defaults to the first entry of ``data['transactions']``.
+    Returns True once the order is paid, or False without changing anything
+    if the checkout was already paid, so repeated webhooks and
+    reconciliation runs are harmless. A payment for an order that can no
+    longer be paid (cancelled after its checkout expired) is recorded but
+    returns ``NEEDS_REFUND``.
+    """
+    if transaction_data is None:
+        transaction_data = (data.get('transactions') or [{}])[0]
+
+    with transaction.atomic():
+        checkout = SumUpCheckout.objects.select_for_update().select_related('order').get(pk=checkout.pk)
+        if checkout.status == 'paid':
+            return False
+
+        now = timezone.now()
+        checkout.status = 'paid'
+        checkout.paid_at = now
+        checkout.sumup_response = data
+        checkout.save(update_fields=['status', 'paid_at', 'sumup_response', 'updated_at'])
+
+        timestamp = transaction_data.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = parse_datetime(timestamp)
+        SumUpTransaction.objects.create(
+            checkout=checkout,
+            sumup_transaction_id=transaction_data.get('id'),
+            transaction_code=transaction_data.get('transaction_code'),
+            amount=Decimal(str(transaction_data.get('amount', 0))),
+            currency=transaction_data.get('currency', 'GBP'),
+            status='successful',
+            payment_type='ecom',
+            timestamp=timestamp or now,
+            sumup_response=transaction_data,
+        )
+
+        # Lock the order so the sweeper can't cancel it between the check and the transition.
+        order = Order.objects.select_for_update().get(pk=checkout.order_id)
+        if not can_transition(order, 'processing'):
+            # e.g. paid after the checkout expired and the order was cancelled: keep the
+            # payment on record for a refund, but don't bring the order back.
+            note = f"PAYMENT RECEIVED while {order.status}: {transaction_data.get('transaction_code')} needs refunding"
+            Order.objects.filter(pk=order.pk).update(
+                admin_note="\n".join([order.admin_note, note]).strip(),
+                updated_at=now,
+            )
+            logger.error("Order %s: %s", order.order_number, note)
+            return NEEDS_REFUND
+
+        # Update artwork availability (originals sold, prints decremented)
+        oversold = allocate_stock(order)
+        transition(
+            order, 'processing',
+            expected=['pending'],
+            note='Payment received',
+            is_paid=True,
+            paid_at=now,
+            transaction_id=transaction_data.get('transaction_code'),
+            admin_note="\n".join([order.admin_note] + [
+                f"OVERSOLD: {line['title']} (artwork {line['artwork_id']}) "
+                f"requested {line['requested']}, available {line['available']}"
+                for line in oversold
+            ]).strip(),
+        )
+
+        # Email, invoice, rollups, cache and cart run from the outbox once this commits.
+        publish_many(order_paid_events(order))
+    return True
@@ -1,8 +1,153 @@
 # payments/sumup.py
-import time, requests, datetime
+import asyncio
+import datetime
+import threading
+from urllib.parse import parse_qs
+
 from django.utils import timezone
 from django.conf import settings
 
+from .http import AsyncPSPClient, PSPClient, CircuitBreaker
+from .tokens import token_manager
+
+
+class SumUpClient(PSPClient):
+    """SumUp REST API on a shared, pooled session. Point ``base_url`` at a stub server in tests."""
+
+    name = "sumup"
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            settings.SUMUP_BASE_URL,
+            connect_timeout=settings.SUMUP_CONNECT_TIMEOUT,
+            read_timeout=settings.SUMUP_READ_TIMEOUT,
+            max_retries=settings.SUMUP_MAX_RETRIES,
+            pool_size=settings.SUMUP_POOL_SIZE,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.SUMUP_BREAKER_FAILURES,
+                reset_timeout=settings.SUMUP_BREAKER_RESET_SECONDS,
+            ),
+        )
+
+    def token(self, data):
+        r = self.post(
+            "/token",
+            endpoint="POST /token",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={
+                "client_id": settings.SUMUP_CLIENT_ID,
+                "client_secret": settings.SUMUP_CLIENT_SECRET,
+                **data,
+            },
+        )
+        return r.json()
+
+    def create_checkout(self, token, payload):
+        r = self.post(
+            "/v0.1/checkouts",
+            endpoint="POST /v0.1/checkouts",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            json=payload,
+        )
+        return r.json()
+
+    def get_checkout(self, token, checkout_id):
+        r = self.get(
+            f"/v0.1/checkouts/{checkout_id}",
+            endpoint="GET /v0.1/checkouts/{id}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return r.json()
+
+    def iter_transactions(self, token, *, oldest_time=None, newest_time=None, page_size=100):
+        """
+        Yield transactions from the merchant's history, oldest first, one page
+        at a time by following the ``next`` links, so a listing of any size
+        never has to be held in memory.
+        """
+        params = {"order": "ascending", "limit": page_size}
+        if oldest_time:
+            params["oldest_time"] = oldest_time.isoformat()
+        if newest_time:
+            params["newest_time"] = newest_time.isoformat()
+        while params is not None:
+            r = self.get(
+                "/v0.1/me/transactions/history",
+                endpoint="GET /v0.1/me/transactions/history",
+                headers={"Authorization": f"Bearer {token}"},
+                params=params,
+            )
+            page = r.json()
+            yield from page.get("items", [])
+            params = None
+            for link in page.get("links", []):
+                if link.get("rel") == "next" and link.get("href"):
+                    # SumUp returns the next page as a bare query string.
+                    params = {k: v[0] for k, v in parse_qs(link["href"].lstrip("?")).items()}
+
+
+class AsyncSumUpClient(AsyncPSPClient):
+    """The checkout calls of ``SumUpClient`` for async views."""
+
+    name = "sumup"
+
+    @classmethod
+    def from_settings(cls):
+        sync_client = get_client()
+        return cls(
+            settings.SUMUP_BASE_URL,
+            connect_timeout=settings.SUMUP_CONNECT_TIMEOUT,
+            read_timeout=settings.SUMUP_READ_TIMEOUT,
+            max_retries=settings.SUMUP_MAX_RETRIES,
+            pool_size=settings.SUMUP_POOL_SIZE,
+            breaker=sync_client.breaker,
+            stats=sync_client.stats,
+        )
+
+    async def create_checkout(self, token, payload):
+        r = await self.post(
+            "/v0.1/checkouts",
+            endpoint="POST /v0.1/checkouts",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            json=payload,
+        )
+        return r.json()
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = {}
+_async_clients_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide SumUp client (one connection pool per worker)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SumUpClient.from_settings()
+    return _client
+
+
+def get_async_client():
+    """
+    The SumUp client for the running event loop. Under an ASGI server that
+    is one per worker; under WSGI each async view runs in a loop of its
+    own, and httpx connections can't move between loops. Clients whose
+    loop has closed are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        for closed in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[closed]
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = AsyncSumUpClient.from_settings()
+    return client
+
+
 def oauth_authorize_url(state: str):
     base = f"{settings.SUMUP_BASE_URL}/authorize"
     return (
@@ -14,20 +159,11 @@ def oauth_authorize_url(state: str):
     )
 
 def exchange_code_for_tokens(code: str):
-    r = requests.post(
-        f"{settings.SUMUP_BASE_URL}/token",
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        data={
-            "grant_type": "authorization_code",
-            "code": code,
-            "client_id": settings.SUMUP_CLIENT_ID,
-            "client_secret": settings.SUMUP_CLIENT_SECRET,
-            "redirect_uri": settings.SUMUP_REDIRECT_URI,
-        },
-        timeout=20,
-    )
-    r.raise_for_status()
-    data = r.json()
+    data = get_client().token({
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": settings.SUMUP_REDIRECT_URI,
+    })
     expires_in = data.get("expires_in", 600)
     return {
         "access_token": data["access_token"],
@@ -38,57 +174,34 @@ def exchange_code_for_tokens(code: str):
     }
 
 def refresh_access_token(artist_sumup):
-    r = requests.post(
-        f"{settings.SUMUP_BASE_URL}/token",
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": artist_sumup.refresh_token,
-            "client_id": settings.SUMUP_CLIENT_ID,
-            "client_secret": settings.SUMUP_CLIENT_SECRET,
-        },
-        timeout=20,
-    )
-    r.raise_for_status()
-    data = r.json()
+    data = get_client().token({
+        "grant_type": "refresh_token",
+        "refresh_token": artist_sumup.refresh_token,
+    })
     artist_sumup.access_token = data["access_token"]
     if "refresh_token" in data:
         artist_sumup.refresh_token = data["refresh_token"]
     artist_sumup.expires_at = timezone.now() + datetime.timedelta(seconds=data.get("expires_in", 600) - 30)
     artist_sumup.token_type = data.get("token_type", "Bearer")
-    artist_sumup.save()
+    artist_sumup.save(update_fields=["access_token", "refresh_token", "expires_at", "token_type"])
     return artist_sumup.access_token
 
 def get_artist_token(artist_sumup):
+    """Cached token; refreshed in the background before expiry (see payments/tokens.py)."""
     if not artist_sumup:
         raise ValueError("Artist not connected to SumUp.")
-    if artist_sumup.expires_at <= timezone.now():
-        return refresh_access_token(artist_sumup)
-    return artist_sumup.access_token
+    return token_manager.get_token(artist_sumup)
 
 def create_checkout_for_artist(artist_sumup, *, amount, currency, reference, description, return_url):
     token = get_artist_token(artist_sumup)
-    r = requests.post(
-        f"{settings.SUMUP_BASE_URL}/v0.1/checkouts",
-        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-        json={
-            "amount": float(amount),
-            "currency": currency,
-            "checkout_reference": reference,
-            "description": description,
-            "return_url": return_url,
-        },
-        timeout=20,
-    )
-    r.raise_for_status()
-    return r.json()
+    return get_client().create_checkout(token, {
+        "amount": float(amount),
+        "currency": currency,
+        "checkout_reference": reference,
+        "description": description,
+        "return_url": return_url,
+    })
 
 def get_checkout(artist_sumup, checkout_id):
     token = get_artist_token(artist_sumup)
-    r = requests.get(
-        f"{settings.SUMUP_BASE_URL}/v0.1/checkouts/{checkout_id}",
-        headers={"Authorization": f"Bearer {token}"},
-        timeout=20,
-    )
-    r.raise_for_status()
-    return r.json()
+    return get_client().get_checkout(token, checkout_id)
@@ -0,0 +1,89 @@
+# payments/sweeper.py
+"""
+Expire SumUp checkouts past ``valid_until`` and cancel the pending orders
+they leave behind. Checkout holds no stock, so there is none to release;
+an artwork's ``reserved`` status is the artist's own and is left alone.
+
+Work is done in small batches, each in its own transaction, using the
+partial ``checkout_open_expiry_idx`` index and ``SKIP LOCKED`` so the
+sweeper can overlap with itself or with webhooks without blocking.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from orders.state import transition_many
+from .models import SumUpCheckout
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ['created', 'pending']
+
+
+@dataclass
+class SweepSummary:
+    batches: int = 0
+    checkouts_expired: int = 0
+    orders_cancelled: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.checkouts_expired / self.seconds if self.seconds else 0.0
+
+
+def sweep_batch(now, batch_size):
+    """Expire one batch; returns (checkouts, orders) counts."""
+    with transaction.atomic():
+        rows = list(
+            SumUpCheckout.objects.select_for_update(skip_locked=True)
+            .filter(status__in=OPEN_STATUSES, valid_until__lt=now)
+            .order_by('valid_until')
+            .values_list('pk', 'order_id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+
+        SumUpCheckout.objects.filter(pk__in=[pk for pk, _ in rows]).update(status='expired', updated_at=now)
+
+        # An order is only abandoned if none of its checkouts is still open or paid.
+        order_ids = {order_id for _, order_id in rows}
+        order_ids -= set(
+            SumUpCheckout.objects.filter(order_id__in=order_ids, status__in=OPEN_STATUSES + ['paid'])
+            .values_list('order_id', flat=True)
+        )
+        cancelled = transition_many(
+            Order.objects.filter(pk__in=order_ids, is_paid=False),
+            'cancelled',
+            expected=['pending'],
+            note='Checkout expired without payment',
+            skip_locked=True,
+        )
+
+    return len(rows), len(cancelled)
+
+
+def sweep_expired_checkouts(batch_size=500, max_seconds=50.0):
+    """Sweep until nothing is left or ``max_seconds`` is used up."""
+    summary = SweepSummary()
+    started = time.monotonic()
+    now = timezone.now()
+    while time.monotonic() - started < max_seconds:
+        checkouts, orders = sweep_batch(now, batch_size)
+        if not checkouts:
+            break
+        summary.batches += 1
+        summary.checkouts_expired += checkouts
+        summary.orders_cancelled += orders
+        if checkouts < batch_size:
+            break
+    summary.seconds = time.monotonic() - started
+    logger.info(
+        "Checkout sweep: %d checkouts expired, %d orders cancelled in %d batches, %.2fs (%.0f checkouts/s)",
+        summary.checkouts_expired, summary.orders_cancelled, summary.batches, summary.seconds, summary.rate,
+    )
+    return summary
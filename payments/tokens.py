@@ -0,0 +1,93 @@
+# payments/tokens.py
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArtistSumUpAuth
+
+logger = logging.getLogger(__name__)
+
+
+class SumUpTokenManager:
+    """
+    Hands out SumUp access tokens per artist without a token round-trip on
+    the checkout path.
+
+    Tokens are served from the cache. Inside the refresh margin the current
+    token is still returned while one background thread refreshes it; only
+    an already-expired token is refreshed inline. Every refresh takes a row
+    lock on ArtistSumUpAuth and re-checks expiry, so concurrent callers
+    coalesce onto a single refresh instead of overwriting each other's
+    refresh_token.
+    """
+
+    key_prefix = "sumup:token"
+
+    def __init__(self, refresh_margin=None):
+        self._refresh_margin = refresh_margin
+
+    @property
+    def refresh_margin(self):
+        seconds = self._refresh_margin or settings.SUMUP_TOKEN_REFRESH_MARGIN
+        return datetime.timedelta(seconds=seconds)
+
+    def get_token(self, artist_sumup):
+        entry = cache.get(self._key(artist_sumup.artist_id))
+        if entry is None:
+            entry = self._remember(artist_sumup)
+
+        remaining = entry["expires_at"] - timezone.now()
+        if remaining > self.refresh_margin:
+            return entry["access_token"]
+        if remaining > datetime.timedelta(0):
+            self.refresh_in_background(artist_sumup.artist_id)
+            return entry["access_token"]
+        return self.refresh(artist_sumup.artist_id)
+
+    def refresh(self, artist_id, force=False):
+        """Refresh under a row lock; a caller that waited on the lock reuses the winner's token."""
+        from .sumup import refresh_access_token
+
+        with transaction.atomic():
+            auth = ArtistSumUpAuth.objects.select_for_update().get(artist_id=artist_id)
+            if force or auth.expires_at - timezone.now() <= self.refresh_margin:
+                refresh_access_token(auth)
+        self._remember(auth)
+        return auth.access_token
+
+    def refresh_in_background(self, artist_id):
+        # cache.add is atomic, so only one worker per artist spawns a refresher.
+        flag = f"{self.key_prefix}:refreshing:{artist_id}"
+        if not cache.add(flag, True, timeout=settings.SUMUP_READ_TIMEOUT * 4):
+            return
+        threading.Thread(target=self._refresh_quietly, args=(artist_id, flag), daemon=True).start()
+
+    def forget(self, artist_id):
+        cache.delete(self._key(artist_id))
+
+    def _refresh_quietly(self, artist_id, flag):
+        try:
+            self.refresh(artist_id)
+        except Exception:
+            logger.exception("Background SumUp token refresh failed for artist %s", artist_id)
+        finally:
+            cache.delete(flag)
+            connection.close()  # this thread's own connection
+
+    def _remember(self, auth):
+        entry = {"access_token": auth.access_token, "expires_at": auth.expires_at}
+        ttl = (auth.expires_at - timezone.now()).total_seconds()
+        if ttl > 0:
+            cache.set(self._key(auth.artist_id), entry, timeout=ttl)
+        return entry
+
+    def _key(self, artist_id):
+        return f"{self.key_prefix}:{artist_id}"
+
+
+token_manager = SumUpTokenManager()
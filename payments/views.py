@@ -2,13 +2,15 @@ import json
 import uuid
 import requests
 from decimal import Decimal
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.views import View
 from django.views.generic import TemplateView, FormView
 from django.contrib import messages
 from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db import transaction
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
@@ -21,13 +23,19 @@ from artworks.models import Artwork
 #from accounts.models import User
 from .models import SumUpCheckout, SumUpTransaction
 from .forms import CheckoutForm, PaymentMethodForm
+from .settlement import settle_checkout
+from orders.state import transition
 
 from django.http import HttpResponse
 import datetime
 
 from .models import SumUpCheckout, SumUpTransaction, Artist, ArtistSumUpAuth, Payment, Subscription
+from .models import Order as ArtistOrder
 from . import sumup as sumup_api
+from .http import ASYNC_ERRORS
 from . import citypay as citypay_api
+from .tokens import token_manager
+from .billing import BillingRunner
 
 
 class CheckoutView(FormView):
@@ -207,19 +215,24 @@ class SelectPaymentMethodView(FormView):
 
 
 class ProcessSumUpPaymentView(View):
-    """Create SumUp checkout and redirect to payment."""
+    """
+    Create SumUp checkout and redirect to payment.
+
+    Async, so a request waiting on the SumUp API holds a socket on the event
+    loop rather than a worker thread when served over ASGI.
+    """
     
-    def get(self, request):
-        # Get pending order
-        order_id = request.session.get('pending_order_id')
+    async def get(self, request):
+        # Get pending order (the session store is synchronous in Django 5.0)
+        order_id = await sync_to_async(request.session.get)('pending_order_id')
         if not order_id:
             messages.error(request, "No pending order found.")
             return redirect('cart:view')
         
-        order = get_object_or_404(Order, id=order_id)
+        order = await aget_object_or_404(Order, id=order_id)
         
         # Create SumUp checkout
-        checkout = self.create_sumup_checkout(order)
+        checkout = await self.create_sumup_checkout(order)
         
         if checkout:
             # Redirect to SumUp payment page
@@ -228,12 +241,15 @@ class ProcessSumUpPaymentView(View):
             messages.error(request, "Payment initialization failed. Please try again.")
             return redirect('payments:select_method')
     
-    def create_sumup_checkout(self, order):
-        """Create a test checkout for development."""
+    async def create_sumup_checkout(self, order):
+        """Create the checkout, against SumUp (or a stand-in) when SUMUP_LIVE_CHECKOUTS is on."""
+        if settings.SUMUP_LIVE_CHECKOUTS:
+            return await self.create_live_checkout(order)
+
         # Create local checkout record only (no API call yet)
-        checkout = SumUpCheckout.objects.create(
+        checkout = await SumUpCheckout.objects.acreate(
             order=order,
-            customer=order.user,
+            customer_id=order.user_id,
             amount=order.total,
             currency='GBP',
             description=f"Order {order.order_number}",
@@ -244,17 +260,58 @@ class ProcessSumUpPaymentView(View):
             redirect_url=self.request.build_absolute_uri(
                 reverse('payments:success')
             ),
-            status='pending'
+            status='pending',
+            valid_until=timezone.now() + datetime.timedelta(minutes=settings.SUMUP_CHECKOUT_TTL_MINUTES)
         )
         
         # For testing, generate a fake checkout ID
         checkout.sumup_checkout_id = f"test_{checkout.checkout_reference}"
-        checkout.save()
+        await checkout.asave()
         
         return checkout
 
+    async def create_live_checkout(self, order):
+        """Register the checkout with the SumUp API using the platform merchant account."""
+        checkout = await SumUpCheckout.objects.acreate(
+            order=order,
+            customer_id=order.user_id,
+            amount=order.total,
+            currency='GBP',
+            description=f"Order {order.order_number}",
+            merchant_code=settings.SUMUP_MERCHANT_CODE,
+            return_url=self.request.build_absolute_uri(reverse('payments:callback')),
+            redirect_url=self.request.build_absolute_uri(reverse('payments:success')),
+            status='created'
+        )
+        try:
+            data = await sumup_api.get_async_client().create_checkout(settings.SUMUP_ACCESS_TOKEN, {
+                "amount": float(checkout.amount),
+                "currency": checkout.currency,
+                "checkout_reference": checkout.checkout_reference,
+                "description": checkout.description,
+                "merchant_code": checkout.merchant_code,
+                "return_url": checkout.return_url,
+                "redirect_url": checkout.redirect_url,
+            })
+        except ASYNC_ERRORS:
+            checkout.status = 'failed'
+            await checkout.asave(update_fields=['status', 'updated_at'])
+            return None
+
+        checkout.sumup_checkout_id = data['id']
+        checkout.status = 'pending'
+        checkout.sumup_response = data
+        checkout.valid_until = (
+            parse_datetime(data['valid_until']) if data.get('valid_until')
+            else timezone.now() + datetime.timedelta(minutes=settings.SUMUP_CHECKOUT_TTL_MINUTES)
+        )
+        await checkout.asave()
+        return checkout
+
     def get_sumup_payment_url(self, checkout):
-        """For testing, show the checkout widget template."""
+        """Card widget for live checkouts; the success page for offline test checkouts."""
+        if settings.SUMUP_LIVE_CHECKOUTS:
+            return reverse('payments:checkout_widget', args=[checkout.sumup_checkout_id])
         # This will show your checkout_widget.html template
         return reverse('payments:success') + f"?test_checkout={checkout.checkout_reference}"
 
@@ -295,59 +352,16 @@ class SumUpCallbackView(View):
     
     def handle_successful_payment(self, checkout, data):
         """Process successful payment."""
-        with transaction.atomic():
-            # Update checkout
-            checkout.status = 'paid'
-            checkout.paid_at = timezone.now()
-            checkout.sumup_response = data
-            checkout.save()
-            
-            # Create transaction record
-            transaction_data = data.get('transactions', [{}])[0]
-            SumUpTransaction.objects.create(
-                checkout=checkout,
-                sumup_transaction_id=transaction_data.get('id'),
-                transaction_code=transaction_data.get('transaction_code'),
-                amount=Decimal(str(transaction_data.get('amount', 0))),
-                currency=transaction_data.get('currency', 'GBP'),
-                status='successful',
-                payment_type='ecom',
-                timestamp=transaction_data.get('timestamp', timezone.now()),
-                sumup_response=transaction_data
-            )
-            
-            # Update order
-            order = checkout.order
-            order.status = 'processing'
-            order.is_paid = True
-            order.paid_at = timezone.now()
-            order.transaction_id = transaction_data.get('transaction_code')
-            order.save()
-            
-            # Update artwork availability
-            for item in order.items.all():
-                if item.artwork.artwork_type == 'original':
-                    item.artwork.is_available = False
-                    item.artwork.status = 'sold'
-                    item.artwork.save()
-                else:
-                    # Update stock for prints
-                    item.artwork.stock_quantity -= item.quantity
-                    item.artwork.save()
-            
-            # Clear cart
-            if order.user:
-                Cart.objects.filter(user=order.user, is_active=True).delete()
+        settle_checkout(checkout, data)
     
     def handle_failed_payment(self, checkout, data):
         """Process failed payment."""
-        checkout.status = 'failed'
-        checkout.sumup_response = data
-        checkout.save()
-        
-        # Update order status
-        checkout.order.status = 'cancelled'
-        checkout.order.save()
+        # A FAILED webhook arriving after PAID must not undo the payment.
+        failed = SumUpCheckout.objects.filter(pk=checkout.pk, status__in=['created', 'pending']).update(
+            status='failed', sumup_response=data, updated_at=timezone.now()
+        )
+        if failed:
+            transition(checkout.order, 'cancelled', expected=['pending'], note='Payment failed')
 
 
 class PaymentSuccessView(TemplateView):
@@ -411,6 +425,7 @@ def sumup_connect_callback(request):
             "scope": tokens["scope"],
         },
     )
+    token_manager.forget(artist.id)
     return HttpResponse("SumUp connected. You can close this window.")
 
 # --- Create checkout for an artist's order ---
@@ -496,50 +511,23 @@ def sumup_webhook(request):
     except Payment.DoesNotExist:
         return HttpResponse("ok")
 
+    # Conditional updates: PAID always wins, FAILED only applies to a still-pending payment.
     if status == "SUCCESSFUL":
-        p.status = "SUCCESSFUL"
-        p.raw = data
-        p.save()
-        p.order.status = "PAID"
-        p.order.save()
+        Payment.objects.filter(pk=p.pk).update(status="SUCCESSFUL", raw=data)
+        ArtistOrder.objects.filter(pk=p.order_id).exclude(status="PAID").update(status="PAID")
         # TODO: trigger fulfilment (ticket email, etc.)
     elif status == "FAILED":
-        p.status = "FAILED"
-        p.raw = data
-        p.save()
-        p.order.status = "FAILED"
-        p.order.save()
+        if Payment.objects.filter(pk=p.pk, status="PENDING").update(status="FAILED", raw=data):
+            ArtistOrder.objects.filter(pk=p.order_id, status="PENDING").update(status="FAILED")
 
     return HttpResponse("ok")
 
 # --- Monthly subscription billing (CityPay or SumUp token) ---
 
 def run_monthly_billing(request):
-    """You can wire this behind admin auth or as a cron/Celery task trigger."""
-    results = []
-    today = timezone.now().date()
-    subs = Subscription.objects.select_related("artist").filter(is_active=True, next_charge_date__lte=today)
-    for s in subs:
-        ref = f"sub-{s.artist_id}-{uuid.uuid4().hex[:8]}"
-        try:
-            if s.citypay_token:
-                resp = citypay_api.charge_citypay_token(s.citypay_token, float(s.amount_gbp), ref)
-                # decide success by resp fields; update next date
-            elif s.sumup_token:
-                # TODO: call SumUp "charge token" endpoint if you keep it all in SumUp
-                resp = {"status": "NOT_IMPLEMENTED"}
-                raise RuntimeError("SumUp token charging not implemented in this snippet.")
-            else:
-                raise RuntimeError("No stored token for subscription.")
-
-            # If charge OK:
-            s.next_charge_date = today + datetime.timedelta(days=30)
-            s.save()
-            results.append({"artist": s.artist_id, "ok": True})
-        except Exception as e:
-            # Dunning: email the artist; maybe pause listings after N failures
-            results.append({"artist": s.artist_id, "ok": False, "error": str(e)})
-    return JsonResponse({"ran": len(results), "results": results})
+    """You can wire this behind admin auth; cron/workers should use `manage.py run_billing`."""
+    summary = BillingRunner().run(max_batches=1)
+    return JsonResponse({"ran": summary.claimed, "results": summary.results})
 
 class CheckoutWidgetView(TemplateView):
     template_name = 'payments/checkout_widget.html'